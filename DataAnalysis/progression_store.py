@@ -0,0 +1,256 @@
+import os
+import io
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize
+from PIL import Image
+from joblib import Parallel, delayed
+from tqdm import tqdm
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "..", "data", "processed")
+SCORES_PATH = os.path.join(DATA_DIR, "top_10000__scores.csv")
+BEATMAPS_PATH = os.path.join(DATA_DIR, "beatmaps.csv")
+STORE_DIR = os.path.join(SCRIPT_DIR, "progression_store", "top_10000")
+
+FEATURES = ["diff_star_rating", "diff_approach", "aim", "speed"]
+CHUNKSIZE = 2_000_000        # score rows per read while building
+
+# Materialized trajectories: per play, this percentile of the user's last ROLLING_WINDOW plays
+ROLLING_WINDOW = 100
+ROLLING_PERCENTILE = 97.5
+
+# Progression GIFs (same frames as the analysis.ipynb cells)
+N_CHUNKS = 15                # frames per GIF
+TOP_SHARE = 0.025            # dashed marker: mean of the top 2.5% of all plays so far
+ACCURACY_RANGE = (0.80, 0.99)
+FRAME_MS = 2000
+N_RENDER_JOBS = -1
+SEED = 42
+
+# ============================================
+
+# Per-user score histories for the progression plots. Instead of merging the
+# full scores table with the beatmaps and scanning it for one user, the store
+# keeps every score sorted by (user_id, date) with the beatmap features
+# joined in, one .npy file per column, and offsets[k]:offsets[k + 1] as the
+# rows of user_ids[k]. Arrays are opened memory-mapped, so one user's history
+# is a slice that reads only that user's rows.
+
+COLUMNS = ["date", "mod_beatmap_id", "accuracy", "features", "rolling"]
+
+
+# ========== BUILD ==========
+
+def read_scores(scores_path, chunksize=CHUNKSIZE):
+    """user_id, date (int64 ns), mod_beatmap_id and accuracy of every score, read in chunks."""
+    parts = {name: [] for name in ("user_id", "date", "mod_beatmap_id", "accuracy")}
+    reader = pd.read_csv(scores_path, usecols=list(parts), chunksize=chunksize,
+                         dtype={"user_id": np.int64, "mod_beatmap_id": np.int64, "accuracy": np.float32})
+    for chunk in tqdm(reader, desc="Reading scores", unit="chunk"):
+        chunk["date"] = pd.to_datetime(chunk["date"]).astype("datetime64[ns]").astype("int64")
+        for name in parts:
+            parts[name].append(chunk[name].to_numpy())
+    return {name: np.concatenate(arrays) for name, arrays in parts.items()}
+
+
+def rolling_percentile(values, offsets, window=ROLLING_WINDOW, percentile=ROLLING_PERCENTILE):
+    """Per row, `percentile` of the previous `window` rows of the same user (fewer at the start; NaNs skipped)."""
+    groups = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    out = np.empty(values.shape, dtype=np.float32)
+    for j in range(values.shape[1]):
+        rolled = pd.Series(values[:, j]).groupby(groups, sort=False).rolling(window, min_periods=1)
+        out[:, j] = rolled.quantile(percentile / 100.0).to_numpy()
+    return out
+
+
+def build_store(scores_path=SCORES_PATH, beatmaps_path=BEATMAPS_PATH, store_dir=STORE_DIR,
+                features=FEATURES, window=ROLLING_WINDOW, percentile=ROLLING_PERCENTILE):
+    """Sort all scores by (user_id, date), join beatmap features, materialize rolling percentiles and save."""
+    scores = read_scores(scores_path)
+    n_rows = len(scores["user_id"])
+    print(f"[INFO] {n_rows} scores loaded")
+
+    order = np.lexsort((scores["date"], scores["user_id"]))
+    scores = {name: values[order] for name, values in scores.items()}
+    del order
+    user_ids, starts = np.unique(scores["user_id"], return_index=True)
+    offsets = np.append(starts, n_rows).astype(np.int64)
+
+    beatmaps = pd.read_csv(beatmaps_path, usecols=["mod_beatmap_id"] + features).drop_duplicates("mod_beatmap_id")
+    codes = pd.Index(beatmaps["mod_beatmap_id"]).get_indexer(scores["mod_beatmap_id"])
+    feature_values = np.vstack([beatmaps[features].to_numpy(dtype=np.float32), np.full((1, len(features)), np.nan, dtype=np.float32)])
+    feature_values = feature_values[codes]   # -1 (map not in beatmaps.csv) picks the NaN row
+    print(f"[INFO] {int((codes < 0).sum())} scores on maps missing from {os.path.basename(beatmaps_path)}")
+
+    start = time.time()
+    rolling = rolling_percentile(feature_values, offsets, window, percentile)
+    print(f"[INFO] Rolling p{percentile} over {window} plays in {time.time() - start:.1f}s")
+
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, "user_ids.npy"), user_ids)
+    np.save(os.path.join(store_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(store_dir, "date.npy"), scores["date"])
+    np.save(os.path.join(store_dir, "mod_beatmap_id.npy"), scores["mod_beatmap_id"])
+    np.save(os.path.join(store_dir, "accuracy.npy"), scores["accuracy"])
+    np.save(os.path.join(store_dir, "features.npy"), feature_values)
+    np.save(os.path.join(store_dir, "rolling.npy"), rolling)
+    meta = {"scores_path": os.path.abspath(scores_path), "beatmaps_path": os.path.abspath(beatmaps_path),
+            "n_rows": n_rows, "n_users": len(user_ids), "features": list(features),
+            "rolling_window": window, "rolling_percentile": percentile}
+    with open(os.path.join(store_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"✔ Saved progression store: {store_dir} ({n_rows} rows, {len(user_ids)} users)")
+    return meta
+
+
+# ========== QUERIES ==========
+
+class ProgressionStore:
+    """Read side of a built store; every column is memory-mapped and sliced per user."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.features = self.meta["features"]
+        self.user_ids = np.load(os.path.join(store_dir, "user_ids.npy"))
+        self.offsets = np.load(os.path.join(store_dir, "offsets.npy"))
+        self.columns = {name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+        self.user_index = pd.Index(self.user_ids)
+
+    def user_rows(self, user_id):
+        k = self.user_index.get_loc(user_id)
+        return slice(int(self.offsets[k]), int(self.offsets[k + 1]))
+
+    def n_scores(self):
+        """Series user_id -> number of scores."""
+        return pd.Series(np.diff(self.offsets), index=self.user_index)
+
+    def history(self, user_id):
+        """One user's scores in date order: date, map, accuracy, features and rolling_<feature> columns."""
+        rows = self.user_rows(user_id)
+        df = pd.DataFrame({"date": pd.to_datetime(self.columns["date"][rows], unit="ns"),
+                           "mod_beatmap_id": self.columns["mod_beatmap_id"][rows],
+                           "accuracy": self.columns["accuracy"][rows]})
+        df[self.features] = self.columns["features"][rows]
+        df[[f"rolling_{f}" for f in self.features]] = self.columns["rolling"][rows]
+        return df
+
+    def active_users(self, percentile=90):
+        """Users at or above `percentile` of the score-count distribution (the notebook's top 10%)."""
+        counts = self.n_scores()
+        return counts.index[counts >= np.percentile(counts.to_numpy(), percentile)].to_numpy()
+
+
+# ========== RENDERING ==========
+
+def top_share_markers(values, bounds, share=TOP_SHARE):
+    """Per chunk end in `bounds`, per feature: mean of the top `share` of the non-NaN values so far."""
+    markers = np.full((len(bounds), values.shape[1]), np.nan)
+    for j in range(values.shape[1]):
+        for c, end in enumerate(bounds):
+            vals = values[:end, j]
+            vals = vals[~np.isnan(vals)]
+            if len(vals):
+                top_k = max(1, int(len(vals) * share))
+                markers[c, j] = np.sort(vals)[::-1][:top_k].mean()
+    return markers
+
+
+def render_progression(store, user_id, out_dir=SCRIPT_DIR, n_chunks=N_CHUNKS, seed=SEED):
+    """
+    user_<id>_progression.gif as in analysis.ipynb: one frame per chunk of
+    the user's plays, each play placed on its feature's axis and coloured by
+    accuracy, dashed markers at the running top-share mean. Frames stay in
+    memory, so users can be rendered in parallel.
+    """
+    if isinstance(store, str):
+        store = ProgressionStore(store)
+    rng = np.random.RandomState(seed)
+    history = store.history(user_id)
+    features = store.features
+    values = history[features].to_numpy(dtype=np.float64)
+    chunks = np.array_split(np.arange(len(history)), n_chunks)
+    markers = top_share_markers(values, np.cumsum([len(c) for c in chunks]))
+
+    lo, hi = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+    ranges = np.stack([lo - (hi - lo) * 0.05, hi + (hi - lo) * 0.05], axis=1)
+    span = ranges[:, 1] - ranges[:, 0]
+    norm = np.where(span > 0, (values - ranges[:, 0]) / np.where(span > 0, span, 1.0), 0.5)
+    norm_markers = np.where(span > 0, (markers - ranges[:, 0]) / np.where(span > 0, span, 1.0), 0.5)
+
+    accuracy = history["accuracy"].to_numpy(dtype=np.float64)
+    accuracy = np.where(accuracy > 1, accuracy / 100, accuracy)
+    colors = matplotlib.colormaps["RdYlGn"](Normalize(*ACCURACY_RANGE)(np.clip(accuracy, *ACCURACY_RANGE)))
+    colors[np.isnan(accuracy)] = (0.5, 0.5, 0.5, 1.0)
+
+    frames = []
+    for c, rows in enumerate(chunks):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.set_ylim(-0.5, len(features) - 0.5)
+        ax.set_xlim(0, 1)
+        ax.set_yticks(range(len(features)))
+        ax.set_yticklabels(features)
+        ax.set_title(f"User {user_id} – Chunk {c + 1}/{n_chunks}")
+        for j in range(len(features)):
+            y = j + rng.uniform(-0.15, 0.15, len(rows))
+            ax.scatter(norm[rows, j], y, c=colors[rows], edgecolors="black", s=36, zorder=2)
+            if not np.isnan(norm_markers[c, j]):
+                ax.vlines(norm_markers[c, j], j - 0.3, j + 0.3, color="black", linestyle="--")
+            ax.hlines(j, 0, 1, color="gray", linewidth=0.5, linestyle="-")
+            for pos in np.linspace(0, 1, 7):
+                ax.text(pos, j - 0.32, f"{ranges[j, 0] + span[j] * pos:.2f}", ha="center", va="top", fontsize=7, color="gray")
+        plt.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        plt.close(fig)
+        frames.append(Image.open(buffer))
+
+    os.makedirs(out_dir, exist_ok=True)
+    gif_path = os.path.join(out_dir, f"user_{user_id}_progression.gif")
+    frames[0].save(gif_path, save_all=True, append_images=frames[1:], duration=FRAME_MS, loop=0)
+    return gif_path
+
+
+def render_many(store_dir, user_ids, out_dir=SCRIPT_DIR, n_jobs=N_RENDER_JOBS):
+    """Render progression GIFs for many users in parallel; each worker maps the store itself."""
+    return Parallel(n_jobs=n_jobs)(
+        delayed(render_progression)(store_dir, uid, out_dir)
+        for uid in tqdm(user_ids, desc="Rendering progressions", unit="user")
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-user progression store (sorted, memory-mapped score histories).")
+    parser.add_argument("--build", action="store_true", help="(re)build the store from the scores and beatmaps CSVs")
+    parser.add_argument("--scores", default=SCORES_PATH)
+    parser.add_argument("--beatmaps", default=BEATMAPS_PATH)
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--users", nargs="+", type=int, help="user ids to render")
+    parser.add_argument("--random", type=int, default=0, help="render this many random users from the most active 10%%")
+    parser.add_argument("--out", default=SCRIPT_DIR)
+    args = parser.parse_args()
+
+    if args.build or not os.path.exists(os.path.join(args.store, "meta.json")):
+        build_store(args.scores, args.beatmaps, args.store)
+
+    store = ProgressionStore(args.store)
+    users = list(args.users or [])
+    if args.random:
+        users += np.random.RandomState(SEED).choice(store.active_users(), args.random, replace=False).tolist()
+    if users:
+        start = time.perf_counter()
+        history = store.history(users[0])
+        print(f"[INFO] User {users[0]}: {len(history)} scores loaded in {(time.perf_counter() - start) * 1000:.2f} ms")
+        for path in render_many(args.store, users, args.out):
+            print(f"✅ Saved GIF to: {path}")
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from surprise import SVD, BaselineOnly, KNNWithMeans
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+KNN_BLOCK_CELLS = 2_000_000   # (pair, neighbour) similarities gathered at once
+
+# ============================================
+
+# Array version of surprise's AlgoBase.predict for SVD, BaselineOnly and
+# KNNWithMeans: raw -> inner ids through one pandas Index lookup, estimates
+# from gathered factors/biases (SVD, BaselineOnly) or from the stored
+# similarity matrix (KNNWithMeans), default_prediction() for impossible
+# pairs, then clipping to the trainset's rating scale. Every estimate is
+# bit-identical to predict(): additions happen in the same order, dot
+# products go through the same BLAS ddot, and KNN neighbours are ranked
+# with a stable sort (heapq.nlargest keeps ties in rating order) and summed
+# sequentially. Other models fall back to predict() one pair at a time.
+
+
+def _id_lookup(raw2inner):
+    return pd.Index(list(raw2inner.keys())), np.fromiter(raw2inner.values(), dtype=np.int64, count=len(raw2inner))
+
+
+def _dot_rows(a, b):
+    """Row-wise dot products, each through the same ddot call as np.dot on two vectors."""
+    if len(a) == 0:
+        return np.zeros(0)
+    return np.matmul(a[:, None, :], b[:, :, None])[:, 0, 0]
+
+
+class BatchPredictor:
+    """
+    Batch scoring for one fitted model:
+
+        predictor = BatchPredictor(model)
+        est, impossible = predictor.predict(uids, iids)
+
+    `uids`/`iids` are aligned arrays of raw ids. Build it once per model;
+    the id lookups and KNN rating lists are reused across calls.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.kind = next((name for name, cls in (("svd", SVD), ("baseline", BaselineOnly), ("knn", KNNWithMeans))
+                          if type(model) is cls), None)
+        if self.kind is not None:
+            trainset = model.trainset
+            self._users = _id_lookup(trainset._raw2inner_id_users)
+            self._items = _id_lookup(trainset._raw2inner_id_items)
+        self._yr = None   # KNN: yr as CSR arrays
+
+    def inner_ids(self, raw_ids, lookup):
+        index, inner = lookup
+        codes = index.get_indexer(pd.Index(np.asarray(raw_ids)))
+        return np.where(codes >= 0, inner[np.maximum(codes, 0)], -1)
+
+    def predict(self, uids, iids, clip=True):
+        """(estimates, impossible mask) for aligned arrays of raw user and item ids."""
+        if self.kind is None:
+            return self._fallback(uids, iids, clip)
+
+        model = self.model
+        u = self.inner_ids(uids, self._users)
+        i = self.inner_ids(iids, self._items)
+        known_u, known_i = u >= 0, i >= 0
+        both = known_u & known_i
+
+        if self.kind == "knn":
+            impossible = ~both
+            est = np.empty(len(u))
+            x, y = (u, i) if model.sim_options.get("user_based", True) else (i, u)
+            est[both] = self._knn(x[both], y[both])
+        elif self.kind == "svd" and not model.biased:
+            impossible = ~both
+            est = np.empty(len(u))
+            est[both] = _dot_rows(model.qi[i[both]], model.pu[u[both]])
+        else:
+            # global_mean (+ bu) (+ bi) (+ qi.pu), in predict()'s order
+            impossible = np.zeros(len(u), dtype=bool)
+            est = np.full(len(u), model.trainset.global_mean)
+            est[known_u] += model.bu[u[known_u]]
+            est[known_i] += model.bi[i[known_i]]
+            if self.kind == "svd":
+                est[both] += _dot_rows(model.qi[i[both]], model.pu[u[both]])
+
+        if impossible.any():
+            est[impossible] = model.default_prediction()
+        if clip:
+            lower, higher = model.trainset.rating_scale
+            est = np.maximum(lower, np.minimum(higher, est))
+        return est, impossible
+
+    # ---------- KNNWithMeans ----------
+
+    def _rating_lists(self):
+        """yr as CSR arrays (indptr, neighbour ids, ratings), in yr's order; built on first use."""
+        if self._yr is None:
+            yr, n_y = self.model.yr, self.model.n_y
+            sizes = np.fromiter((len(yr[y]) for y in range(n_y)), dtype=np.int64, count=n_y)
+            flat = [pair for y in range(n_y) for pair in yr[y]]
+            self._yr = (np.concatenate([[0], np.cumsum(sizes)]),
+                        np.fromiter((x2 for x2, _ in flat), dtype=np.int64, count=len(flat)),
+                        np.fromiter((r for _, r in flat), dtype=np.float64, count=len(flat)))
+        return self._yr
+
+    def _knn(self, x, y):
+        """
+        KNNWithMeans.estimate for known (x, y) pairs. The rating lists of
+        all pairs in a block are gathered into one flat array, ranked per
+        pair by similarity, and the top k are laid out in a
+        (pairs x k) matrix whose rows are summed left to right.
+        """
+        model = self.model
+        indptr, nb_all, r_all = self._rating_lists()
+        est = model.means[x].astype(np.float64)
+        lens = indptr[y + 1] - indptr[y]
+        cum = np.concatenate([[0], np.cumsum(lens)])
+
+        start = 0
+        while start < len(x):
+            stop = max(start + 1, int(np.searchsorted(cum, cum[start] + KNN_BLOCK_CELLS, side="right")) - 1)
+            n_pairs, sizes = stop - start, lens[start:stop]
+            pair = np.repeat(np.arange(n_pairs), sizes)
+            pos = np.repeat(indptr[y[start:stop]] - cum[start:stop] + cum[start], sizes) + np.arange(sizes.sum())
+            nb, r = nb_all[pos], r_all[pos]
+            sims = model.sim[x[start:stop][pair], nb]
+
+            # Per pair: descending similarity, ties in yr order (heapq.nlargest is stable)
+            order = np.lexsort((-sims, pair))
+            rank = np.arange(len(order)) - np.searchsorted(pair[order], pair[order])
+            top = order[rank < model.k]
+            cols = rank[rank < model.k]
+            width = int(cols.max()) + 1 if len(cols) else 1
+            top_sims = np.zeros((n_pairs, width))
+            top_sims[pair[top], cols] = sims[top]
+            terms = np.zeros((n_pairs, width))
+            terms[pair[top], cols] = sims[top] * (r[top] - model.means[nb[top]])
+
+            positive = top_sims > 0
+            sum_sim = np.cumsum(np.where(positive, top_sims, 0.0), axis=1)[:, -1]
+            sum_ratings = np.cumsum(np.where(positive, terms, 0.0), axis=1)[:, -1]
+            actual_k = positive.sum(axis=1)
+            # actual_k == 0: ZeroDivisionError in predict(), the mean is kept;
+            # 0 < actual_k < min_k: sum_ratings is zeroed, adding 0
+            use = (actual_k > 0) & (actual_k >= model.min_k)
+            est[start:stop][use] += sum_ratings[use] / sum_sim[use]
+            start = stop
+        return est
+
+    # ---------- other models ----------
+
+    def _fallback(self, uids, iids, clip):
+        model = self.model
+        if hasattr(model, "score_pairs"):
+            # cooccurrence.CooccurrenceModel: already batched, predict() maps unknown pairs to 0
+            scores = model.score_pairs(uids, iids)
+            impossible = ~np.isfinite(scores)
+            return model.to_scale(np.where(impossible, 0.0, scores)), impossible
+        preds = [model.predict(uid, iid, clip=clip) for uid, iid in zip(uids, iids)]
+        return (np.array([p.est for p in preds], dtype=np.float64),
+                np.array([p.details.get("was_impossible", False) for p in preds], dtype=bool))
+
+
+def predict_many(model, uids, iids, clip=True):
+    """One-off BatchPredictor(model).predict(); build a BatchPredictor to score many batches."""
+    return BatchPredictor(model).predict(uids, iids, clip)
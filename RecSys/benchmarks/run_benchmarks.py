@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RECSYS_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, os.path.join(RECSYS_DIR, "pipeline"))
+sys.path.insert(0, RECSYS_DIR)
+
+import pandas as pd
+
+import synthetic_data
+from instrumentation import stage
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+RESULTS_DIR = os.path.join(SCRIPT_DIR, "results")
+WORK_DIR = os.path.join(SCRIPT_DIR, "work")
+
+# ============================================
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RECSYS_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+@contextmanager
+def timed(name, results, **meta):
+    """Benchmark stage: an instrumentation stage whose record is collected in `results`."""
+    print(f"\n▶️  {name}")
+    with stage(name, sink=results, **meta) as st:
+        yield st
+    record = results[-1]
+    print(f"   {record['wall_s']:.2f}s wall | {record['cpu_s']:.2f}s cpu | peak RSS {record['peak_rss_mb'] or 0:.0f} MB")
+
+
+def run_suite(paths, models, n_eval_users, n_rec_users):
+    import data_split
+    import model_trainer
+    import evaluator
+    import recommend
+
+    results = []
+    work = os.path.join(WORK_DIR, "splits")
+    models_dir = os.path.join(WORK_DIR, "models")
+    os.makedirs(work, exist_ok=True)
+    os.makedirs(models_dir, exist_ok=True)
+    data_split.DATA_VARIANTS = {"synthetic": {"scores": paths["scores"], "users": paths["users"]}}
+    data_split.OUTPUT_DIR = work
+
+    with timed("load", results) as st:
+        scores, users = data_split.load_scores("synthetic")
+        st.rows_out = len(scores)
+
+    with timed("stabilization_filter", results) as st:
+        st.rows_in = len(scores)
+        scores = data_split.filter_stabilized(scores, users)
+        st.rows_out = len(scores)
+
+    with timed("split", results) as st:
+        st.rows_in = len(scores)
+        data_split.save_single_train_split(scores, "synthetic")
+        st.rows_out = len(scores)
+
+    train_df = pd.read_csv(os.path.join(work, "synthetic_enjoyment_train.csv"))
+    train_df = train_df[train_df["rating"] > 0.0]
+    train_df = train_df.groupby("user_id").filter(lambda x: len(x) >= 20)
+    fold_train, fold_val = model_trainer.prepare_folds(train_df, model_trainer.N_FOLDS)[0]
+    val_users = fold_val["user_id"].drop_duplicates().head(n_eval_users)
+    fold_val = fold_val[fold_val["user_id"].isin(val_users)]
+
+    evaluator.MODELS_DIR = models_dir
+    evaluator.BEATMAPS_PATH = paths["beatmaps"]
+    for model_key in models:
+        cfg = model_trainer.MODEL_CONFIGS[model_key]
+        prefix = f"synthetic_enjoyment_{model_key}_fold0"
+        model_path = os.path.join(models_dir, f"{prefix}.pkl")
+        val_path = os.path.join(models_dir, f"{prefix}_val.csv")
+
+        with timed(f"train_{model_key}", results, model=model_key, kwargs=repr(cfg["kwargs"])) as st:
+            st.rows_in = len(fold_train)
+            model_trainer.train_fold_model(fold_train, fold_val, model_path, val_path, cfg["class"], cfg["kwargs"])
+
+        with timed(f"evaluate_{model_key}", results, model=model_key) as st:
+            st.rows_in = len(fold_val)
+            row = evaluator.evaluate_fold("synthetic", "enjoyment", model_key, 0)
+            st.rows_out = row["n_users"] if row else 0
+
+    with timed("recommend", results) as st:
+        rec_df = scores[["user_id", "mod_beatmap_id", "enjoyment"]].copy()
+        st.rows_in = len(rec_df)
+        recommend.train_and_recommend(recommend.prepare_dataset(rec_df), n_users=n_rec_users)
+        st.rows_out = n_rec_users
+
+    return results
+
+
+def compare(old_path, new_path):
+    """Per-stage wall time and peak RSS deltas between two result files."""
+    def load(path):
+        with open(path) as f:
+            return {r["stage"]: r for r in map(json.loads, f) if "stage" in r}
+
+    old, new = load(old_path), load(new_path)
+    rows = []
+    for name in new:
+        if name not in old:
+            continue
+        o, n = old[name], new[name]
+        rows.append({
+            "stage": name,
+            "wall_old": o["wall_s"], "wall_new": n["wall_s"],
+            "wall_delta_%": 100 * (n["wall_s"] - o["wall_s"]) / o["wall_s"] if o["wall_s"] else float("nan"),
+            "rss_old": o["peak_rss_mb"], "rss_new": n["peak_rss_mb"],
+        })
+    print(pd.DataFrame(rows).to_string(index=False, float_format="%.2f"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark on synthetic osu!-shaped data.")
+    parser.add_argument("--scale", default="tiny", choices=list(synthetic_data.SCALES))
+    parser.add_argument("--models", nargs="+", default=["svd", "baseline", "knn"])
+    parser.add_argument("--eval-users", type=int, default=500)
+    parser.add_argument("--rec-users", type=int, default=5)
+    parser.add_argument("--reuse-data", action="store_true", help="skip generation if the CSVs already exist")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    data_dir = os.path.join(WORK_DIR, f"data_{args.scale}")
+    paths = {
+        "beatmaps": os.path.join(data_dir, "beatmaps.csv"),
+        "users": os.path.join(data_dir, "synthetic__users.csv"),
+        "scores": os.path.join(data_dir, "synthetic__scores.csv"),
+    }
+    results = []
+    if not (args.reuse_data and all(os.path.exists(p) for p in paths.values())):
+        with timed("generate", results, scale=args.scale):
+            paths = synthetic_data.generate(args.scale, data_dir)
+    results += run_suite(paths, args.models, args.eval_users, args.rec_users)
+
+    header = {
+        "run": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "scale": args.scale,
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"{header['run'].replace(':', '-')}_{header['commit']}_{args.scale}.jsonl")
+    with open(out_path, "w") as f:
+        f.write(json.dumps(header) + "\n")
+        for record in results:
+            f.write(json.dumps({**record, "commit": header["commit"], "scale": args.scale}) + "\n")
+    print(f"\n✅ Benchmark results saved to {out_path}")
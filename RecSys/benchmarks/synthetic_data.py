@@ -0,0 +1,213 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "synthetic")
+
+# (users, base beatmaps, raw scores); every base beatmap exists with 4 mod strings
+SCALES = {
+    "tiny": (1_000, 5_000, 200_000),
+    "small": (5_000, 30_000, 2_000_000),
+    "random": (10_000, 65_000, 4_018_988),
+    "top": (9_999, 65_000, 51_248_991),
+}
+
+MODS = ["NM", "DT", "HR", "DTHR"]
+MOD_POPULARITY = np.array([1.0, 0.45, 0.3, 0.1])
+ITEM_ZIPF = 1.05           # long tail of beatmap popularity
+USER_ACTIVITY_SIGMA = 1.1  # lognormal spread of scores per user
+POST_STABILIZATION = 0.2   # share of a user's plays after skill_stabilization_date (README: ~17-20%)
+USERS_PER_CHUNK = 500
+
+START_DATE = np.datetime64("2010-01-01")
+DUMP_DATE = np.datetime64("2025-05-01")
+
+# ============================================
+
+
+def make_beatmaps(n_base, rng):
+    """One row per (beatmap, mod) following the beatmaps.csv schema in the README."""
+    n_items = n_base * len(MODS)
+    beatmap_id = np.repeat(np.arange(1, n_base + 1), len(MODS))
+    mod_idx = np.tile(np.arange(len(MODS)), n_base)
+    mods = np.array(MODS)[mod_idx]
+    is_dt = np.isin(mods, ["DT", "DTHR"])
+    is_hr = np.isin(mods, ["HR", "DTHR"])
+
+    base_star = np.repeat(rng.gamma(4.0, 1.1, n_base), len(MODS))
+    star = base_star * np.where(is_dt, 1.4, 1.0) * np.where(is_hr, 1.08, 1.0)
+    aim = star * rng.uniform(0.42, 0.55, n_items)
+    speed = star * rng.uniform(0.35, 0.52, n_items)
+    base_ar = np.repeat(rng.uniform(5.0, 9.5, n_base), len(MODS))
+    approach = np.minimum(np.where(is_dt, base_ar * 1.2 + 1.0, base_ar) * np.where(is_hr, 1.4, 1.0), 11.0)
+    base_bpm = np.repeat(rng.normal(180, 30, n_base).clip(60, 320), len(MODS))
+    bpm = base_bpm * np.where(is_dt, 1.5, 1.0)
+    base_len = np.repeat(rng.lognormal(4.8, 0.6, n_base).clip(20, 900), len(MODS))
+    hit_length = (base_len / np.where(is_dt, 1.5, 1.0)).astype(np.int32)
+    count_total = (base_len * bpm / 60 * rng.uniform(0.5, 1.2, n_items)).astype(np.int32)
+    count_slider = (count_total * rng.uniform(0.1, 0.5, n_items)).astype(np.int32)
+    count_spinner = rng.integers(0, 3, n_items)
+
+    # Long-tail popularity, NM most played
+    rank = rng.permutation(n_base) + 1
+    popularity = np.repeat(1.0 / rank ** ITEM_ZIPF, len(MODS)) * MOD_POPULARITY[mod_idx]
+    playcount = (popularity / popularity.max() * 5_000_000).astype(np.int64) + rng.integers(10, 500, n_items)
+    set_fav = (playcount * rng.uniform(0.0005, 0.01, n_items)).astype(np.int64)
+    submit = START_DATE - np.timedelta64(730, "D") + rng.integers(0, 5500, n_items).astype("timedelta64[D]")
+
+    df = pd.DataFrame({
+        "mod_beatmap_id": np.arange(1, n_items + 1),
+        "beatmap_id": beatmap_id,
+        "mods_string": mods,
+        "beatmapset_id": (beatmap_id + 3) // 4,
+        "creator_user_id": rng.integers(1, 30_000_000, n_items),
+        "playcount": playcount,
+        "passcount": (playcount * rng.uniform(0.1, 0.6, n_items)).astype(np.int64),
+        "set_favourite_count": set_fav,
+        "artist": [f"artist_{i % 9000}" for i in beatmap_id],
+        "title": [f"title_{i}" for i in beatmap_id],
+        "submit_date": submit,
+        "approved_date": submit + rng.integers(7, 200, n_items).astype("timedelta64[D]"),
+        "bpm": bpm.round(1),
+        "hit_length": hit_length,
+        "count_total": count_total,
+        "count_normal": count_total - count_slider - count_spinner,
+        "count_slider": count_slider,
+        "count_spinner": count_spinner,
+        "diff_drain": rng.uniform(3, 8, n_items).round(1),
+        "diff_size": rng.uniform(3, 6, n_items).round(1),
+        "diff_overall": rng.uniform(6, 10, n_items).round(1),
+        "diff_approach": approach.round(2),
+        "diff_star_rating": star.round(4),
+        "aim": aim.round(4),
+        "speed": speed.round(4),
+        "max_combo": count_total + count_slider,
+        "strain": (aim + speed).round(4),
+        "slider_factor": rng.uniform(0.9, 1.0, n_items).round(4),
+        "speed_note_count": (count_total * rng.uniform(0.1, 0.6, n_items)).round(2),
+        "genre": rng.integers(1, 14, n_items),
+        "favourite_factor": set_fav / np.maximum(playcount, 1),
+        "relevant_random": 1,
+        "relevant_top": 1,
+        "random_farm_factor": rng.beta(2, 5, n_items).round(6),
+        "top_farm_factor": rng.beta(2, 5, n_items).round(6),
+    })
+    return df, popularity / popularity.sum()
+
+
+def make_users(n_users, rng):
+    """users.csv schema; stabilization dates put POST_STABILIZATION of each user's plays after them."""
+    first_play = START_DATE + rng.integers(0, 4000, n_users).astype("timedelta64[D]")
+    span = (DUMP_DATE - first_play).astype(np.int64)
+    stabilization = first_play + (span * (1 - POST_STABILIZATION)).astype("timedelta64[D]")
+    pp = rng.lognormal(8.3, 0.5, n_users)
+    return pd.DataFrame({
+        "user_id": rng.choice(np.arange(1_000, 40_000_000), n_users, replace=False),
+        "username": [f"player_{i}" for i in range(n_users)],
+        "accuracy": rng.uniform(0.9, 0.995, n_users).round(4),
+        "accuracy_new": rng.uniform(0.92, 0.999, n_users).round(4),
+        "playcount": rng.lognormal(9.5, 1.0, n_users).astype(np.int64),
+        "rank": np.argsort(np.argsort(-pp)) + 1,
+        "fail_count": rng.lognormal(7, 1.0, n_users).astype(np.int64),
+        "exit_count": rng.lognormal(7, 1.0, n_users).astype(np.int64),
+        "max_combo": rng.integers(500, 8000, n_users),
+        "country_acronym": rng.choice(["US", "JP", "KR", "DE", "PL", "BR", "RU", "CA", "FR", "GB"], n_users),
+        "last_played": DUMP_DATE - rng.integers(0, 60, n_users).astype("timedelta64[D]"),
+        "total_seconds_played": rng.lognormal(13, 1.0, n_users).astype(np.int64),
+        "total_weighted_pp": pp.round(2),
+        "skill_stabilization_date": stabilization,
+    }), first_play
+
+
+def write_scores(path, users, first_play, beatmaps, item_p, n_scores, rng):
+    """Stream scores.csv in user chunks; (user, item) pairs are unique like the best-score table."""
+    n_users, n_items = len(users), len(beatmaps)
+    activity = rng.lognormal(0.0, USER_ACTIVITY_SIGMA, n_users)
+    counts = np.minimum(np.maximum((activity / activity.sum() * n_scores).astype(np.int64), 20), n_items // 2)
+    cdf = np.cumsum(item_p)
+    cdf[-1] = 1.0
+
+    mod_ids = beatmaps["mod_beatmap_id"].to_numpy()
+    beatmap_ids = beatmaps["beatmap_id"].to_numpy()
+    mods = beatmaps["mods_string"].to_numpy()
+    stars = beatmaps["diff_star_rating"].to_numpy()
+    user_ids = users["user_id"].to_numpy()
+    span_days = (DUMP_DATE - first_play).astype(np.int64)
+
+    written, score_id = 0, 1
+    with open(path, "w", newline="") as f:
+        for start in tqdm(range(0, n_users, USERS_PER_CHUNK), desc="Writing scores", unit="chunk"):
+            u = np.arange(start, min(start + USERS_PER_CHUNK, n_users))
+            # Oversample, drop repeated (user, item) pairs, then cut each user back to its count
+            owner = np.repeat(u, 2 * counts[u])
+            items = np.searchsorted(cdf, rng.random(len(owner)))
+            keys = rng.permutation(np.unique(owner.astype(np.int64) * n_items + items))
+            keys = keys[np.argsort(keys // n_items, kind="stable")]
+            owner = keys // n_items
+            first = np.searchsorted(owner, owner)
+            keys = keys[np.arange(len(keys)) - first < counts[owner]]
+            owner, items = keys // n_items, keys % n_items
+            n = len(keys)
+
+            days = (rng.random(n) * span_days[owner]).astype("timedelta64[D]")
+            seconds = rng.integers(0, 86_400, n).astype("timedelta64[s]")
+            date = first_play[owner] + days + seconds
+            acc = rng.beta(30, 1.5, n).round(4)
+            pp = (stars[items] ** 2.2 * 8 * acc ** 4).round(3)
+            enjoyment = (rng.normal(0, 1, n) + rng.exponential(0.3, n) - 0.3).clip(-4.875, 10.311).round(4)
+
+            chunk = pd.DataFrame({
+                "score_id": np.arange(score_id, score_id + n),
+                "mod_beatmap_id": mod_ids[items],
+                "beatmap_id": beatmap_ids[items],
+                "mods_string": mods[items],
+                "user_id": user_ids[owner],
+                "score": (acc * rng.integers(100_000, 50_000_000, n)).astype(np.int64),
+                "pp": pp,
+                "accuracy": acc,
+                "maxcombo": rng.integers(50, 3000, n),
+                "rank": np.where(acc > 0.99, "S", np.where(acc > 0.94, "A", "B")),
+                "date": date,
+                "playcount": rng.geometric(0.08, n),
+                "enjoyment": enjoyment,
+            })
+            chunk.to_csv(f, index=False, header=(start == 0))
+            score_id += n
+            written += n
+    return written
+
+
+def generate(scale, out_dir=OUTPUT_DIR, prefix="synthetic", seed=42):
+    """Write <prefix>__users.csv, <prefix>__scores.csv and beatmaps.csv; returns their paths."""
+    n_users, n_base, n_scores = SCALES[scale] if isinstance(scale, str) else scale
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    paths = {
+        "beatmaps": os.path.join(out_dir, "beatmaps.csv"),
+        "users": os.path.join(out_dir, f"{prefix}__users.csv"),
+        "scores": os.path.join(out_dir, f"{prefix}__scores.csv"),
+    }
+    beatmaps, item_p = make_beatmaps(n_base, rng)
+    beatmaps.to_csv(paths["beatmaps"], index=False)
+    users, first_play = make_users(n_users, rng)
+    users.to_csv(paths["users"], index=False)
+    n_written = write_scores(paths["scores"], users, first_play, beatmaps, item_p, n_scores, rng)
+    print(f"[INFO] Synthetic '{scale}': {n_users} users, {len(beatmaps)} items, {n_written} scores -> {out_dir}")
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate osu!-shaped synthetic scores/users/beatmaps CSVs.")
+    parser.add_argument("--scale", default="tiny", choices=list(SCALES))
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate(args.scale, args.out, seed=args.seed)
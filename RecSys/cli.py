@@ -0,0 +1,149 @@
+"""
+Single entry point for the pipeline:
+
+    python RecSys/cli.py [--config FILE] [--trace FILE] <command> [options]
+
+    split      build train/val/test splits            (pipeline/data_split.py)
+    train      train every model variant              (pipeline/model_trainer.py)
+    evaluate   evaluate the trained models            (pipeline/evaluator.py)
+    summarize  summary tables of an evaluation run    (pipeline/result_table.py)
+    recommend  SVD cross-validation + recommendations (recommend.py)
+
+split, train and evaluate take --dataset instacart to run the scripts in
+second_dataset/ instead. Every command runs the same functions as the
+script's own __main__, with its constants taken from the config file (see
+config.py; default recsys_config.json next to this file).
+
+Only the standard library is imported at startup. pandas, surprise, sklearn
+and joblib come in with the command's module, so --help and argument errors
+return immediately; the time spent on both is printed before the command runs.
+"""
+import os
+import sys
+import time
+import argparse
+import importlib
+
+START = time.perf_counter()
+
+RECSYS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, RECSYS_DIR)
+import config
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+DEFAULT_CONFIG = os.path.join(RECSYS_DIR, "recsys_config.json")
+
+DATASET_DIRS = {
+    "osu": os.path.join(RECSYS_DIR, "pipeline"),
+    "instacart": os.path.join(RECSYS_DIR, "second_dataset"),
+}
+
+# ============================================
+
+
+def load_script(name, directory):
+    """Import a script as a top-level module, as when it runs directly (joblib workers import it the same way)."""
+    from instrumentation import stage
+    sys.path.insert(0, directory)
+    ready = time.perf_counter()
+    with stage("cli_import", module=name, directory=os.path.relpath(directory, RECSYS_DIR)):
+        module = importlib.import_module(name)
+    print(f"[INFO] startup {(ready - START) * 1000:.0f} ms, imports {(time.perf_counter() - ready) * 1000:.0f} ms ({name})")
+    return module
+
+
+# ========== COMMANDS ==========
+
+def cmd_split(args):
+    data_split = load_script("data_split", DATASET_DIRS[args.dataset])
+    if args.dataset == "instacart":
+        data_split.split_and_save(data_split.load_scores())
+    else:
+        data_split.split_all(args.user_types)
+
+
+def cmd_train(args):
+    model_trainer = load_script("model_trainer", DATASET_DIRS[args.dataset])
+    if args.dataset == "instacart":
+        model_trainer.train_all()
+    else:
+        model_trainer.train_all_models()
+
+
+def cmd_evaluate(args):
+    evaluator = load_script("evaluator", DATASET_DIRS[args.dataset])
+    if args.dataset == "instacart":
+        if args.sampled:
+            evaluator.USE_SAMPLED_EVAL = True
+        evaluator.evaluate_all()
+    else:
+        evaluator.evaluate_all(args.resume, args.checkpoint_dir or evaluator.CHECKPOINT_DIR, args.sampled)
+
+
+def cmd_summarize(args):
+    result_table = load_script("result_table", DATASET_DIRS["osu"])
+    results = result_table.CHECKPOINT_DIR if args.checkpoints else args.results or result_table.RESULT_PATH
+    result_table.summarize(results, args.print_only, args.trials)
+
+
+def cmd_recommend(args):
+    recommend = load_script("recommend", RECSYS_DIR)
+    recommend.main()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Split, train, evaluate, summarize and recommend from one config file.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="JSON settings overriding the scripts' constants")
+    parser.add_argument("--trace", help="append instrumentation records (JSON lines) to this file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    split = commands.add_parser("split", help="build train/val/test splits")
+    split.add_argument("--dataset", choices=sorted(DATASET_DIRS), default="osu")
+    split.add_argument("--user-types", nargs="+", default=["top", "random"], help="osu user types to split")
+    split.set_defaults(func=cmd_split)
+
+    train = commands.add_parser("train", help="train every model variant")
+    train.add_argument("--dataset", choices=sorted(DATASET_DIRS), default="osu")
+    train.set_defaults(func=cmd_train)
+
+    evaluate = commands.add_parser("evaluate", help="evaluate the trained models")
+    evaluate.add_argument("--dataset", choices=sorted(DATASET_DIRS), default="osu")
+    evaluate.add_argument("--resume", action="store_true",
+                          help="keep finished jobs from the checkpoint directory and only run the rest (osu)")
+    evaluate.add_argument("--checkpoint-dir", help="default: the evaluator's CHECKPOINT_DIR (osu)")
+    evaluate.add_argument("--sampled", action="store_true",
+                          help="stratified sampled evaluation with early stopping on confidence interval width")
+    evaluate.set_defaults(func=cmd_evaluate)
+
+    summarize = commands.add_parser("summarize", help="summary tables of an evaluation run")
+    summarize.add_argument("--results", help="evaluation_results.csv or a checkpoint directory (default: RESULT_PATH)")
+    summarize.add_argument("--checkpoints", action="store_true", help="aggregate the evaluator's checkpoint directory")
+    summarize.add_argument("--print-only", action="store_true", help="print the tables instead of writing files")
+    summarize.add_argument("--trials", help="summarize a hparam_search.py trials table instead")
+    summarize.set_defaults(func=cmd_summarize)
+
+    recommend = commands.add_parser("recommend", help="SVD cross-validation and top-5 recommendations")
+    recommend.set_defaults(func=cmd_recommend)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.exists(args.config):
+        print(f"❌ Config file not found: {args.config}")
+        return 2
+    # Environment variables, so joblib workers read the same config and trace
+    config.use(args.config)
+    if args.trace:
+        import instrumentation
+        instrumentation.enable(args.trace)
+    print(f"[INFO] Config: {os.path.abspath(args.config)}")
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
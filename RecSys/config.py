@@ -0,0 +1,67 @@
+"""
+Shared configuration for the pipeline scripts.
+
+Every script keeps its defaults in its CONFIGURATION SECTION and ends that
+section with `configure(globals(), "<section>")`. When the RECSYS_CONFIG
+environment variable names a JSON file (cli.py sets it from --config), the
+call overrides the module's constants from that file:
+
+    {
+      "shared":    {"BEATMAPS_PATH": "../data/processed/beatmaps.csv"},
+      "evaluator": {"N_JOBS": 4, "MAX_FOLDS": 1}
+    }
+
+"shared" keys apply to every module that defines the constant; a module's
+own section is applied after it and may only set constants that exist.
+Strings starting with "./" or "../" are paths relative to the config file.
+Because the setting is an environment variable, joblib workers that import
+the same modules see the same values. Only the standard library is used
+here, so importing it costs nothing.
+"""
+import os
+import json
+
+CONFIG_ENV = "RECSYS_CONFIG"
+
+_loaded = {}
+
+
+def load(path):
+    """Parsed config file (cached per path)."""
+    path = os.path.abspath(path)
+    if path not in _loaded:
+        with open(path, encoding="utf-8") as f:
+            _loaded[path] = json.load(f)
+    return _loaded[path]
+
+
+def use(path):
+    """Select `path` as the config for this process and the worker processes it starts."""
+    os.environ[CONFIG_ENV] = os.path.abspath(path)
+
+
+def resolve(value, base_dir):
+    """Config value with "./" and "../" paths made absolute against the config file's directory."""
+    if isinstance(value, str) and value.startswith(("./", "../")):
+        return os.path.normpath(os.path.join(base_dir, value))
+    if isinstance(value, list):
+        return [resolve(v, base_dir) for v in value]
+    if isinstance(value, dict):
+        return {k: resolve(v, base_dir) for k, v in value.items()}
+    return value
+
+
+def configure(namespace, section):
+    """Override constants in a module namespace (its globals()) from the shared and `section` settings."""
+    path = os.environ.get(CONFIG_ENV)
+    if not path:
+        return
+    settings = load(path)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for key, value in settings.get("shared", {}).items():
+        if key in namespace:
+            namespace[key] = resolve(value, base_dir)
+    for key, value in settings.get(section, {}).items():
+        if key not in namespace:
+            raise KeyError(f"{path}: [{section}] has no setting {key}")
+        namespace[key] = resolve(value, base_dir)
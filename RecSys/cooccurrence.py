@@ -0,0 +1,148 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+TOP_N = 50            # neighbours kept per item
+MEASURE = "jaccard"   # "count", "lift" or "jaccard"
+MIN_SUPPORT = 2       # co-occurrences below this count are dropped (stops lift favouring rare pairs)
+BLOCK_SIZE = 512      # items per XᵀX block; at most BLOCK_SIZE x n_items pairs held at once
+
+# ============================================
+
+# Item-item co-occurrence from a binary basket x item matrix X (a basket is an
+# order, a user's history, a session...). C = XᵀX is never materialized: it is
+# computed for BLOCK_SIZE items at a time, normalized, and only each item's
+# TOP_N neighbours are kept. Used by second_dataset/cooccurrence_model.py
+# (Instacart orders) and pipeline/candidate_generation.py (osu! co-plays).
+
+Prediction = namedtuple("Prediction", ["uid", "iid", "r_ui", "est", "details"])
+
+
+# ========== NEIGHBOURS ==========
+
+def incidence_matrix(rows, cols, shape):
+    """Binary basket x item CSR matrix from (basket, item) index pairs; repeated pairs count once."""
+    X = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+    X.data[:] = 1.0
+    return X
+
+
+def normalize(counts, ci, cj, n_baskets, measure=MEASURE):
+    """
+    Similarity from co-occurrence counts c_ij and the basket frequencies
+    c_i / c_j (arrays that broadcast against `counts`):
+    count = c_ij, lift = c_ij * N / (c_i * c_j), jaccard = c_ij / (c_i + c_j - c_ij).
+    """
+    if measure == "count":
+        return counts
+    if measure == "lift":
+        denom = ci * cj / n_baskets
+    elif measure == "jaccard":
+        denom = ci + cj - counts
+    else:
+        raise ValueError(f"Unknown measure: {measure}")
+    return np.divide(counts, denom, out=np.zeros_like(counts), where=counts > 0)
+
+
+def top_neighbours(X, top_n=TOP_N, measure=MEASURE, min_support=MIN_SUPPORT, block_size=BLOCK_SIZE):
+    """
+    Top-N most similar items of every item under `measure`, as an
+    n_items x n_items CSR matrix (row i holds i's neighbours; no diagonal).
+    Each block of XᵀX stays sparse, so only pairs that co-occur are touched.
+    """
+    X = sp.csr_matrix(X, dtype=np.float32)
+    n_baskets, n_items = X.shape
+    Xt = X.T.tocsr()
+    item_counts = np.asarray(X.sum(axis=0), dtype=np.float32).ravel()
+
+    rows, cols, vals = [], [], []
+    for start in range(0, n_items, block_size):
+        block = (Xt[start:start + block_size] @ X).tocoo()
+        r, c, counts = block.row, block.col, block.data
+        keep = (counts >= min_support) & (c != r + start)
+        r, c, counts = r[keep], c[keep], counts[keep]
+        sim = normalize(counts, item_counts[r + start], item_counts[c], n_baskets, measure)
+        del block, counts
+
+        # Rank within each row by descending similarity; ties keep the lower item index
+        order = np.lexsort((c, -sim, r))
+        r, c, sim = r[order], c[order], sim[order]
+        rank = np.arange(len(r)) - np.searchsorted(r, r)
+        keep = (rank < top_n) & (sim > 0)
+        rows.append(r[keep] + start)
+        cols.append(c[keep])
+        vals.append(sim[keep])
+
+    return sp.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                         shape=(n_items, n_items), dtype=np.float32)
+
+
+# ========== SCORING ==========
+
+class CooccurrenceModel:
+    """
+    Scores (user, item) as the profile-weighted mean similarity between the
+    item and the items in the user's profile (user x item CSR of purchase
+    counts or ratings). Ids are looked up as strings, so int and str ids both
+    work. `predict()` mirrors surprise's AlgoBase.predict so the evaluators
+    can load this model like the Surprise ones.
+    """
+
+    def __init__(self, neighbours, item_ids, profiles, user_ids, measure=MEASURE, rating_scale=(0.0, 1.0)):
+        self.neighbours = neighbours.tocsr()
+        self.measure = measure
+        self.rating_scale = rating_scale
+        self.item_index = pd.Index(np.asarray(item_ids).astype(str))
+        self.user_index = pd.Index(np.asarray(user_ids).astype(str))
+        totals = np.asarray(profiles.sum(axis=1)).ravel()
+        self.profiles = sp.diags(np.divide(1.0, totals, out=np.zeros(len(totals)), where=totals > 0)) @ profiles.tocsr()
+        self.profiles = self.profiles.tocsr().astype(np.float32)
+        self._by_target = self.neighbours.T.tocsr()   # row j: similarity of every item i to j
+
+    def _codes(self, index, ids):
+        return index.get_indexer(pd.Index(np.asarray(ids).astype(str)))
+
+    def score_pairs(self, user_ids, item_ids):
+        """Raw scores for aligned arrays of user and item ids; NaN where either is unknown."""
+        u, i = self._codes(self.user_index, user_ids), self._codes(self.item_index, item_ids)
+        known = (u >= 0) & (i >= 0)
+        scores = np.full(len(u), np.nan)
+        if known.any():
+            prod = self.profiles[u[known]].multiply(self._by_target[i[known]])
+            scores[known] = np.asarray(prod.sum(axis=1)).ravel()
+        return scores
+
+    def score_candidates(self, user_id, item_ids):
+        """Raw scores of one user's candidate items, in the order given."""
+        return self.score_pairs(np.repeat(str(user_id), len(item_ids)), item_ids)
+
+    def to_scale(self, scores):
+        """Map raw scores into `rating_scale` (jaccard is already in [0, 1]; count/lift are squashed by s / (1 + s))."""
+        scores = np.asarray(scores, dtype=float)
+        if self.measure != "jaccard":
+            scores = scores / (1.0 + scores)
+        lo, hi = self.rating_scale
+        return np.clip(lo + scores * (hi - lo), lo, hi)
+
+    def predict(self, uid, iid, r_ui=None, clip=True, verbose=False):
+        score = self.score_pairs([uid], [iid])[0]
+        impossible = not np.isfinite(score)
+        est = float(self.to_scale(0.0 if impossible else score))
+        if verbose:
+            print(f"user: {uid} item: {iid} r_ui = {r_ui} est = {est:1.2f}")
+        return Prediction(uid, iid, r_ui, est, {"was_impossible": impossible})
+
+    def similar_items(self, item_id, n=10):
+        """The `n` nearest neighbours of one item as [(item_id, similarity), ...]."""
+        i = self._codes(self.item_index, [item_id])[0]
+        if i < 0:
+            return []
+        row = self.neighbours[i]
+        order = np.argsort(-row.data, kind="stable")[:n]
+        return [(self.item_index[j], float(row.data[o])) for o, j in zip(order, row.indices[order])]
@@ -0,0 +1,297 @@
+"""
+Lightweight stage instrumentation for the pipeline scripts.
+
+Tracing is switched on with the RECSYS_TRACE environment variable (path of a
+JSONL trace file) or `enable()`, which also exports the variable so joblib
+workers started afterwards trace into the same file. Every record carries the
+pid, so `aggregate()` can merge the stages of all worker processes.
+
+    with stage("load_scores", rows_in=n) as st:
+        ...
+        st.rows_out = len(df)
+
+    @instrumented("train_fold_model")
+    def train_fold_model(...): ...
+
+RECSYS_PROFILE=<stage name> additionally profiles that one stage, with
+cProfile (RECSYS_PROFILE_MODE=cprofile, default) or a stack-sampling thread
+(RECSYS_PROFILE_MODE=sample, writes folded stacks for flame graphs).
+When tracing is disabled `stage()` returns a shared no-op object.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import functools
+import threading
+from collections import Counter
+
+TRACE_ENV = "RECSYS_TRACE"
+PROFILE_ENV = "RECSYS_PROFILE"
+PROFILE_MODE_ENV = "RECSYS_PROFILE_MODE"
+
+RSS_SAMPLE_INTERVAL = 0.05   # seconds between RSS samples inside a stage
+STACK_SAMPLE_INTERVAL = 0.005
+
+_trace_path = os.environ.get(TRACE_ENV) or None
+_profile_stage = os.environ.get(PROFILE_ENV) or None
+_profile_mode = os.environ.get(PROFILE_MODE_ENV, "cprofile")
+_local = threading.local()
+_profile_runs = Counter()
+
+if _trace_path:
+    os.makedirs(os.path.dirname(os.path.abspath(_trace_path)) or ".", exist_ok=True)
+
+
+def enable(trace_path, profile_stage=None, profile_mode="cprofile"):
+    """Turn tracing on for this process and for every process spawned after this call."""
+    global _trace_path, _profile_stage, _profile_mode
+    _trace_path = os.path.abspath(trace_path)
+    _profile_stage, _profile_mode = profile_stage, profile_mode
+    os.makedirs(os.path.dirname(_trace_path), exist_ok=True)
+    os.environ[TRACE_ENV] = _trace_path
+    if profile_stage:
+        os.environ[PROFILE_ENV] = profile_stage
+        os.environ[PROFILE_MODE_ENV] = profile_mode
+
+
+def is_enabled():
+    return _trace_path is not None
+
+
+# ========== MEMORY ==========
+
+def current_rss_mb():
+    """Resident set size of this process, or None where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        return None
+
+
+class _RSSSampler(threading.Thread):
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss_mb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(RSS_SAMPLE_INTERVAL):
+            rss = current_rss_mb()
+            if rss is not None:
+                self.peak = max(self.peak or 0.0, rss)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        rss = current_rss_mb()
+        if rss is not None:
+            self.peak = max(self.peak or 0.0, rss)
+        return self.peak
+
+
+# ========== PROFILERS ==========
+
+class _StackSampler(threading.Thread):
+    """Samples the calling thread's stack and counts folded stacks (`a;b;c count`)."""
+
+    def __init__(self, thread_id):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(STACK_SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self, out_path):
+        self._done.set()
+        self.join()
+        with open(out_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _start_profiler(name):
+    if _profile_mode == "sample":
+        sampler = _StackSampler(threading.get_ident())
+        sampler.start()
+        return sampler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler, name):
+    _profile_runs[name] += 1
+    base = os.path.join(os.path.dirname(os.path.abspath(_trace_path)),
+                        f"{name}_{os.getpid()}_{_profile_runs[name]}")
+    if isinstance(profiler, _StackSampler):
+        profiler.stop(base + ".folded")
+        print(f"[PROFILE] {name}: folded stacks written to {base}.folded")
+        return
+    import pstats
+    profiler.disable()
+    profiler.dump_stats(base + ".prof")
+    print(f"[PROFILE] {name}: cProfile stats written to {base}.prof")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+
+# ========== STAGES ==========
+
+def _write_record(record):
+    line = (json.dumps(record, default=str) + "\n").encode()
+    # One O_APPEND write per record, so concurrent workers do not interleave lines
+    fd = os.open(_trace_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+class _Stage:
+
+    def __init__(self, name, rows_in, sink, meta):
+        self.name, self.rows_in, self.sink, self.meta = name, rows_in, sink, meta
+        self.rows_out = None
+        self.record = None
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        stack.append(self.name)
+
+        self.profiler = _start_profiler(self.name) if _trace_path and self.name == _profile_stage else None
+        self.rss = _RSSSampler()
+        self.rss.start()
+        self.start_time = time.time()
+        self.wall, self.cpu = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall, cpu = time.perf_counter() - self.wall, time.process_time() - self.cpu
+        peak = self.rss.stop()
+        if self.profiler is not None:
+            _stop_profiler(self.profiler, self.name)
+        _local.stack.pop()
+
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        self.record = {
+            "stage": self.name,
+            "parent": self.parent,
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "start": self.start_time,
+            "status": "ok" if exc_type is None else f"error: {exc_type.__name__}: {exc}",
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": round(peak, 1) if peak is not None else None,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_s": round(rows / wall, 1) if rows and wall > 0 else None,
+            **self.meta,
+        }
+        if self.sink is not None:
+            self.sink.append(self.record)
+        if _trace_path:
+            _write_record(self.record)
+        return False
+
+
+class _NullStage:
+    """Shared stand-in when tracing is off; attribute writes are dropped."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, key, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, rows_in=None, sink=None, **meta):
+    """
+    Context manager recording wall/CPU time, peak RSS and row throughput of
+    a named stage. Records go to the trace file when tracing is enabled and
+    to `sink` (a list) when one is given; otherwise this is a no-op.
+    """
+    if _trace_path is None and sink is None:
+        return _NULL_STAGE
+    return _Stage(name, rows_in, sink, meta)
+
+
+def instrumented(name=None):
+    """Decorator form of `stage()`; the check for an enabled trace happens per call."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace_path is None:
+                return func(*args, **kwargs)
+            with _Stage(stage_name, None, None, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ========== AGGREGATION ==========
+
+def load_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def aggregate(path):
+    """Per-stage totals across all processes of a trace."""
+    import pandas as pd
+
+    df = pd.DataFrame(load_trace(path))
+    if df.empty:
+        return df
+    rows = pd.to_numeric(df["rows_out"].fillna(df["rows_in"]), errors="coerce")
+    df = df.assign(rows=rows, failed=~df["status"].eq("ok"))
+    summary = df.groupby("stage").agg(
+        calls=("stage", "size"),
+        processes=("pid", "nunique"),
+        failed=("failed", "sum"),
+        wall_s_total=("wall_s", "sum"),
+        wall_s_max=("wall_s", "max"),
+        cpu_s_total=("cpu_s", "sum"),
+        peak_rss_mb=("peak_rss_mb", "max"),
+        rows=("rows", "sum"),
+    )
+    summary["rows_per_s"] = summary["rows"] / summary["wall_s_total"]
+    return summary.sort_values("wall_s_total", ascending=False).reset_index()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python instrumentation.py <trace.jsonl>")
+        sys.exit(1)
+    print(aggregate(sys.argv[1]).to_string(index=False, float_format="%.2f"))
@@ -0,0 +1,144 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from surprise import Dataset, Reader, accuracy
+from surprise.model_selection.validation import print_summary
+
+from instrumentation import stage
+
+
+# ========== SHARED ARRAYS ==========
+
+def share_arrays(arrays):
+    """
+    Copy each numpy array into its own shared memory block.
+    Returns the open handles (keep them alive while workers run) and
+    picklable specs that workers use to attach without copying.
+    """
+    handles, specs = [], {}
+    for key, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+        view[:] = arr
+        handles.append(shm)
+        specs[key] = (shm.name, arr.shape, arr.dtype.str)
+    return handles, specs
+
+
+def attach_arrays(specs):
+    """Attach to arrays created by `share_arrays` (zero-copy views)."""
+    handles, arrays = [], {}
+    for key, (name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        handles.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return handles, arrays
+
+
+def release_arrays(handles, unlink=False):
+    for shm in handles:
+        shm.close()
+        if unlink:
+            shm.unlink()
+
+
+# ========== FOLDS ==========
+
+def fold_bounds(n_rows, n_splits):
+    """Contiguous (start, stop) slices of a permutation, sized like sklearn's KFold."""
+    sizes = np.full(n_splits, n_rows // n_splits, dtype=np.int64)
+    sizes[:n_rows % n_splits] += 1
+    stops = np.cumsum(sizes)
+    return list(zip((stops - sizes).tolist(), stops.tolist()))
+
+
+def _run_fold(specs, start, stop, algo_class, algo_kwargs, rating_scale, measures):
+    handles, arrays = attach_arrays(specs)
+    try:
+        perm = arrays["perm"]
+        test_idx = perm[start:stop]
+        train_idx = np.concatenate([perm[:start], perm[stop:]])
+
+        train_df = pd.DataFrame({
+            "user_id": arrays["user_id"][train_idx],
+            "item_id": arrays["item_id"][train_idx],
+            "rating": arrays["rating"][train_idx],
+        })
+        reader = Reader(rating_scale=rating_scale)
+        trainset = Dataset.load_from_df(train_df, reader).build_full_trainset()
+        del train_df
+
+        algo = algo_class(**algo_kwargs)
+        start_fit = time.time()
+        with stage("cv_fold_fit", rows_in=len(train_idx), test_slice=f"{start}:{stop}"):
+            algo.fit(trainset)
+        fit_time = time.time() - start_fit
+
+        testset = list(zip(arrays["user_id"][test_idx].tolist(),
+                           arrays["item_id"][test_idx].tolist(),
+                           arrays["rating"][test_idx].tolist()))
+        start_test = time.time()
+        with stage("cv_fold_test", rows_in=len(testset), test_slice=f"{start}:{stop}"):
+            predictions = algo.test(testset)
+        test_time = time.time() - start_test
+
+        scores = {m: getattr(accuracy, m.lower())(predictions, verbose=False) for m in measures}
+        return scores, fit_time, test_time
+    finally:
+        release_arrays(handles)
+
+
+# ========== CROSS VALIDATION ==========
+
+def parallel_cross_validate(df, algo_class, algo_kwargs, columns=("user_id", "mod_beatmap_id", "enjoyment"),
+                            rating_scale=(0.0, 1.0), measures=("RMSE", "MAE"), n_splits=5, n_jobs=-1,
+                            random_state=None, verbose=True):
+    """
+    Drop-in replacement for Surprise's `cross_validate` that runs folds in
+    worker processes. The rating columns are copied into shared memory once
+    together with a single shuffled permutation; each worker only receives the
+    (start, stop) slice of its test fold and builds its trainset from views.
+    Returns the same dict layout as `cross_validate`.
+    """
+    user_col, item_col, rating_col = columns
+    n_rows = len(df)
+    rng = np.random.RandomState(random_state)
+    handles, specs = share_arrays({
+        "user_id": df[user_col].to_numpy(),
+        "item_id": df[item_col].to_numpy(),
+        "rating": df[rating_col].to_numpy(dtype=np.float64),
+        "perm": rng.permutation(n_rows),
+    })
+
+    bounds = fold_bounds(n_rows, n_splits)
+    n_workers = min(n_splits, os.cpu_count() if n_jobs in (-1, None) else n_jobs)
+
+    results = [None] * n_splits
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = {
+                pool.submit(_run_fold, specs, start, stop, algo_class, algo_kwargs, rating_scale, measures): fold
+                for fold, (start, stop) in enumerate(bounds)
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    finally:
+        release_arrays(handles, unlink=True)
+
+    test_measures = {m.lower(): np.asarray([r[0][m] for r in results]) for m in measures}
+    fit_times = tuple(r[1] for r in results)
+    test_times = tuple(r[2] for r in results)
+
+    if verbose:
+        print_summary(algo_class(**algo_kwargs), [m.lower() for m in measures], test_measures,
+                      None, fit_times, test_times, n_splits)
+
+    ret = {f"test_{m}": vals for m, vals in test_measures.items()}
+    ret["fit_time"] = fit_times
+    ret["test_time"] = test_times
+    return ret
@@ -0,0 +1,75 @@
+import os
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import joblib
+
+from ann_index import IVFPQIndex, build_item_index, item_vectors, raw_item_ids
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(SCRIPT_DIR, "models")
+
+K = 100
+N_QUERIES = 500
+NPROBE_SWEEP = [1, 2, 4, 8, 16, 32, 64]
+RERANK_SWEEP = [0, 400]
+
+# ============================================
+
+
+def exact_top_k(vectors, query, k):
+    scores = vectors @ query
+    return np.argpartition(-scores, k - 1)[:k]
+
+
+def benchmark(model, index, n_queries=N_QUERIES, k=K):
+    rng = np.random.RandomState(0)
+    inner_users = rng.choice(model.trainset.n_users, min(n_queries, model.trainset.n_users), replace=False)
+    queries = model.pu[inner_users]
+    if model.biased:
+        queries = np.hstack([queries, np.ones((len(queries), 1))])
+    queries = queries.astype(np.float32)
+
+    vectors = item_vectors(model).astype(np.float32)
+    raw_ids = raw_item_ids(model)
+
+    start = time.time()
+    truth = [exact_top_k(vectors, q, k) for q in queries]
+    exact_qps = len(queries) / (time.time() - start)
+    truth_sets = [set(raw_ids[row].tolist()) for row in truth]
+
+    rows = [{"nprobe": "exact", "rerank": "-", "recall@k": 1.0, "qps": exact_qps}]
+    for rerank in RERANK_SWEEP:
+        for nprobe in NPROBE_SWEEP:
+            start = time.time()
+            found = [index.search(q, k=k, nprobe=nprobe, rerank=rerank)[0] for q in queries]
+            qps = len(queries) / (time.time() - start)
+            recall = np.mean([len(truth_sets[j] & set(ids.tolist())) / k for j, ids in enumerate(found)])
+            rows.append({"nprobe": nprobe, "rerank": rerank, "recall@k": recall, "qps": qps})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@K / QPS of the IVF-PQ item index against exact scoring.")
+    parser.add_argument("model", help="SVD model file name in ./models, e.g. top_enjoyment_svd_fold0.pkl")
+    args = parser.parse_args()
+
+    model_path = args.model if os.path.isabs(args.model) else os.path.join(MODEL_DIR, args.model)
+    index_path = os.path.splitext(model_path)[0] + "_ann.npz"
+    model = joblib.load(model_path)
+
+    if os.path.exists(index_path):
+        index = IVFPQIndex.load(index_path)
+    else:
+        print(f"[INFO] No index at {index_path}, building one")
+        start = time.time()
+        index = build_item_index(model)
+        print(f"[INFO] Built index in {time.time() - start:.1f}s")
+
+    print(f"\n=== ANN benchmark: {os.path.basename(model_path)} | items: {model.trainset.n_items} | K={K} ===")
+    print(benchmark(model, index).to_string(index=False, float_format="%.4f"))
@@ -0,0 +1,161 @@
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+# Defaults for ~234k items with 50 factors
+N_LISTS = 512        # inverted lists (coarse k-means centroids)
+N_SUBQUANTIZERS = 13 # PQ subspaces, one uint8 code each (52 dims -> 4 per code)
+PQ_TRAIN_SIZE = 65536
+NPROBE = 16          # lists scanned per query: the recall/latency knob
+RERANK = 400         # PQ candidates rescored with the exact vectors (0 = off)
+
+# ============================================
+
+
+class IVFPQIndex:
+    """
+    Inverted-file index with product-quantized residuals for maximum inner
+    product search. Item vectors get one extra coordinate sqrt(M^2 - |x|^2)
+    (M = largest norm), which turns inner-product ranking into L2 ranking
+    for the query [q, 0], so plain k-means lists are a good partition.
+    Each list stores the PQ codes of `vector - centroid`; a query probes the
+    `nprobe` nearest lists and adds the per-subspace lookup table of
+    `q.residual` to `q.centroid`.
+    """
+
+    def __init__(self, n_lists=N_LISTS, n_subquantizers=N_SUBQUANTIZERS, random_state=42):
+        self.n_lists = n_lists
+        self.n_subquantizers = n_subquantizers
+        self.random_state = random_state
+
+    # ---------- build ----------
+
+    def build(self, vectors, ids, keep_vectors=True):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1)
+        extra = np.sqrt(np.maximum(norms.max() ** 2 - norms ** 2, 0.0))
+        exact_vectors, vectors = vectors, np.hstack([vectors, extra[:, None]]).astype(np.float32)
+        n_items, dim = vectors.shape
+        n_lists = min(self.n_lists, n_items)
+        rng = np.random.RandomState(self.random_state)
+
+        coarse = MiniBatchKMeans(n_clusters=n_lists, random_state=self.random_state,
+                                 batch_size=4096, n_init=3).fit(vectors)
+        assign = coarse.predict(vectors)
+        self.centroids = coarse.cluster_centers_.astype(np.float32)
+        self.centroid_sq_norms = (self.centroids ** 2).sum(axis=1)
+
+        # Pad so the dimension splits evenly into subspaces
+        m = self.n_subquantizers
+        self.dsub = -(-dim // m)
+        self.dim = dim
+        residuals = self._pad(vectors - self.centroids[assign])
+
+        ks = min(256, n_items)
+        sample = residuals[rng.choice(n_items, min(PQ_TRAIN_SIZE, n_items), replace=False)]
+        self.codebooks = np.empty((m, ks, self.dsub), dtype=np.float32)
+        codes = np.empty((n_items, m), dtype=np.uint8)
+        for s in range(m):
+            sub = slice(s * self.dsub, (s + 1) * self.dsub)
+            km = KMeans(n_clusters=ks, n_init=1, max_iter=25, random_state=self.random_state).fit(sample[:, sub])
+            self.codebooks[s] = km.cluster_centers_
+            codes[:, s] = km.predict(residuals[:, sub])
+
+        # Store everything in list order so a list is one contiguous slice
+        order = np.argsort(assign, kind="stable")
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+        self.codes = codes[order]
+        self.ids = np.asarray(ids)[order]
+        self.vectors = exact_vectors[order] if keep_vectors else None
+        return self
+
+    def _pad(self, x):
+        width = self.dsub * self.n_subquantizers - x.shape[1]
+        return np.pad(x, ((0, 0), (0, width))) if width else x
+
+    # ---------- search ----------
+
+    def search(self, query, k=100, nprobe=NPROBE, rerank=RERANK):
+        """Return (ids, scores) of the approximate top-k items for one query vector."""
+        exact_query = np.asarray(query, dtype=np.float32)
+        query = np.append(exact_query, np.float32(0.0))
+        list_scores = self.centroids @ query
+        # Nearest lists in L2: |q - c|^2 = |q|^2 - 2 q.c + |c|^2
+        nprobe = min(nprobe, len(list_scores))
+        probe = np.argpartition(self.centroid_sq_norms - 2 * list_scores, nprobe - 1)[:nprobe]
+
+        starts, stops = self.list_offsets[probe], self.list_offsets[probe + 1]
+        sizes = stops - starts
+        rows = np.repeat(stops - sizes.cumsum(), sizes) + np.arange(sizes.sum())
+        if len(rows) == 0:
+            return self.ids[:0], np.zeros(0, dtype=np.float32)
+
+        # Lookup table: inner product of each query subvector with every code word
+        q_sub = self._pad(query[None, :])[0].reshape(self.n_subquantizers, self.dsub)
+        lut = np.einsum("skd,sd->sk", self.codebooks, q_sub)
+        approx = np.repeat(list_scores[probe], sizes)
+        approx += lut[np.arange(self.n_subquantizers), self.codes[rows]].sum(axis=1)
+
+        n_keep = max(k, rerank) if self.vectors is not None and rerank else k
+        top = _top_n(approx, n_keep)
+        rows, scores = rows[top], approx[top]
+        if self.vectors is not None and rerank:
+            scores = self.vectors[rows] @ exact_query
+            top = _top_n(scores, k)
+            rows, scores = rows[top], scores[top]
+        return self.ids[rows], scores
+
+    # ---------- persistence ----------
+
+    def save(self, path):
+        arrays = dict(centroids=self.centroids, codebooks=self.codebooks, codes=self.codes,
+                      ids=self.ids, list_offsets=self.list_offsets,
+                      meta=np.array([self.dim, self.dsub, self.n_subquantizers, self.n_lists]))
+        if self.vectors is not None:
+            arrays["vectors"] = self.vectors
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            dim, dsub, m, n_lists = data["meta"].tolist()
+            index = cls(n_lists=n_lists, n_subquantizers=m)
+            index.dim, index.dsub = dim, dsub
+            for key in ("centroids", "codebooks", "codes", "ids", "list_offsets"):
+                setattr(index, key, data[key])
+            index.centroid_sq_norms = (index.centroids ** 2).sum(axis=1)
+            index.vectors = data["vectors"] if "vectors" in data.files else None
+        return index
+
+
+def _top_n(scores, n):
+    if n >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, n - 1)[:n]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+# ========== SURPRISE SVD HELPERS ==========
+
+def item_vectors(model):
+    """[q_i, b_i] so that the user query [p_u, 1] ranks exactly like predict() (mu + b_u is constant)."""
+    if model.biased:
+        return np.hstack([model.qi, model.bi[:, None]])
+    return model.qi
+
+
+def user_query(model, raw_uid):
+    pu = model.pu[model.trainset.to_inner_uid(raw_uid)]
+    return np.append(pu, 1.0) if model.biased else pu
+
+
+def raw_item_ids(model):
+    trainset = model.trainset
+    return np.array([trainset.to_raw_iid(i) for i in range(trainset.n_items)])
+
+
+def build_item_index(model, **kwargs):
+    return IVFPQIndex(**kwargs).build(item_vectors(model), raw_item_ids(model))
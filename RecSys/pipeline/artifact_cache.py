@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import argparse
+import tempfile
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, "cache")
+FINGERPRINT_INDEX = "fingerprints.json"   # content hashes memoized by (size, mtime)
+
+MAX_CACHE_GB = 50
+MAX_AGE_DAYS = 30
+HASH_BLOCK = 1 << 22
+
+# ============================================
+
+
+# ========== KEYS ==========
+
+def _canonical(obj):
+    """JSON-able form of configs: classes by qualified name, dicts sorted, tuples as lists."""
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in sorted(obj.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if isinstance(obj, type):
+        return f"{obj.__module__}.{obj.__qualname__}"
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    return repr(obj)
+
+
+def _sha256(payload):
+    return hashlib.sha256(payload.encode() if isinstance(payload, str) else payload).hexdigest()
+
+
+def artifact_key(kind, **parts):
+    """Key of an artifact from its input fingerprints, config and code version."""
+    return _sha256(json.dumps({"kind": kind, **_canonical(parts)}, sort_keys=True))
+
+
+def code_version(*objects, packages=()):
+    """Hash of the source of the functions/modules that build an artifact, plus library versions."""
+    h = hashlib.sha256()
+    for obj in objects:
+        try:
+            h.update(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            h.update(repr(obj).encode())
+    for name in packages:
+        module = __import__(name)
+        h.update(f"{name}=={getattr(module, '__version__', '?')}".encode())
+    return h.hexdigest()[:16]
+
+
+def frame_fingerprint(df):
+    """Content hash of a DataFrame (values and column names, not the index)."""
+    h = hashlib.sha256(",".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ========== CACHE ==========
+
+class ArtifactCache:
+    """
+    Content-addressed store under `root`: every artifact is a directory
+    <root>/<kind>/<key[:2]>/<key>/ holding its files and a meta.json.
+    Entries are written to a temporary directory and renamed into place, so
+    readers never see a half-written artifact. meta.json's mtime is the
+    last-use time that eviction orders by.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_gb=MAX_CACHE_GB, max_age_days=MAX_AGE_DAYS):
+        self.root = root
+        self.max_bytes = int(max_gb * 2 ** 30)
+        self.max_age = max_age_days * 86400
+        self.hits, self.misses = Counter(), Counter()
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, FINGERPRINT_INDEX)
+        self._index = None
+
+    def _entry_dir(self, kind, key):
+        return os.path.join(self.root, kind, key[:2], key)
+
+    # ----- fingerprints -----
+
+    def file_fingerprint(self, path):
+        """sha256 of a file's content; rehashed only when its size or mtime changes."""
+        if self._index is None:
+            try:
+                with open(self._index_path) as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        memo = self._index.get(path)
+        if memo and memo["size"] == st.st_size and memo["mtime_ns"] == st.st_mtime_ns:
+            return memo["sha256"]
+
+        digest = _hash_file(path)
+        self._index[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+        return digest
+
+    # ----- entries -----
+
+    def lookup(self, kind, key):
+        """Entry directory for `key`, or None. Counts a hit or miss for `kind`."""
+        entry = self._entry_dir(kind, key)
+        meta = os.path.join(entry, "meta.json")
+        if os.path.exists(meta):
+            self.hits[kind] += 1
+            os.utime(meta)
+            return entry
+        self.misses[kind] += 1
+        return None
+
+    def store(self, kind, key, files, meta=None):
+        """
+        Copy `files` ({name in entry: source path}) into the entry for `key`.
+        If another process stored the same key first, its entry is kept.
+        """
+        entry = self._entry_dir(kind, key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(entry), prefix=".tmp_")
+        try:
+            for name, src in files.items():
+                shutil.copyfile(src, os.path.join(tmp, name))
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump({"kind": kind, "key": key, "created": time.time(), "files": sorted(files),
+                           **_canonical(meta or {})}, f, indent=2)
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.exists(os.path.join(entry, "meta.json")):
+                raise
+        return entry
+
+    def store_json(self, kind, key, value, meta=None):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(_canonical(value), f)
+        try:
+            return self.store(kind, key, {"value.json": tmp}, meta)
+        finally:
+            os.remove(tmp)
+
+    @staticmethod
+    def load_json(entry):
+        with open(os.path.join(entry, "value.json")) as f:
+            return json.load(f)
+
+    @staticmethod
+    def restore(entry, name, dest):
+        """Copy a cached file to `dest`. A copy, not a link, so later writes to `dest` cannot change the entry."""
+        src = os.path.join(entry, name)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dest)), prefix=".restore_")
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, dest)
+        except OSError:
+            os.remove(tmp)
+            raise
+        return dest
+
+    # ----- housekeeping -----
+
+    def entries(self):
+        rows = []
+        for kind in sorted(os.listdir(self.root)):
+            kind_dir = os.path.join(self.root, kind)
+            if not os.path.isdir(kind_dir):
+                continue
+            for shard in os.listdir(kind_dir):
+                shard_dir = os.path.join(kind_dir, shard)
+                for key in os.listdir(shard_dir):
+                    entry = os.path.join(shard_dir, key)
+                    meta = os.path.join(entry, "meta.json")
+                    if key.startswith(".tmp_") or not os.path.exists(meta):
+                        continue
+                    size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                    rows.append({"kind": kind, "key": key, "path": entry, "bytes": size,
+                                 "last_used": os.path.getmtime(meta)})
+        return pd.DataFrame(rows, columns=["kind", "key", "path", "bytes", "last_used"])
+
+    def evict(self, now=None):
+        """Drop entries unused for longer than max_age, then least recently used ones above max_bytes."""
+        now = time.time() if now is None else now
+        df = self.entries().sort_values("last_used", ascending=False)
+        too_old = now - df["last_used"] > self.max_age
+        over_size = df["bytes"].cumsum() > self.max_bytes
+        victims = df[too_old | over_size]
+        for path in victims["path"]:
+            shutil.rmtree(path, ignore_errors=True)
+        if len(victims):
+            print(f"[CACHE] Evicted {len(victims)} entries ({victims['bytes'].sum() / 2 ** 20:.1f} MB)")
+        return victims
+
+    def report(self):
+        kinds = sorted(set(self.hits) | set(self.misses))
+        for kind in kinds:
+            print(f"[CACHE] {kind:<12} hits: {self.hits[kind]:>4} | misses: {self.misses[kind]:>4}")
+        if not kinds:
+            print("[CACHE] no lookups")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or trim the pipeline artifact cache.")
+    parser.add_argument("--evict", action="store_true", help="apply the size/age limits now")
+    parser.add_argument("--max-gb", type=float, default=MAX_CACHE_GB)
+    parser.add_argument("--max-age-days", type=float, default=MAX_AGE_DAYS)
+    args = parser.parse_args()
+
+    cache = ArtifactCache(max_gb=args.max_gb, max_age_days=args.max_age_days)
+    if args.evict:
+        cache.evict()
+    df = cache.entries()
+    if df.empty:
+        print(f"[CACHE] {CACHE_DIR} is empty")
+    else:
+        summary = df.groupby("kind").agg(entries=("key", "size"), mb=("bytes", lambda b: b.sum() / 2 ** 20))
+        print(summary.to_string(float_format="%.1f"))
@@ -0,0 +1,268 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import joblib
+from tqdm import tqdm
+
+from ann_index import IVFPQIndex, build_item_index, user_query, raw_item_ids
+from model_trainer import VARIANTS, MODEL_DIR
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import stage
+from cooccurrence import incidence_matrix, top_neighbours
+from batch_predict import BatchPredictor
+from config import configure
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BEATMAPS_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "processed", "beatmaps.csv")
+REPORT_CSV = os.path.join(SCRIPT_DIR, "candidate_recall.csv")
+
+N_CANDIDATES = 300         # per user, after merging and de-duplicating the sources
+N_FACTOR = 150             # ANN neighbours of the user's factor vector
+N_COPLAY = 150             # co-play neighbours of the user's best-rated plays
+N_POPULAR = 100            # most played maps in the user's star-rating bands
+
+STAR_BAND_WIDTH = 0.5      # stars per popularity band
+SEED_ITEMS = 20            # best-rated plays whose co-play neighbours are collected
+COPLAY_TOP_N = 50          # neighbours kept per item
+COPLAY_MEASURE = "jaccard"
+COPLAY_MIN_SUPPORT = 3
+COPLAY_MAX_ITEMS_PER_USER = 200   # best-rated plays per user in the co-play matrix (cost ~ sum of squares)
+COPLAY_BLOCK_SIZE = 512           # items per XᵀX block
+
+N_EVAL_USERS = 1000
+SEED = 42
+
+configure(globals(), "candidate_generation")
+
+# ============================================
+
+
+def _merge_sources(sources, n):
+    """Round-robin merge of ranked item lists, first occurrence wins, at most `n` items."""
+    merged, origin, seen = [], [], set()
+    for rank in range(max((len(s) for s in sources.values()), default=0)):
+        for name, items in sources.items():
+            if rank < len(items) and items[rank] not in seen:
+                seen.add(items[rank])
+                merged.append(items[rank])
+                origin.append(name)
+                if len(merged) == n:
+                    return merged, origin
+    return merged, origin
+
+
+class CandidateGenerator:
+    """
+    First stage of full-catalog recommendation. Three precomputed indices
+    over the inner item ids of a fitted Surprise SVD fold model:
+
+    - factor: the IVF-PQ index of the model's item factors (<model>_ann.npz)
+    - coplay: top-N co-play neighbours per item (users as baskets)
+    - popular: items of every star-rating band sorted by play count
+
+    `candidates(uid)` merges the three sources round-robin, skipping the
+    user's own training plays, so the heavy model only scores a few hundred
+    items instead of the whole catalog.
+    """
+
+    def __init__(self, model, ann_index, neighbours, band_items, band_offsets, item_band):
+        self.model = model
+        self.trainset = model.trainset
+        self.ann_index = ann_index
+        self.neighbours = neighbours
+        self.band_items, self.band_offsets, self.item_band = band_items, band_offsets, item_band
+        self.raw_ids = raw_item_ids(model)
+        self.raw_index = pd.Index(self.raw_ids)
+
+    # ---------- build ----------
+
+    @classmethod
+    def build(cls, model, beatmap_df, ann_index=None):
+        trainset = model.trainset
+        with stage("candidates_ann_index", rows_in=trainset.n_items):
+            ann_index = ann_index or build_item_index(model)
+
+        with stage("candidates_coplay", rows_in=trainset.n_ratings, measure=COPLAY_MEASURE):
+            rows, cols = [], []
+            for u, ratings in trainset.ur.items():
+                best = sorted(ratings, key=lambda x: -x[1])[:COPLAY_MAX_ITEMS_PER_USER]
+                rows.extend([u] * len(best))
+                cols.extend(i for i, _ in best)
+            X = incidence_matrix(np.asarray(rows, dtype=np.int32), np.asarray(cols, dtype=np.int32),
+                                 (trainset.n_users, trainset.n_items))
+            neighbours = top_neighbours(X, COPLAY_TOP_N, COPLAY_MEASURE, COPLAY_MIN_SUPPORT, COPLAY_BLOCK_SIZE)
+            del X, rows, cols
+
+        with stage("candidates_star_bands", rows_in=trainset.n_items):
+            stars = (beatmap_df.drop_duplicates("mod_beatmap_id").set_index("mod_beatmap_id")["diff_star_rating"]
+                     .reindex(raw_item_ids(model)).to_numpy())
+            # Band 0 collects maps without a star rating
+            item_band = np.where(np.isfinite(stars), np.floor(np.nan_to_num(stars) / STAR_BAND_WIDTH) + 1, 0)
+            item_band = item_band.astype(np.int32)
+            plays = np.array([len(trainset.ir[i]) for i in range(trainset.n_items)])
+            band_items = np.lexsort((-plays, item_band)).astype(np.int32)
+            band_offsets = np.concatenate([[0], np.cumsum(np.bincount(item_band))])
+        return cls(model, ann_index, neighbours, band_items, band_offsets, item_band)
+
+    # ---------- persistence ----------
+
+    def save(self, path):
+        np.savez(path, band_items=self.band_items, band_offsets=self.band_offsets, item_band=self.item_band,
+                 nb_data=self.neighbours.data, nb_indices=self.neighbours.indices, nb_indptr=self.neighbours.indptr)
+
+    @classmethod
+    def load(cls, path, model, ann_index):
+        with np.load(path) as data:
+            n_items = model.trainset.n_items
+            neighbours = sp.csr_matrix((data["nb_data"], data["nb_indices"], data["nb_indptr"]),
+                                       shape=(n_items, n_items))
+            return cls(model, ann_index, neighbours, data["band_items"], data["band_offsets"], data["item_band"])
+
+    # ---------- query ----------
+
+    def _factor(self, uid, seen, n):
+        ids, _ = self.ann_index.search(user_query(self.model, uid).astype(np.float32), k=n + len(seen))
+        inner = self.raw_index.get_indexer(ids)
+        return [i for i in inner.tolist() if i >= 0 and i not in seen][:n]
+
+    def _coplay(self, ratings, seen, n):
+        best = sorted(ratings, key=lambda x: -x[1])[:SEED_ITEMS]
+        seeds = np.array([i for i, _ in best])
+        weights = np.array([r for _, r in best])
+        scores = sp.csr_matrix(weights[None, :]) @ self.neighbours[seeds]
+        order = np.argsort(-scores.data, kind="stable")
+        return [i for i in scores.indices[order].tolist() if i not in seen][:n]
+
+    def _popular(self, seen, n):
+        bands = np.bincount(self.item_band[list(seen)], minlength=len(self.band_offsets) - 1)
+        quota = np.ceil(n * bands / bands.sum()).astype(int)
+        items = []
+        for band in np.argsort(-bands, kind="stable"):
+            if quota[band] == 0:
+                break
+            start, stop = self.band_offsets[band], self.band_offsets[band + 1]
+            picked = [i for i in self.band_items[start:stop][:quota[band] + len(seen)].tolist() if i not in seen]
+            items.extend(picked[:quota[band]])
+        return items[:n]
+
+    def candidates(self, uid, n=N_CANDIDATES):
+        """(raw item ids, source of each) for a user of the model's trainset; unseen items only."""
+        ratings = self.trainset.ur[self.trainset.to_inner_uid(uid)]
+        seen = {i for i, _ in ratings}
+        sources = {
+            "factor": self._factor(uid, seen, N_FACTOR),
+            "coplay": self._coplay(ratings, seen, N_COPLAY),
+            "popular": self._popular(seen, N_POPULAR),
+        }
+        merged, origin = _merge_sources(sources, n)
+        return self.raw_ids[merged], origin
+
+
+def score_candidates(predictor, uid, raw_iids):
+    """Second stage: the heavy model (a batch_predict.BatchPredictor) ranks only the candidates."""
+    scores, _ = predictor.predict(np.repeat(uid, len(raw_iids)), raw_iids)
+    return raw_iids[np.argsort(-scores, kind="stable")], np.sort(scores)[::-1]
+
+
+# ========== REPORT ==========
+
+def load_generator(model_path, beatmap_df):
+    """Generator for one SVD fold model; indices are cached next to the model (<model>_candidates.npz)."""
+    model = joblib.load(model_path)
+    base = os.path.splitext(model_path)[0]
+    ann_path, cand_path = base + "_ann.npz", base + "_candidates.npz"
+    ann_index = IVFPQIndex.load(ann_path) if os.path.exists(ann_path) else None
+    if ann_index and os.path.exists(cand_path) and os.path.getmtime(cand_path) >= os.path.getmtime(model_path):
+        return CandidateGenerator.load(cand_path, model, ann_index)
+    generator = CandidateGenerator.build(model, beatmap_df, ann_index)
+    generator.save(cand_path)
+    print(f"✔ Saved candidate indices: {cand_path}")
+    return generator
+
+
+def candidate_report(generator, val_df, n_users=N_EVAL_USERS, seed=SEED):
+    """
+    Candidate recall against the held-out (validation) plays of up to
+    `n_users` users, overall and per source, and per-user latency of
+    candidate generation and of scoring the candidates with the model.
+    """
+    trainset = generator.trainset
+    held_out = val_df[val_df["user_id"].map(trainset._raw2inner_id_users.__contains__)]
+    held_out = held_out.groupby("user_id")["mod_beatmap_id"].apply(set)
+    rng = np.random.RandomState(seed)
+    users = rng.permutation(held_out.index.to_numpy())[:n_users]
+
+    predictor = BatchPredictor(generator.model)
+    rows = []
+    for uid in tqdm(users, desc="Candidate recall", unit="user", leave=False):
+        start = time.perf_counter()
+        cands, origin = generator.candidates(uid)
+        gen_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        score_candidates(predictor, uid, cands)
+        score_ms = (time.perf_counter() - start) * 1000
+
+        truth = held_out[uid]
+        hits = [src for iid, src in zip(cands.tolist(), origin) if iid in truth]
+        row = {"user_id": uid, "n_candidates": len(cands), "n_held_out": len(truth),
+               "recall": len(hits) / len(truth), "generate_ms": gen_ms, "score_ms": score_ms}
+        for src in ("factor", "coplay", "popular"):
+            row[f"recall_{src}"] = hits.count(src) / len(truth)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize_report(per_user, prefix, n_items):
+    return {
+        "variant": prefix,
+        "users": len(per_user),
+        "n_items": n_items,
+        "candidates": per_user["n_candidates"].mean(),
+        "recall": per_user["recall"].mean(),
+        **{f"recall_{src}": per_user[f"recall_{src}"].mean() for src in ("factor", "coplay", "popular")},
+        "generate_ms_p50": per_user["generate_ms"].quantile(0.5),
+        "generate_ms_p95": per_user["generate_ms"].quantile(0.95),
+        "score_ms_p50": per_user["score_ms"].quantile(0.5),
+        "score_ms_p95": per_user["score_ms"].quantile(0.95),
+        # Scoring time is linear in the number of items: what ranking the whole catalog would cost
+        "full_catalog_score_ms_est": per_user["score_ms"].median() * n_items / max(per_user["n_candidates"].median(), 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Two-stage candidate generation: recall and latency report.")
+    parser.add_argument("--variants", nargs="+", default=[f"{u}_{r}" for u, r in VARIANTS])
+    parser.add_argument("--fold", type=int, default=0)
+    parser.add_argument("--users", type=int, default=N_EVAL_USERS)
+    parser.add_argument("--beatmaps", default=BEATMAPS_PATH)
+    parser.add_argument("--out", default=REPORT_CSV)
+    args = parser.parse_args()
+
+    beatmap_df = pd.read_csv(args.beatmaps, usecols=["mod_beatmap_id", "diff_star_rating"])
+    summary = []
+    for variant in args.variants:
+        prefix = f"{variant}_svd_fold{args.fold}"
+        model_path = os.path.join(MODEL_DIR, f"{prefix}.pkl")
+        val_path = os.path.join(MODEL_DIR, f"{prefix}_val.csv")
+        if not (os.path.exists(model_path) and os.path.exists(val_path)):
+            print(f"[WARN] Missing files for {prefix}. Skipping.")
+            continue
+
+        print(f"\n=== Candidate generation: {prefix} ===")
+        generator = load_generator(model_path, beatmap_df)
+        per_user = candidate_report(generator, pd.read_csv(val_path), args.users)
+        summary.append(summarize_report(per_user, prefix, generator.trainset.n_items))
+        print(pd.DataFrame([summary[-1]]).to_string(index=False, float_format="%.4f"))
+
+    if summary:
+        pd.DataFrame(summary).to_csv(args.out, index=False)
+        print(f"\n✅ Candidate report saved to {args.out}")
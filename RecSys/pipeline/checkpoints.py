@@ -0,0 +1,59 @@
+import os
+import json
+import time
+import tempfile
+
+import pandas as pd
+
+# One JSON file per finished job: {"job", "status", "row", "error", "finished", "pid"}.
+# status is "ok" (row holds the result), "skipped" (missing inputs / no valid users)
+# or "failed" (error holds the traceback). Only "ok" jobs are skipped on --resume.
+
+STATUS_OK = "ok"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
+
+def checkpoint_path(checkpoint_dir, job):
+    return os.path.join(checkpoint_dir, f"{job}.json")
+
+
+def write_checkpoint(checkpoint_dir, job, status, row=None, error=None):
+    """Atomically (write + rename) record the outcome of one job."""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    record = {"job": job, "status": status, "row": row, "error": error,
+              "finished": time.time(), "pid": os.getpid()}
+    fd, tmp = tempfile.mkstemp(dir=checkpoint_dir, prefix=".tmp_", suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(record, f, default=float)
+    os.replace(tmp, checkpoint_path(checkpoint_dir, job))
+    return record
+
+
+def read_checkpoints(checkpoint_dir):
+    if not os.path.isdir(checkpoint_dir):
+        return []
+    records = []
+    for name in sorted(os.listdir(checkpoint_dir)):
+        if name.startswith(".tmp_") or not name.endswith(".json"):
+            continue
+        with open(os.path.join(checkpoint_dir, name)) as f:
+            records.append(json.load(f))
+    return records
+
+
+def completed_jobs(checkpoint_dir):
+    return {r["job"] for r in read_checkpoints(checkpoint_dir) if r["status"] == STATUS_OK}
+
+
+def clear_checkpoints(checkpoint_dir, jobs):
+    for job in jobs:
+        path = checkpoint_path(checkpoint_dir, job)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def checkpoint_results(checkpoint_dir):
+    """Result rows of all successful jobs so far (safe to call while a run is still writing)."""
+    rows = [r["row"] for r in read_checkpoints(checkpoint_dir) if r["status"] == STATUS_OK]
+    return pd.DataFrame(rows)
@@ -0,0 +1,208 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree, BallTree
+from tqdm import tqdm
+
+from evaluator import BEATMAPS_PATH, PERCENTILE, SENSITIVE_ATTRS
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+# Users below model_trainer.MIN_USER_RATINGS have no collaborative model: they get the
+# maps nearest to their plays (or to a target skill) in standardized attribute space
+ATTRIBUTES = ["diff_star_rating", "aim", "speed", "diff_approach", "bpm", "hit_length"]
+ATTRIBUTE_WEIGHTS = {"diff_star_rating": 2.0}   # scale of a standardized attribute in the distance (default 1)
+
+TREE = "kd"          # "kd" or "ball"
+LEAF_SIZE = 40
+K = 20
+OVERFETCH = 4        # neighbours fetched per wanted result before ceiling filtering (grows until enough)
+STAR_FILL_WINDOW = 50   # maps nearest in star rating whose medians fill attributes missing from a target
+
+# Evaluation from the scores file: each sampled user's first FEW_PLAYS plays are the query,
+# the remaining plays are the held-out set for hit rate
+FEW_PLAYS = 5
+N_EVAL_USERS = 1000
+SEED = 42
+
+# ============================================
+
+
+class ColdStartIndex:
+    """
+    One KD-tree (or ball tree) per mods_string over z-scored, weighted
+    beatmap attributes. Standardization uses all maps, so distances are
+    comparable across mods. Results respect the evaluator's percentile
+    ceilings on SENSITIVE_ATTRS: a map above the ceiling on any of them is
+    skipped.
+    """
+
+    def __init__(self, beatmap_df, attributes=ATTRIBUTES, weights=ATTRIBUTE_WEIGHTS, tree=TREE, leaf_size=LEAF_SIZE):
+        df = beatmap_df.dropna(subset=attributes).drop_duplicates("mod_beatmap_id")
+        self.attributes = list(attributes)
+        values = df[self.attributes].to_numpy(dtype=np.float64)
+        self.mean, self.std = values.mean(axis=0), values.std(axis=0)
+        self.std[self.std == 0] = 1.0
+        self.scale = np.array([weights.get(a, 1.0) for a in self.attributes]) / self.std
+        tree_class = {"kd": KDTree, "ball": BallTree}[tree]
+
+        self.id_index = pd.Index(df["mod_beatmap_id"].to_numpy())
+        self.values = df[self.attributes].to_numpy(dtype=np.float64)
+        self.sensitive = df[SENSITIVE_ATTRS].to_numpy(dtype=np.float64)
+        self.mods = df["mods_string"].to_numpy()
+        self.groups = {}
+        for mods, group in df.groupby("mods_string"):
+            z = self._standardize(group[self.attributes].to_numpy(dtype=np.float64))
+            order = np.argsort(group["diff_star_rating"].to_numpy(), kind="stable")
+            self.groups[mods] = {
+                "tree": tree_class(z, leaf_size=leaf_size),
+                "ids": group["mod_beatmap_id"].to_numpy(),
+                "sensitive": group[SENSITIVE_ATTRS].to_numpy(dtype=np.float64),
+                "by_star": order,
+                "stars": group["diff_star_rating"].to_numpy()[order],
+                "values": group[self.attributes].to_numpy(dtype=np.float64),
+            }
+
+    def _standardize(self, values):
+        return (values - self.mean) * self.scale
+
+    def _group(self, mods):
+        if mods not in self.groups:
+            raise ValueError(f"unknown mods {mods!r}; available: {', '.join(sorted(self.groups))}")
+        return self.groups[mods]
+
+    # ---------- targets ----------
+
+    def complete_target(self, target, mods):
+        """
+        Attribute vector for a partial target (dict with at least
+        diff_star_rating): missing attributes are the medians of the
+        STAR_FILL_WINDOW maps of `mods` closest in star rating.
+        """
+        group = self._group(mods)
+        if any(a not in target for a in self.attributes):
+            pos = np.searchsorted(group["stars"], target["diff_star_rating"])
+            lo = max(0, pos - STAR_FILL_WINDOW // 2)
+            window = group["by_star"][lo:lo + STAR_FILL_WINDOW]
+            fill = np.median(group["values"][window], axis=0)
+        else:
+            fill = np.zeros(len(self.attributes))
+        return np.array([target.get(a, fill[j]) for j, a in enumerate(self.attributes)], dtype=np.float64)
+
+    def profile(self, play_ids, percentile=PERCENTILE):
+        """
+        Per mods_string median attributes of a user's plays, their play
+        share, and the evaluator's ceilings (percentile of each sensitive
+        attribute over all plays).
+        """
+        rows = self.id_index.get_indexer(np.unique(play_ids))
+        rows = rows[rows >= 0]
+        if len(rows) == 0:
+            return {}, {}, None
+        mods, counts = np.unique(self.mods[rows], return_counts=True)
+        targets = {m: np.median(self.values[rows[self.mods[rows] == m]], axis=0) for m in mods}
+        shares = dict(zip(mods, counts / len(rows)))
+        ceilings = dict(zip(SENSITIVE_ATTRS, np.quantile(self.sensitive[rows], percentile / 100.0, axis=0)))
+        return targets, shares, ceilings
+
+    # ---------- queries ----------
+
+    def query(self, target_values, mods, k=K, ceilings=None, exclude=()):
+        """ids and distances of the `k` nearest maps of `mods` to a raw attribute vector, below `ceilings`."""
+        group = self._group(mods)
+        n = len(group["ids"])
+        limits = None if ceilings is None else np.array([ceilings[a] for a in SENSITIVE_ATTRS], dtype=np.float64)
+        exclude = set(exclude)
+        z = self._standardize(np.asarray(target_values, dtype=np.float64))[None, :]
+
+        fetch = min(n, k * OVERFETCH + len(exclude))
+        while True:
+            dist, pos = group["tree"].query(z, k=fetch)
+            dist, pos = dist[0], pos[0]
+            keep = np.ones(len(pos), dtype=bool)
+            if limits is not None:
+                keep &= ~(group["sensitive"][pos] > limits).any(axis=1)
+            ids = group["ids"][pos]
+            if exclude:
+                keep &= ~np.isin(ids, list(exclude))
+            if keep.sum() >= k or fetch == n:
+                return ids[keep][:k], dist[keep][:k]
+            fetch = min(n, fetch * OVERFETCH)
+
+    def recommend_for_plays(self, play_ids, k=K):
+        """`k` maps for a user with a few plays, split across the mods they play by play share."""
+        targets, shares, ceilings = self.profile(play_ids)
+        rows = []
+        quota = {m: int(np.ceil(k * s)) for m, s in shares.items()}
+        for mods, target in targets.items():
+            ids, dist = self.query(target, mods, quota[mods], ceilings, exclude=play_ids)
+            rows += [(i, mods, d) for i, d in zip(ids, dist)]
+        rows.sort(key=lambda r: r[2])
+        return pd.DataFrame(rows[:k], columns=["mod_beatmap_id", "mods_string", "distance"])
+
+    def recommend_for_skill(self, skill, mods="NM", k=K):
+        """`k` maps near a target skill (dict of attributes; diff_star_rating required), never above it."""
+        ceilings = {a: skill.get(a, np.inf) for a in SENSITIVE_ATTRS}
+        ids, dist = self.query(self.complete_target(skill, mods), mods, k, ceilings)
+        return pd.DataFrame({"mod_beatmap_id": ids, "mods_string": mods, "distance": dist})
+
+
+# ========== EVALUATION ==========
+
+def evaluate_cold_start(index, scores_df, k=K, few_plays=FEW_PLAYS, n_users=N_EVAL_USERS, seed=SEED):
+    """
+    Simulated new players: a user's first `few_plays` plays are the query
+    and their later plays the held-out set. Returns per-user hit rate and
+    query latency.
+    """
+    scores_df = scores_df.sort_values(["user_id", "date"], kind="stable")
+    rng = np.random.RandomState(seed)
+    counts = scores_df["user_id"].value_counts()
+    users = rng.permutation(counts.index[counts > few_plays].to_numpy())[:n_users]
+
+    rows = []
+    by_user = scores_df[scores_df["user_id"].isin(users)].groupby("user_id")["mod_beatmap_id"]
+    for uid, plays in tqdm(by_user, desc="Cold-start users", unit="user", leave=False):
+        plays = plays.to_numpy()
+        start = time.perf_counter()
+        recs = index.recommend_for_plays(plays[:few_plays], k)
+        latency = (time.perf_counter() - start) * 1000
+        held_out = set(plays[few_plays:].tolist())
+        rows.append({"user_id": uid, "n_recs": len(recs), "hits": len(held_out & set(recs["mod_beatmap_id"])),
+                     "hit_rate": len(held_out & set(recs["mod_beatmap_id"])) / max(len(recs), 1),
+                     "latency_ms": latency})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-based cold-start recommendations (attribute-space trees).")
+    parser.add_argument("--beatmaps", default=BEATMAPS_PATH)
+    parser.add_argument("--tree", default=TREE, choices=["kd", "ball"])
+    parser.add_argument("--k", type=int, default=K)
+    parser.add_argument("--plays", nargs="+", type=int, help="mod_beatmap_ids of a new player's plays")
+    parser.add_argument("--star", type=float, help="target star rating (other attributes optional)")
+    parser.add_argument("--aim", type=float)
+    parser.add_argument("--speed", type=float)
+    parser.add_argument("--mods", default="NM")
+    parser.add_argument("--evaluate", metavar="SCORES_CSV", help="hit rate / latency on simulated new players")
+    args = parser.parse_args()
+
+    start = time.time()
+    index = ColdStartIndex(pd.read_csv(args.beatmaps), tree=args.tree)
+    print(f"[INFO] Built {len(index.groups)} {args.tree}-trees over {len(index.id_index)} maps in {time.time() - start:.1f}s")
+
+    if args.plays:
+        print(index.recommend_for_plays(args.plays, args.k).to_string(index=False))
+    if args.star is not None:
+        skill = {"diff_star_rating": args.star, "aim": args.aim, "speed": args.speed}
+        skill = {a: v for a, v in skill.items() if v is not None}
+        print(index.recommend_for_skill(skill, args.mods, args.k).to_string(index=False))
+    if args.evaluate:
+        scores = pd.read_csv(args.evaluate, usecols=["user_id", "mod_beatmap_id", "date"], parse_dates=["date"])
+        per_user = evaluate_cold_start(index, scores, args.k)
+        print(f"\n=== Cold start: first {FEW_PLAYS} plays -> top {args.k} | {len(per_user)} users ===")
+        print(f"hit rate@{args.k}: {per_user['hit_rate'].mean():.4f} | "
+              f"latency p50 {per_user['latency_ms'].median():.2f} ms, p95 {per_user['latency_ms'].quantile(0.95):.2f} ms")
@@ -1,8 +1,14 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import stage
+from artifact_cache import ArtifactCache, artifact_key, code_version
+from config import configure
+
 # Paths to data
 DATA_VARIANTS = {
     "top": {
@@ -16,10 +22,15 @@ DATA_VARIANTS = {
 }
 
 OUTPUT_DIR = "./generated_splits_cf"
+
+USE_CACHE = True  # restore splits from the artifact cache when the raw CSVs and this code are unchanged
+RATING_TYPES = ["enjoyment", "playcount"]
+
+configure(globals(), "data_split")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
-def load_filtered_scores(user_type: str):
+def load_scores(user_type: str):
     print(f"[INFO] Loading scores for user type: {user_type}")
     scores_path = DATA_VARIANTS[user_type]["scores"]
     users_path = DATA_VARIANTS[user_type]["users"]
@@ -33,17 +44,29 @@ def load_filtered_scores(user_type: str):
     dtype = {'user_id': np.int32, 'enjoyment': np.float32, 'playcount': np.float32}
     conv = {'mod_beatmap_id': lambda x: np.int64(float(x))}
 
-    scores = pd.read_csv(scores_path, usecols=usecols, dtype=dtype, converters=conv, parse_dates=['date'])
-    scores = scores.join(users, on='user_id', how='inner')
-    del users
+    with stage("load_scores", user_type=user_type) as st:
+        scores = pd.read_csv(scores_path, usecols=usecols, dtype=dtype, converters=conv, parse_dates=['date'])
+        st.rows_out = len(scores)
+    return scores, users
+
 
-    before = len(scores)
-    scores = scores[scores['date'] >= scores['skill_stabilization_date']]
+def filter_stabilized(scores, users):
+    with stage("filter_stabilized", rows_in=len(scores)) as st:
+        scores = scores.join(users, on='user_id', how='inner')
+
+        before = len(scores)
+        scores = scores[scores['date'] >= scores['skill_stabilization_date']]
+        st.rows_out = len(scores)
     print(f"  - Filtered {before - len(scores)} pre-stabilization scores. Remaining: {len(scores)}")
 
     return scores[['user_id', 'mod_beatmap_id', 'enjoyment', 'playcount']].copy()
 
 
+def load_filtered_scores(user_type: str):
+    scores, users = load_scores(user_type)
+    return filter_stabilized(scores, users)
+
+
 def normalize(df, colname):
     min_r, max_r = df[colname].min(), df[colname].max()
     if min_r == max_r:
@@ -56,18 +79,44 @@ def normalize(df, colname):
 def save_single_train_split(scores_df, name_prefix):
     print(f"[INFO] Saving single train split for: {name_prefix}")
 
-    # Save for enjoyment
-    enjoyment_df = normalize(scores_df[['user_id', 'mod_beatmap_id', 'enjoyment']].rename(columns={'enjoyment': 'rating'}), 'rating')
-    enjoyment_df.to_csv(f"{OUTPUT_DIR}/{name_prefix}_enjoyment_train.csv", index=False)
+    with stage("save_train_split", rows_in=len(scores_df), split=name_prefix):
+        # Save for enjoyment
+        enjoyment_df = normalize(scores_df[['user_id', 'mod_beatmap_id', 'enjoyment']].rename(columns={'enjoyment': 'rating'}), 'rating')
+        enjoyment_df.to_csv(f"{OUTPUT_DIR}/{name_prefix}_enjoyment_train.csv", index=False)
 
-    # Save for playcount
-    playcount_df = normalize(scores_df[['user_id', 'mod_beatmap_id', 'playcount']].rename(columns={'playcount': 'rating'}), 'rating')
-    playcount_df.to_csv(f"{OUTPUT_DIR}/{name_prefix}_playcount_train.csv", index=False)
+        # Save for playcount
+        playcount_df = normalize(scores_df[['user_id', 'mod_beatmap_id', 'playcount']].rename(columns={'playcount': 'rating'}), 'rating')
+        playcount_df.to_csv(f"{OUTPUT_DIR}/{name_prefix}_playcount_train.csv", index=False)
 
 
-if __name__ == '__main__':
-    for user_type in ["top", "random"]:
+def split_paths(name_prefix):
+    return {f"{rating_type}.csv": f"{OUTPUT_DIR}/{name_prefix}_{rating_type}_train.csv" for rating_type in RATING_TYPES}
+
+
+def split_all(user_types=("top", "random")):
+    cache = ArtifactCache() if USE_CACHE else None
+    code = code_version(load_scores, filter_stabilized, normalize, save_single_train_split)
+    for user_type in user_types:
         print(f"\n=== PROCESSING: {user_type.upper()} USERS ===")
+        if cache:
+            key = artifact_key("split", scores=cache.file_fingerprint(DATA_VARIANTS[user_type]["scores"]),
+                               users=cache.file_fingerprint(DATA_VARIANTS[user_type]["users"]), code=code)
+            entry = cache.lookup("split", key)
+            if entry:
+                for name, path in split_paths(user_type).items():
+                    ArtifactCache.restore(entry, name, path)
+                print(f"[INFO] Restored {user_type} splits from cache")
+                continue
+
         scores = load_filtered_scores(user_type)
         save_single_train_split(scores, user_type)
         del scores
+        if cache:
+            cache.store("split", key, split_paths(user_type), meta={"user_type": user_type})
+
+    if cache:
+        cache.report()
+
+
+if __name__ == '__main__':
+    split_all()
@@ -1,16 +1,32 @@
 import os
+import sys
 import pandas as pd
 import joblib
 from surprise import Reader
 from joblib import Parallel, delayed
 from tqdm import tqdm
 import numpy as np
+import argparse
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import stage
+from config import configure
+import batch_predict
+import sharded_eval
+from batch_predict import BatchPredictor
+from sampled_eval import sampled_evaluate, make_strata, add_deltas
+from sharded_eval import plan_shards, run_sharded, worker_cached, partial_sums, merge_partials
+from artifact_cache import ArtifactCache, artifact_key, code_version
+from checkpoints import (STATUS_OK, STATUS_SKIPPED, STATUS_FAILED, write_checkpoint, read_checkpoints,
+                         completed_jobs, clear_checkpoints)
 
 # ========== CONFIG ==========
 
 MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
 RESULT_CSV = os.path.join(os.path.dirname(__file__), "evaluation_results.csv")
-BEATMAPS_PATH = r"C:\Users\glaes\Desktop\GitHub\Osu-RecSys-Study\data\processed\beatmaps.csv"
+CHECKPOINT_DIR = os.path.join(os.path.dirname(__file__), "evaluation_checkpoints")
+BEATMAPS_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "processed", "beatmaps.csv")
 TOP_K = 100
 N_JOBS = 10 
 PERCENTILE = 99
@@ -26,28 +42,38 @@ VARIANTS = [
 ]
 
 MODEL_KEYS = ["svd", "knn", "baseline"]
+
+# Sampled mode (--sampled): evaluate users in stratified random batches (activity bin x user type)
+# until every metric's confidence interval is at most SAMPLE_CI_WIDTH wide
+SAMPLE_CI_WIDTH = 0.01
+SAMPLE_MAX_USERS = None
+BASE_METRICS = ["true_avg", "true_top", "true_min", "mse"]
+
+USE_CACHE = True  # skip folds whose model, val set, beatmaps, settings and code are unchanged
+
+configure(globals(), "evaluator")
 FOLDS = list(range(MAX_FOLDS))
 
 
 # ========== HELPERS ==========
 
-def evaluate_single(user_df, model, beatmap_df, k=TOP_K):
+def evaluate_single(user_df, predictor, beatmap_df, k=TOP_K):
     uid = user_df["user_id"].iloc[0]
 
     user_merged = user_df.merge(beatmap_df, left_on="mod_beatmap_id", right_on="mod_beatmap_id", how="left")
     ceilings = user_merged[SENSITIVE_ATTRS].quantile(PERCENTILE / 100.0)
 
+    # All of the user's candidates in one call (same estimates as model.predict)
+    iids = user_df["mod_beatmap_id"].unique()
+    estimates, _ = predictor.predict(np.repeat(uid, len(iids)), iids)
+
     predictions = []
-    for iid in user_df["mod_beatmap_id"].unique():
-        try:
-            est = model.predict(uid, iid).est
-            bm_row = beatmap_df[beatmap_df["mod_beatmap_id"] == iid]
-            if bm_row.empty:
-                continue
-            flags = any(bm_row[attr].values[0] > ceilings[attr] for attr in SENSITIVE_ATTRS)
-            predictions.append((iid, est, flags))
-        except Exception:
+    for iid, est in zip(iids, estimates):
+        bm_row = beatmap_df[beatmap_df["mod_beatmap_id"] == iid]
+        if bm_row.empty:
             continue
+        flags = any(bm_row[attr].values[0] > ceilings[attr] for attr in SENSITIVE_ATTRS)
+        predictions.append((iid, est, flags))
 
     if not predictions:
         return None
@@ -89,49 +115,148 @@ def evaluate_single(user_df, model, beatmap_df, k=TOP_K):
     }
 
 
-def evaluate_fold(user_type, rating_type, model_key, fold):
-    prefix = f"{user_type}_{rating_type}_{model_key}_fold{fold}"
-    model_path = os.path.join(MODELS_DIR, f"{prefix}.pkl")
-    val_path = os.path.join(MODELS_DIR, f"{prefix}_val.csv")
+def fold_paths(prefix):
+    return os.path.join(MODELS_DIR, f"{prefix}.pkl"), os.path.join(MODELS_DIR, f"{prefix}_val.csv")
+
+
+def load_fold(job):
+    """Predictor, validation frame, per-user frames and beatmaps of a fold (kept per worker process)."""
+    prefix = job_name(*job)
+    model_path, val_path = fold_paths(prefix)
+
+    def load():
+        with stage("load_eval_inputs", job=prefix):
+            predictor = BatchPredictor(joblib.load(model_path))
+            val_df = pd.read_csv(val_path)
+        return predictor, val_df, dict(tuple(val_df.groupby("user_id")))
+
+    beatmap_df = worker_cached("beatmaps", BEATMAPS_PATH, lambda: pd.read_csv(BEATMAPS_PATH), paths=[BEATMAPS_PATH])
+    return (*worker_cached("fold", prefix, load, paths=[model_path, val_path]), beatmap_df)
+
+
+def evaluate_shard(job, user_ids):
+    """partial_sums over one shard of a fold's validation users (runs in the pool)."""
+    predictor, _, users, beatmap_df = load_fold(job)
+    with stage("evaluate_shard", rows_in=len(user_ids), job=job_name(*job)) as st:
+        results = [res for res in (evaluate_single(users[uid], predictor, beatmap_df) for uid in user_ids) if res]
+        st.rows_out = len(results)
+    return partial_sums(results)
+
+
+def fold_row(job, partials):
+    """Summary row of a fold from its shards' partial sums (mean of every metric over valid users)."""
+    n_users, means, _ = merge_partials(partials)
+    if not n_users:
+        print(f"[INFO] No valid users in {job_name(*job)}")
+        return None
+    user_type, rating_type, model_key, fold = job
+    key = {"user_type": user_type, "rating_type": rating_type, "model": model_key, "fold": fold}
+    return {**key, "n_users": n_users, **means}
+
+
+def evaluate_fold(user_type, rating_type, model_key, fold, sampled=False):
+    job = (user_type, rating_type, model_key, fold)
+    prefix = job_name(*job)
+    model_path, val_path = fold_paths(prefix)
 
     if not (os.path.exists(model_path) and os.path.exists(val_path)):
         print(f"[WARN] Missing files for {prefix}. Skipping.")
         return None
 
     print(f"▶️  Evaluating: {prefix}")
-    try:
-        model = joblib.load(model_path)
-        val_df = pd.read_csv(val_path)
-        beatmap_df = pd.read_csv(BEATMAPS_PATH)
-
-        user_results = []
-        for _, user_df in tqdm(val_df.groupby("user_id"), desc=f"Users in {prefix}", leave=False):
-            res = evaluate_single(user_df, model, beatmap_df)
-            if res:
-                user_results.append(res)
-
-        if not user_results:
-            print(f"[INFO] No valid users in {prefix}")
-            return None
-
-        df = pd.DataFrame(user_results)
-        return {
-            "user_type": user_type,
-            "rating_type": rating_type,
-            "model": model_key,
-            "fold": fold,
-            "n_users": len(user_results),
-            **df.mean(numeric_only=True).to_dict()
-        }
+    predictor, val_df, users, beatmap_df = load_fold(job)
+
+    if not sampled:
+        return fold_row(job, [evaluate_shard(job, list(users))])
+
+    key = {"user_type": user_type, "rating_type": rating_type, "model": model_key, "fold": fold}
+    with stage("evaluate_users_sampled", rows_in=len(val_df), job=prefix) as st:
+        strata = make_strata(val_df["user_id"].value_counts(), user_type=user_type)
+        row = sampled_evaluate(
+            strata, lambda uid: add_deltas(evaluate_single(users[uid], predictor, beatmap_df), BASE_METRICS),
+            ci_width=SAMPLE_CI_WIDTH, max_users=SAMPLE_MAX_USERS, seed=fold,
+        )
+        st.rows_out = row["n_users_evaluated"]
+    print(f"[INFO] {prefix}: {row['n_users_evaluated']}/{row['n_users_total']} users evaluated"
+          f"{' (stopped early)' if row['stopped_early'] else ''}")
+    return {**key, **row} if row["n_users"] else None
+
+
+def job_name(user_type, rating_type, model_key, fold):
+    return f"{user_type}_{rating_type}_{model_key}_fold{fold}"
 
+
+def run_job(job, checkpoint_dir, sampled=False):
+    """Evaluate one fold and checkpoint its outcome; errors are recorded, not swallowed."""
+    name = job_name(*job)
+    try:
+        row = evaluate_fold(*job, sampled=sampled)
     except Exception as e:
-        print(f"[ERROR] Failed on {prefix}: {e}")
+        print(f"[ERROR] Failed on {name}: {e}")
+        return write_checkpoint(checkpoint_dir, name, STATUS_FAILED, error=traceback.format_exc())
+    return write_checkpoint(checkpoint_dir, name, STATUS_OK if row else STATUS_SKIPPED, row=row)
+
+
+def run_jobs_sharded(jobs, checkpoint_dir):
+    """
+    Evaluate folds as user shards over one pool (sharded_eval), so a large
+    fold is spread over every worker. A fold's checkpoint is written when
+    its last shard has been merged; one failed shard fails the fold.
+    """
+    records, sizes = {}, {}
+    for job in jobs:
+        name = job_name(*job)
+        if all(os.path.exists(path) for path in fold_paths(name)):
+            sizes[job] = pd.read_csv(fold_paths(name)[1], usecols=["user_id"])["user_id"].value_counts()
+        else:
+            print(f"[WARN] Missing files for {name}. Skipping.")
+            records[job] = write_checkpoint(checkpoint_dir, name, STATUS_SKIPPED)
+
+    tasks = plan_shards(sizes, N_JOBS)
+    print(f"[INFO] {len(sizes)} folds -> {len(tasks)} user shards")
+    remaining = {job: sum(1 for j, _ in tasks if j == job) for job in sizes}
+    partials, errors = {job: [] for job in sizes}, {}
+    for job, part in run_sharded(tasks, evaluate_shard, N_JOBS, desc="Fold shards"):
+        if "error" in part:
+            errors.setdefault(job, part["error"])
+        else:
+            partials[job].append(part)
+        remaining[job] -= 1
+        if remaining[job]:
+            continue
+
+        name = job_name(*job)
+        if job in errors:
+            print(f"[ERROR] Failed on {name}: {errors[job].strip().splitlines()[-1]}")
+            records[job] = write_checkpoint(checkpoint_dir, name, STATUS_FAILED, error=errors[job])
+        else:
+            row = fold_row(job, partials.pop(job))
+            records[job] = write_checkpoint(checkpoint_dir, name, STATUS_OK if row else STATUS_SKIPPED, row=row)
+    return [records[job] for job in jobs]
+
+
+def evaluation_key(cache, user_type, rating_type, model_key, fold, code, sampled=False):
+    """Cache key of one fold's result, or None (not cached) when any of its inputs is missing."""
+    prefix = f"{user_type}_{rating_type}_{model_key}_fold{fold}"
+    model_path = os.path.join(MODELS_DIR, f"{prefix}.pkl")
+    val_path = os.path.join(MODELS_DIR, f"{prefix}_val.csv")
+    if not all(os.path.exists(p) for p in (model_path, val_path, BEATMAPS_PATH)):
         return None
+    return artifact_key(
+        "evaluation",
+        model=cache.file_fingerprint(model_path),
+        val=cache.file_fingerprint(val_path),
+        beatmaps=cache.file_fingerprint(BEATMAPS_PATH),
+        settings={"top_k": TOP_K, "percentile": PERCENTILE, "sensitive_attrs": SENSITIVE_ATTRS,
+                  "sampled": {"ci_width": SAMPLE_CI_WIDTH, "max_users": SAMPLE_MAX_USERS} if sampled else None},
+        code=code,
+    )
 
 
 # ========== MAIN ==========
 
-if __name__ == "__main__":
+def evaluate_all(resume=False, checkpoint_dir=CHECKPOINT_DIR, sampled=False):
+    """Evaluate every (variant, model, fold) job and write RESULT_CSV; exits with 1 if any job failed."""
     print("=== 🚀 Starting parallel evaluation ===")
 
     all_jobs = [
@@ -140,18 +265,72 @@ if __name__ == "__main__":
         for model_key in MODEL_KEYS
         for fold in FOLDS
     ]
+    names = [job_name(*job) for job in all_jobs]
+
+    if resume:
+        done = completed_jobs(checkpoint_dir)
+        print(f"⏩ Resuming: {len(done & set(names))} of {len(all_jobs)} jobs already finished")
+    else:
+        clear_checkpoints(checkpoint_dir, names)
+        done = set()
 
     print(f"📊 Total tasks: {len(all_jobs)} (models x folds)")
-    results = Parallel(n_jobs=N_JOBS, verbose=10)(
-        delayed(evaluate_fold)(user_type, rating_type, model_key, fold)
-        for user_type, rating_type, model_key, fold in tqdm(all_jobs, desc="All folds", leave=True)
-    )
+    pending = [i for i, name in enumerate(names) if name not in done]
+    keys = [None] * len(all_jobs)
+    cache = ArtifactCache() if USE_CACHE else None
+    if cache:
+        code = code_version(evaluate_single, evaluate_fold, evaluate_shard, fold_row, sampled_evaluate,
+                            batch_predict, sharded_eval, packages=("surprise",))
+        for i in list(pending):
+            keys[i] = evaluation_key(cache, *all_jobs[i], code, sampled=sampled)
+            entry = cache.lookup("evaluation", keys[i]) if keys[i] else None
+            if entry:
+                write_checkpoint(checkpoint_dir, names[i], STATUS_OK, row=ArtifactCache.load_json(entry))
+                pending.remove(i)
+
+    with stage("evaluate_all", n_jobs=len(pending)):
+        if sampled:
+            # Sampled folds stop early on their own batches, so they stay one task each
+            records = Parallel(n_jobs=N_JOBS, verbose=10)(
+                delayed(run_job)(all_jobs[i], checkpoint_dir, sampled)
+                for i in tqdm(pending, desc="All folds", leave=True)
+            )
+        else:
+            records = run_jobs_sharded([all_jobs[i] for i in pending], checkpoint_dir)
+    if cache:
+        # Failed or skipped folds are not cached, so they are retried on the next run
+        for i, record in zip(pending, records):
+            if keys[i] and record["status"] == STATUS_OK:
+                cache.store_json("evaluation", keys[i], record["row"], meta={"job": names[i]})
+        cache.report()
+        cache.evict()
 
-    results = [r for r in results if r is not None]
+    by_job = {r["job"]: r for r in read_checkpoints(checkpoint_dir)}
+    records = [by_job.get(name, {"job": name, "status": STATUS_SKIPPED}) for name in names]
+    failed = [r for r in records if r["status"] == STATUS_FAILED]
+    results = [r["row"] for r in records if r["status"] == STATUS_OK]
 
     if results:
         results_df = pd.DataFrame(results)
         results_df.to_csv(RESULT_CSV, index=False)
-        print(f"\n✅ Evaluation complete. Results saved to {RESULT_CSV}")
+        print(f"\n✅ Evaluation complete ({len(results)}/{len(all_jobs)} jobs). Results saved to {RESULT_CSV}")
     else:
         print("\n⚠️ No results to save — all folds skipped or failed.")
+
+    if failed:
+        print(f"\n❌ {len(failed)} job(s) failed (tracebacks in {checkpoint_dir}); rerun with --resume:")
+        for r in failed:
+            print(f"  - {r['job']}: {r['error'].strip().splitlines()[-1]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate all trained fold models.")
+    parser.add_argument("--resume", action="store_true",
+                        help="keep finished jobs from the checkpoint directory and only run the rest")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--sampled", action="store_true",
+                        help="stratified sampled evaluation with early stopping on confidence interval width")
+    args = parser.parse_args()
+
+    evaluate_all(args.resume, args.checkpoint_dir, args.sampled)
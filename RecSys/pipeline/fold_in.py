@@ -0,0 +1,199 @@
+import os
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import joblib
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(SCRIPT_DIR, "models")
+
+# Users are solved in padded batches; users are sorted by rating count first,
+# so the padding inside one batch stays small
+BATCH_USERS = 1024
+
+# ============================================
+
+
+def delta_path_for(model_path):
+    return os.path.splitext(model_path)[0] + "_userdelta.npz"
+
+
+def model_fingerprint(model_path):
+    st = os.stat(model_path)
+    return f"{os.path.basename(model_path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def fold_in_users(model, ratings_df, item_col="mod_beatmap_id", rating_col="rating",
+                  reg_bu=None, reg_pu=None, batch_users=BATCH_USERS):
+    """
+    Solve `pu` and `bu` of each user in `ratings_df` against the frozen item
+    factors `qi`/`bi` of a fitted Surprise SVD, i.e. one regularized
+    least-squares (ALS) half-step per user:
+
+        min  sum_i (r_ui - mu - b_u - b_i - q_i.p_u)^2 + reg_bu*b_u^2 + reg_pu*|p_u|^2
+
+    Ratings on items unknown to the model are ignored. Returns
+    (raw_uids, bu, pu); users without any known item are left out.
+    """
+    trainset = model.trainset
+    reg_bu = model.reg_bu if reg_bu is None else reg_bu
+    reg_pu = model.reg_pu if reg_pu is None else reg_pu
+
+    inner_items = ratings_df[item_col].map(trainset._raw2inner_id_items)
+    known = inner_items.notna().to_numpy()
+    df = pd.DataFrame({
+        "user_id": ratings_df["user_id"].to_numpy()[known],
+        "iid": inner_items.to_numpy()[known].astype(np.int64),
+        "rating": ratings_df[rating_col].to_numpy(dtype=np.float64)[known],
+    })
+    if df.empty:
+        n_factors = model.qi.shape[1]
+        return np.array([]), np.zeros(0), np.zeros((0, n_factors))
+
+    # Target residual and design matrix: [1 | q_i] for biased models
+    qi = model.qi[df["iid"].to_numpy()]
+    if model.biased:
+        y = df["rating"].to_numpy() - trainset.global_mean - model.bi[df["iid"].to_numpy()]
+        z = np.hstack([np.ones((len(df), 1)), qi])
+        reg = np.concatenate([[reg_bu], np.full(qi.shape[1], reg_pu)])
+    else:
+        y = df["rating"].to_numpy()
+        z = qi
+        reg = np.full(qi.shape[1], reg_pu)
+
+    # Group rows per user, users ordered by number of ratings
+    codes, raw_uids = pd.factorize(df["user_id"])
+    counts = np.bincount(codes)
+    row_order = np.argsort(codes, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    user_order = np.argsort(counts, kind="stable")
+
+    dim = z.shape[1]
+    solution = np.zeros((len(raw_uids), dim))
+    for b in range(0, len(user_order), batch_users):
+        batch = user_order[b:b + batch_users]
+        max_len = counts[batch].max()
+
+        # Zero padding does not change Z^T Z or Z^T y
+        zp = np.zeros((len(batch), max_len, dim))
+        yp = np.zeros((len(batch), max_len))
+        for j, u in enumerate(batch):
+            rows = row_order[offsets[u]:offsets[u + 1]]
+            zp[j, :len(rows)] = z[rows]
+            yp[j, :len(rows)] = y[rows]
+
+        zt = zp.transpose(0, 2, 1)
+        a = zt @ zp
+        a[:, np.arange(dim), np.arange(dim)] += reg
+        rhs = (zt @ yp[:, :, None])[:, :, 0]
+        solution[batch] = np.linalg.solve(a, rhs[:, :, None])[:, :, 0]
+
+    if model.biased:
+        return np.asarray(raw_uids), solution[:, 0], solution[:, 1:]
+    return np.asarray(raw_uids), np.zeros(len(raw_uids)), solution
+
+
+def save_user_delta(model_path, raw_uids, bu, pu, delta_path=None):
+    """
+    Write (or merge into) the user delta next to the base model artifact.
+    Rows for users already in the delta are replaced by the new solution;
+    a delta left over from an earlier version of the model is dropped.
+    """
+    delta_path = delta_path or delta_path_for(model_path)
+    raw_uids = np.asarray(raw_uids)
+    old = load_current_delta(model_path, delta_path)
+    if old is not None:
+        keep = ~np.isin(old["raw_uids"], raw_uids)
+        raw_uids = np.concatenate([old["raw_uids"][keep], raw_uids])
+        bu = np.concatenate([old["bu"][keep], bu])
+        pu = np.vstack([old["pu"][keep], pu])
+
+    tmp_path = delta_path + ".tmp.npz"
+    np.savez(tmp_path, raw_uids=raw_uids, bu=bu, pu=pu,
+             base_model=np.array(model_fingerprint(model_path)))
+    os.replace(tmp_path, delta_path)
+    return delta_path
+
+
+def load_user_delta(model_path, delta_path=None):
+    delta_path = delta_path or delta_path_for(model_path)
+    with np.load(delta_path, allow_pickle=False) as data:
+        delta = {key: data[key] for key in data.files}
+    if str(delta["base_model"]) != model_fingerprint(model_path):
+        raise ValueError(f"User delta {delta_path} was built for {delta['base_model']}, "
+                         f"not for the current {os.path.basename(model_path)}")
+    return delta
+
+
+def load_current_delta(model_path, delta_path=None):
+    """The user delta if it exists and was built for this version of the model, else None (a stale one is removed)."""
+    delta_path = delta_path or delta_path_for(model_path)
+    if not os.path.exists(delta_path):
+        return None
+    try:
+        return load_user_delta(model_path, delta_path)
+    except ValueError as e:
+        print(f"⚠️ Dropping stale user delta: {e}")
+        os.remove(delta_path)
+        return None
+
+
+def apply_user_delta(model, delta):
+    """
+    Overwrite `pu`/`bu` of known users and register new users in the
+    model's trainset, so `model.predict` serves the folded-in vectors.
+    """
+    trainset = model.trainset
+    raw2inner = trainset._raw2inner_id_users
+    raw_uids = delta["raw_uids"].tolist()
+
+    inner = np.array([raw2inner.get(uid, -1) for uid in raw_uids], dtype=np.int64)
+    new = inner < 0
+    n_new = int(new.sum())
+    if n_new:
+        inner[new] = np.arange(trainset.n_users, trainset.n_users + n_new)
+        model.pu = np.vstack([model.pu, np.zeros((n_new, model.pu.shape[1]))])
+        model.bu = np.concatenate([model.bu, np.zeros(n_new)])
+        for uid, iuid in zip(np.asarray(raw_uids, dtype=object)[new], inner[new]):
+            raw2inner[uid] = int(iuid)
+            # knows_user() checks membership in `ur`
+            trainset.ur[int(iuid)] = []
+        trainset.n_users += n_new
+        trainset._inner2raw_id_users = None
+
+    model.pu[inner] = delta["pu"]
+    model.bu[inner] = delta["bu"]
+    return model
+
+
+def load_model_with_delta(model_path):
+    model = joblib.load(model_path)
+    delta = load_current_delta(model_path)
+    if delta is not None:
+        apply_user_delta(model, delta)
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold new/updated user ratings into a trained SVD model.")
+    parser.add_argument("model", help="model file name in ./models, e.g. top_enjoyment_svd_fold0.pkl")
+    parser.add_argument("ratings", help="CSV with user_id, mod_beatmap_id, rating")
+    args = parser.parse_args()
+
+    model_path = args.model if os.path.isabs(args.model) else os.path.join(MODEL_DIR, args.model)
+    model = joblib.load(model_path)
+    ratings = pd.read_csv(args.ratings)
+
+    start = time.time()
+    raw_uids, bu, pu = fold_in_users(model, ratings)
+    elapsed = time.time() - start
+    out_path = save_user_delta(model_path, raw_uids, bu, pu)
+
+    per_user_ms = 1000 * elapsed / max(len(raw_uids), 1)
+    print(f"✔ Folded in {len(raw_uids)} users in {elapsed:.2f}s ({per_user_ms:.2f} ms/user)")
+    print(f"✔ Saved delta: {out_path}")
@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from surprise import Dataset, Reader, KNNWithMeans, accuracy
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from parallel_cv import share_arrays, attach_arrays, release_arrays
+from instrumentation import stage
+
+import sgd_mf
+from model_trainer import VARIANTS, N_FOLDS, SPLIT_DIR, MODEL_CONFIGS, load_split, prepare_folds
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+TRIALS_CSV = os.path.join(SCRIPT_DIR, "hparam_trials.csv")
+STATE_DIR = os.path.join(SCRIPT_DIR, "hparam_state")   # per (trial, fold) factors between rungs
+
+N_JOBS = 6
+SEARCH = "grid"            # "grid" or "random"
+N_RANDOM_TRIALS = 20
+SEED = 42
+RATING_SCALE = (0.0, 1.0)
+
+SVD_SPACE = {
+    "n_factors": [20, 50, 100],
+    "lr_all": [0.002, 0.005, 0.01],
+    "reg_all": [0.02, 0.05, 0.1],
+}
+
+# Successive halving: validation RMSE is checked after each rung's total epochs;
+# the best 1/ETA trials move on, and none more than PRUNE_MARGIN worse than the rung's best
+RUNG_EPOCHS = [5, 10, 20]
+ETA = 3
+PRUNE_MARGIN = 0.05
+
+# Warm start: one seed trial per n_factors value is trained for the first WARM_START_EPOCHS,
+# and every trial with that n_factors (the seed included) continues from its factors
+WARM_START_EPOCHS = 2
+
+# KNN: the similarity matrix is computed once per fold with max(k); each k is only a predict-time setting
+KNN_K = [5, 10, 20, 40, 80]
+
+# ============================================
+
+
+# ========== SHARED FOLDS ==========
+
+def share_variant(df, n_folds):
+    """
+    Encode users/items as contiguous indices and put ratings plus every
+    fold's train/val positions into shared memory once per variant.
+    """
+    df = df.reset_index(drop=True)
+    users, user_ids = pd.factorize(df["user_id"])
+    items, item_ids = pd.factorize(df["mod_beatmap_id"])
+    arrays = {"user": users.astype(np.int32), "item": items.astype(np.int32),
+              "rating": df["rating"].to_numpy(dtype=np.float64)}
+    for fold, (train_df, val_df) in enumerate(prepare_folds(df, n_folds)):
+        arrays[f"train{fold}"] = train_df.index.to_numpy()
+        arrays[f"val{fold}"] = val_df.index.to_numpy()
+    handles, specs = share_arrays(arrays)
+    return handles, specs, {"n_users": len(user_ids), "n_items": len(item_ids)}
+
+
+def _fold_arrays(arrays, fold):
+    tr, va = arrays[f"train{fold}"], arrays[f"val{fold}"]
+    return ((arrays["user"][tr], arrays["item"][tr], arrays["rating"][tr]),
+            (arrays["user"][va], arrays["item"][va], arrays["rating"][va]))
+
+
+# ========== WORKERS ==========
+
+def _svd_rung(specs, meta, fold, params, n_epochs, state_in, state_out, seed):
+    """Train one (trial, fold) for `n_epochs` more epochs from `state_in` (or a fresh init); return val RMSE."""
+    handles, arrays = attach_arrays(specs)
+    try:
+        (u, i, r), (vu, vi, vr) = _fold_arrays(arrays, fold)
+        rng = np.random.RandomState(seed)
+        if state_in:
+            model = sgd_mf.FactorModel.load(state_in)
+        else:
+            model = sgd_mf.FactorModel.random(meta["n_users"], meta["n_items"], params["n_factors"], r.mean(), rng)
+        lr, reg = sgd_mf.uniform_rates(params["lr_all"], params["reg_all"])
+
+        start = time.time()
+        with stage("hparam_svd_epochs", rows_in=len(r) * n_epochs, fold=fold, params=json.dumps(params)):
+            for _ in range(n_epochs):
+                sgd_mf.sgd_epoch(model, u, i, r, lr, reg, rng)
+        fit_time = time.time() - start
+
+        known_u = np.bincount(u, minlength=meta["n_users"]) > 0
+        known_i = np.bincount(i, minlength=meta["n_items"]) > 0
+        model.save(state_out)
+        return sgd_mf.rmse(model, vu, vi, vr, known_u, known_i, RATING_SCALE), fit_time
+    finally:
+        release_arrays(handles)
+
+
+def _knn_fold(specs, fold, ks, sim_options):
+    """Fit KNNWithMeans once with max(ks) and score the fold's val set for every k."""
+    handles, arrays = attach_arrays(specs)
+    try:
+        (u, i, r), (vu, vi, vr) = _fold_arrays(arrays, fold)
+        train_df = pd.DataFrame({"user_id": u, "item_id": i, "rating": r})
+        trainset = Dataset.load_from_df(train_df, Reader(rating_scale=RATING_SCALE)).build_full_trainset()
+        del train_df
+
+        start = time.time()
+        with stage("hparam_knn_fit", rows_in=len(r), fold=fold):
+            algo = KNNWithMeans(k=max(ks), sim_options=sim_options, verbose=False)
+            algo.fit(trainset)
+        fit_time = time.time() - start
+
+        testset = list(zip(vu.tolist(), vi.tolist(), vr.tolist()))
+        scores = {}
+        for k in ks:
+            algo.k = k
+            scores[k] = accuracy.rmse(algo.test(testset), verbose=False)
+        return scores, fit_time
+    finally:
+        release_arrays(handles)
+
+
+# ========== TRIALS ==========
+
+def make_trials(space, search=SEARCH, n_random=N_RANDOM_TRIALS, seed=SEED):
+    names = sorted(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    if search == "random" and n_random < len(grid):
+        rng = np.random.RandomState(seed)
+        grid = [grid[j] for j in sorted(rng.choice(len(grid), n_random, replace=False))]
+    return grid
+
+
+def _distance(a, b):
+    return sum(abs(np.log(a[key] / b[key])) for key in ("lr_all", "reg_all"))
+
+
+def seed_trials(trials):
+    """Per n_factors value, the trial closest to the centre of the others."""
+    seeds = []
+    for n_factors in sorted({t["n_factors"] for t in trials}):
+        group = [j for j, t in enumerate(trials) if t["n_factors"] == n_factors]
+        seeds.append(min(group, key=lambda j: sum(_distance(trials[j], trials[o]) for o in group)))
+    return seeds
+
+
+def _run_all(pool, calls):
+    futures = [pool.submit(*call) for call in calls]
+    return [f.result() for f in futures]
+
+
+def search_svd(pool, specs, meta, prefix, trials):
+    state_dir = os.path.join(STATE_DIR, prefix)
+    os.makedirs(state_dir, exist_ok=True)
+    state = lambda j, fold: os.path.join(state_dir, f"svd{j}_fold{fold}.npz")
+
+    seeds = seed_trials(trials)
+    by_factors = {trials[s]["n_factors"]: s for s in seeds}
+    warm_from = {j: by_factors[trials[j]["n_factors"]] for j in range(len(trials))}
+    warm_state = lambda j, fold: os.path.join(state_dir, f"warm{j}_fold{fold}.npz")
+
+    if WARM_START_EPOCHS:
+        with stage("hparam_svd_warm_start", variant=prefix, n_trials=len(seeds)):
+            _run_all(pool, [(_svd_rung, specs, meta, fold, trials[j], WARM_START_EPOCHS, None, warm_state(j, fold),
+                             SEED + fold) for j in seeds for fold in range(N_FOLDS)])
+
+    rows, alive, done_epochs = [], list(range(len(trials))), WARM_START_EPOCHS
+    for rung, epochs in enumerate(RUNG_EPOCHS):
+        n_epochs = epochs - done_epochs
+        calls = []
+        for j in alive:
+            for fold in range(N_FOLDS):
+                if rung > 0:
+                    state_in = state(j, fold)
+                else:
+                    state_in = warm_state(warm_from[j], fold) if WARM_START_EPOCHS else None
+                calls.append((_svd_rung, specs, meta, fold, trials[j], n_epochs, state_in, state(j, fold),
+                              SEED + 1000 * (j + 1) + fold))
+        results = {}
+        with stage("hparam_svd_rung", variant=prefix, rung=rung, n_trials=len(alive)):
+            for (j, fold), res in zip(itertools.product(alive, range(N_FOLDS)), _run_all(pool, calls)):
+                results.setdefault(j, []).append(res)
+        done_epochs = epochs
+
+        rmse = {j: np.mean([r[0] for r in results[j]]) for j in alive}
+        best = min(rmse.values())
+        n_keep = max(1, int(np.ceil(len(alive) / ETA)))
+        keep = [j for j in sorted(alive, key=rmse.get)[:n_keep] if rmse[j] <= best * (1 + PRUNE_MARGIN)]
+        last = rung == len(RUNG_EPOCHS) - 1
+        for j in alive:
+            rows.append({
+                "trial": f"svd{j}",
+                "model": "svd",
+                "params": json.dumps(trials[j], sort_keys=True),
+                **trials[j],
+                "rung": rung,
+                "epochs": epochs,
+                "rmse": rmse[j],
+                "rmse_std": np.std([r[0] for r in results[j]]),
+                "fit_s": sum(r[1] for r in results[j]),
+                "status": "final" if last else ("promoted" if j in keep else "pruned"),
+                "warm_start_from": f"svd{warm_from[j]}" if WARM_START_EPOCHS else None,
+            })
+        print(f"[INFO] {prefix} rung {rung} ({epochs} epochs): best RMSE {best:.5f}, "
+              f"{len(keep) if not last else len(alive)}/{len(alive)} trials kept")
+        if last:
+            break
+        alive = keep
+
+    shutil.rmtree(state_dir, ignore_errors=True)
+    return rows
+
+
+def search_knn(pool, specs, prefix, ks=KNN_K):
+    sim_options = MODEL_CONFIGS["knn"]["kwargs"]["sim_options"]
+    with stage("hparam_knn", variant=prefix, n_trials=len(ks)):
+        results = _run_all(pool, [(_knn_fold, specs, fold, ks, sim_options) for fold in range(N_FOLDS)])
+    fit_s = sum(r[1] for r in results)
+    rows = []
+    for k in ks:
+        scores = [r[0][k] for r in results]
+        rows.append({
+            "trial": f"knn{k}",
+            "model": "knn",
+            "params": json.dumps({"k": k}),
+            "k": k,
+            "rung": 0,
+            "rmse": np.mean(scores),
+            "rmse_std": np.std(scores),
+            "fit_s": fit_s / len(ks),   # one shared fit per fold
+            "status": "final",
+        })
+    print(f"[INFO] {prefix} KNN: best k = {min(rows, key=lambda row: row['rmse'])['k']}")
+    return rows
+
+
+def search_variant(user_type, rating_type, models, search=SEARCH, n_jobs=N_JOBS):
+    prefix = f"{user_type}_{rating_type}"
+    df = load_split(os.path.join(SPLIT_DIR, f"{prefix}_train.csv"), prefix)
+    handles, specs, meta = share_variant(df, N_FOLDS)
+    del df
+
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=os.cpu_count() if n_jobs in (-1, None) else n_jobs) as pool:
+            if "svd" in models:
+                rows += search_svd(pool, specs, meta, prefix, make_trials(SVD_SPACE, search))
+            if "knn" in models:
+                rows += search_knn(pool, specs, prefix)
+    finally:
+        release_arrays(handles, unlink=True)
+    return [{"user_type": user_type, "rating_type": rating_type, **row} for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter search with successive halving over shared folds.")
+    parser.add_argument("--variants", nargs="+", default=[f"{u}_{r}" for u, r in VARIANTS])
+    parser.add_argument("--models", nargs="+", default=["svd", "knn"], choices=["svd", "knn"])
+    parser.add_argument("--search", default=SEARCH, choices=["grid", "random"])
+    parser.add_argument("--n-jobs", type=int, default=N_JOBS)
+    parser.add_argument("--out", default=TRIALS_CSV)
+    args = parser.parse_args()
+
+    all_rows = []
+    for variant in args.variants:
+        user_type, rating_type = variant.split("_")
+        print(f"\n=== Hyperparameter search: {variant} ===")
+        all_rows += search_variant(user_type, rating_type, args.models, args.search, args.n_jobs)
+        pd.DataFrame(all_rows).to_csv(args.out, index=False)
+
+    print(f"\n✅ Trials table saved to {args.out}")
@@ -1,7 +1,11 @@
 
 import os
+import sys
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data"))
+from manifest import Manifest
+
 # ============================================
 # CONFIGURATION SECTION
 # ============================================
@@ -19,6 +23,8 @@ VARIANTS = [
 ]
 
 N_FOLDS = 3
+MIN_USER_RATINGS = 20
+
 
 # ============================================
 
@@ -27,22 +33,24 @@ def prepare_folds(df, n_folds):
     kf = KFold(n_splits=n_folds, shuffle=True, random_state=42)
     return [(df.iloc[train_idx], df.iloc[val_idx]) for train_idx, val_idx in kf.split(df)]
 
+def train_stats(csv_path):
+    """Users, items and interactions left after the trainer's filters (rating > 0, >= MIN_USER_RATINGS per user)."""
+    df = pd.read_csv(csv_path, usecols=['user_id', 'mod_beatmap_id', 'rating'])
+    df = df[df['rating'] > 0.0]
+    df = df[df.groupby("user_id")['user_id'].transform('size') >= MIN_USER_RATINGS]
+    return {"users": int(df['user_id'].nunique()), "items": int(df['mod_beatmap_id'].nunique()), "interactions": len(df)}
+
 def print_dataset_stats():
     stats = []
+    # Cached per train CSV in data/manifest.json; recomputed only when a split file changes
+    manifest = Manifest()
 
     for user_type, rating_type in VARIANTS:
         prefix = f"{user_type}_{rating_type}"
         csv_path = os.path.join(SPLIT_DIR, f"{prefix}_train.csv")
 
-        df = pd.read_csv(csv_path)
-        df = df[df['rating'] > 0.0]
-        df = df.groupby("user_id").filter(lambda x: len(x) >= 20)
-
-        unique_users = df['user_id'].nunique()
-        unique_items = df['mod_beatmap_id'].nunique()
-        total_interactions = len(df)
-
-        stats.append((prefix, unique_users, unique_items, total_interactions))
+        counts = manifest.cached(csv_path, f"train_stats_min{MIN_USER_RATINGS}", train_stats)
+        stats.append((prefix, counts["users"], counts["items"], counts["interactions"]))
 
     print("\n=== Dataset Statistics ===")
     for prefix, n_users, n_items, n_interactions in stats:
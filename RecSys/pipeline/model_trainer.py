@@ -1,10 +1,19 @@
 import os
+import sys
 import pandas as pd
 import joblib
 from surprise import Dataset, Reader, SVD, KNNWithMeans, BaselineOnly
 from sklearn.model_selection import KFold
 from joblib import Parallel, delayed
 from tqdm import tqdm
+import ann_index
+from ann_index import build_item_index
+from fold_in import delta_path_for
+from artifact_cache import ArtifactCache, artifact_key, code_version
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import stage
+from config import configure
 
 # ============================================
 # CONFIGURATION SECTION
@@ -14,7 +23,6 @@ from tqdm import tqdm
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 SPLIT_DIR = os.path.join(SCRIPT_DIR, "splits")
 MODEL_DIR = os.path.join(SCRIPT_DIR, "models")
-os.makedirs(MODEL_DIR, exist_ok=True)
 
 # Dataset variants to train models on
 VARIANTS = [
@@ -61,6 +69,16 @@ MODEL_CONFIGS = {
 N_JOBS = 6 #-1 for all cores, but causes memory issues. with k fold 
 N_FOLDS = 3
 
+# Build an IVF-PQ item-factor index (<model>_ann.npz) next to every SVD model
+BUILD_ANN_INDEX = True
+
+# Reuse folds/models from the artifact cache when split data, config and code are unchanged
+USE_CACHE = True
+MIN_USER_RATINGS = 20  # users with fewer ratings are served by cold_start.py
+
+configure(globals(), "model_trainer")
+os.makedirs(MODEL_DIR, exist_ok=True)
+
 # ============================================
 
 def prepare_folds(df, n_folds):
@@ -68,28 +86,72 @@ def prepare_folds(df, n_folds):
     return [(df.iloc[train_idx], df.iloc[val_idx]) for train_idx, val_idx in kf.split(df)]
 
 def train_fold_model(train_df, val_df, model_path, val_path, model_class, model_kwargs):
-    reader = Reader(rating_scale=(0.0, 1.0))
-    data = Dataset.load_from_df(train_df[['user_id', 'mod_beatmap_id', 'rating']], reader)
-    trainset = data.build_full_trainset()
+    job = os.path.splitext(os.path.basename(model_path))[0]
+    with stage("build_trainset", rows_in=len(train_df), job=job):
+        reader = Reader(rating_scale=(0.0, 1.0))
+        data = Dataset.load_from_df(train_df[['user_id', 'mod_beatmap_id', 'rating']], reader)
+        trainset = data.build_full_trainset()
 
-    model = model_class(**model_kwargs)
-    model.fit(trainset)
+    with stage("fit", rows_in=trainset.n_ratings, job=job, model=model_class.__name__):
+        model = model_class(**model_kwargs)
+        model.fit(trainset)
 
     joblib.dump(model, model_path)
-    val_df.to_csv(val_path, index=False)
-    print(f"✔ Saved model: {model_path}\n✔ Saved val: {val_path}")
+    # Folded-in users belong to the previous model of this name
+    if os.path.exists(delta_path_for(model_path)):
+        os.remove(delta_path_for(model_path))
+    if val_path is not None:
+        val_df.to_csv(val_path, index=False)
+        print(f"✔ Saved val: {val_path}")
+    print(f"✔ Saved model: {model_path}")
+
+    if BUILD_ANN_INDEX and isinstance(model, SVD):
+        ann_path = os.path.splitext(model_path)[0] + "_ann.npz"
+        build_item_index(model).save(ann_path)
+        print(f"✔ Saved ANN index: {ann_path}")
+
+def load_split(csv_path, prefix):
+    with stage("load_split", variant=prefix) as st:
+        df = pd.read_csv(csv_path)
+        st.rows_in = len(df)
+        df = df[df['rating'] > 0.0]
+        df = df.groupby("user_id").filter(lambda x: len(x) >= MIN_USER_RATINGS)
+        st.rows_out = len(df)
+    return df
+
+def model_files(model_path):
+    files = {"model.pkl": model_path, "ann.npz": os.path.splitext(model_path)[0] + "_ann.npz"}
+    return {name: path for name, path in files.items() if name == "model.pkl" or os.path.exists(path)}
+
+def restore_model(entry, model_path):
+    ArtifactCache.restore(entry, "model.pkl", model_path)
+    if os.path.exists(delta_path_for(model_path)):
+        os.remove(delta_path_for(model_path))
+    if os.path.exists(os.path.join(entry, "ann.npz")):
+        ArtifactCache.restore(entry, "ann.npz", os.path.splitext(model_path)[0] + "_ann.npz")
+
+def cache_model(cache, cache_key, model_path, model_class, model_kwargs):
+    files = model_files(model_path)
+    cache.store("model", cache_key, files, meta={"class": model_class, "kwargs": model_kwargs})
 
 def train_all_models():
-    jobs = []
+    cache = ArtifactCache() if USE_CACHE else None
+    fold_code = code_version(load_split, prepare_folds)
+    train_code = code_version(train_fold_model, *([ann_index] if BUILD_ANN_INDEX else []),
+                              packages=("surprise",))
+
+    jobs, to_cache = [], []
     for user_type, rating_type in VARIANTS:
         prefix = f"{user_type}_{rating_type}"
         csv_path = os.path.join(SPLIT_DIR, f"{prefix}_train.csv")
-        df = pd.read_csv(csv_path)
-        df = df[df['rating'] > 0.0]
-        df = df.groupby("user_id").filter(lambda x: len(x) >= 20)
+        split_fp = cache.file_fingerprint(csv_path) if cache else None
+
+        folds = None
+        for fold_idx in range(N_FOLDS):
+            fold_key = artifact_key("fold", split=split_fp, n_folds=N_FOLDS, fold=fold_idx,
+                                    min_ratings=MIN_USER_RATINGS, code=fold_code)
+            fold_entry = cache.lookup("fold", fold_key) if cache else None
 
-        folds = prepare_folds(df, N_FOLDS)
-        for fold_idx, (train_df, val_df) in enumerate(folds):
             for model_key, model_info in MODEL_CONFIGS.items():
                 model_class = model_info["class"]
                 model_kwargs = model_info["kwargs"]
@@ -97,12 +159,46 @@ def train_all_models():
                 model_path = os.path.join(MODEL_DIR, f"{prefix}_{model_key}_fold{fold_idx}.pkl")
                 val_path = os.path.join(MODEL_DIR, f"{prefix}_{model_key}_fold{fold_idx}_val.csv")
 
+                cache_key = None
+                if cache:
+                    cache_key = artifact_key("model", fold=fold_key, model_class=model_class,
+                                             kwargs=model_kwargs, ann_index=BUILD_ANN_INDEX, code=train_code)
+                    model_entry = cache.lookup("model", cache_key)
+                    if model_entry and fold_entry:
+                        restore_model(model_entry, model_path)
+                        ArtifactCache.restore(fold_entry, "val.csv", val_path)
+                        continue
+
+                # Only now is the split itself needed
+                if folds is None:
+                    folds = prepare_folds(load_split(csv_path, prefix), N_FOLDS)
+                train_df, val_df = folds[fold_idx]
+
+                if cache:
+                    if fold_entry is None:
+                        val_df.to_csv(val_path, index=False)
+                        fold_entry = cache.store("fold", fold_key, {"val.csv": val_path}, meta={"variant": prefix})
+                    ArtifactCache.restore(fold_entry, "val.csv", val_path)
+                    val_path = None
+
+                    # Drop the previous working files so no stale ANN index is picked up by cache_model()
+                    for path in (model_path, os.path.splitext(model_path)[0] + "_ann.npz"):
+                        if os.path.exists(path):
+                            os.remove(path)
+                    to_cache.append((cache_key, model_path, model_class, model_kwargs))
+
                 jobs.append(delayed(train_fold_model)(
                     train_df.copy(), val_df.copy(), model_path, val_path, model_class, model_kwargs
                 ))
 
-    print("\n=== Starting cross-validated model training ===")
-    Parallel(n_jobs=N_JOBS, verbose=10)(jobs)
+    print(f"\n=== Starting cross-validated model training ({len(jobs)} jobs) ===")
+    with stage("train_all_models", n_jobs=len(jobs)):
+        Parallel(n_jobs=N_JOBS, verbose=10)(jobs)
+    if cache:
+        for cache_key, model_path, model_class, model_kwargs in to_cache:
+            cache_model(cache, cache_key, model_path, model_class, model_kwargs)
+        cache.report()
+        cache.evict()
     print("\n✅ All models and validation sets saved in ./models/")
 
 if __name__ == '__main__':
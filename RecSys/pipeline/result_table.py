@@ -1,66 +1,165 @@
+import os
+import sys
+import argparse
 import pandas as pd
 import numpy as np
 
+from checkpoints import checkpoint_results
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import configure
+
 # === CONFIG ===
-RESULT_PATH = r"C:\Users\glaes\Desktop\GitHub\Osu-RecSys-Study\DataAnalysis\matteo_recommender_folder\evaluation_results.csv"
-OUTPUT_CSV_PREFIX = r"C:\Users\glaes\Desktop\GitHub\Osu-RecSys-Study\DataAnalysis\matteo_recommender_folder\summary_table"
-OUTPUT_TXT = r"C:\Users\glaes\Desktop\GitHub\Osu-RecSys-Study\DataAnalysis\matteo_recommender_folder\summary_pretty_table.txt"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_PATH = os.path.join(SCRIPT_DIR, "evaluation_results.csv")   # written by evaluator.py
+OUTPUT_CSV_PREFIX = os.path.join(SCRIPT_DIR, "summary_table")
+OUTPUT_TXT = os.path.join(SCRIPT_DIR, "summary_pretty_table.txt")
 
-# === LOAD AND PROCESS ===
-df = pd.read_csv(RESULT_PATH)
+CHECKPOINT_DIR = os.path.join(SCRIPT_DIR, "evaluation_checkpoints")
 
-# Average over folds
-grouped = df.groupby(["user_type", "rating_type", "model"]).mean(numeric_only=True).reset_index()
+MODELS = ["svd", "knn", "baseline"]
+RATING_TYPES = ["enjoyment", "playcount"]
 
 # Metrics to include
 base_metrics = ["true_avg", "true_top", "true_min", "mse"]
 
-# Reorganize columns
-rows = []
-for (user_type, rating_type), subdf in grouped.groupby(["user_type", "rating_type"]):
-    for model in ["svd", "knn", "baseline"]:
-        row = {"user_type": user_type, "rating_type": rating_type, "model": model}
-        model_df = subdf[subdf["model"] == model]
-        if not model_df.empty:
-            for metric in base_metrics:
-                unf = float(model_df[f"{metric}_unfiltered"].values[0])
-                fil = float(model_df[f"{metric}_filtered"].values[0])
-                row[f"{metric}_unfiltered"] = unf
-                row[f"{metric}_filtered"] = fil
-                row[f"{metric}_delta"] = fil - unf
-        rows.append(row)
-    # Add average row
-    avg_row = {"user_type": user_type, "rating_type": rating_type, "model": "avg"}
-    for metric in base_metrics:
-        unf_mean = float(subdf[f"{metric}_unfiltered"].mean())
-        fil_mean = float(subdf[f"{metric}_filtered"].mean())
-        avg_row[f"{metric}_unfiltered"] = unf_mean
-        avg_row[f"{metric}_filtered"] = fil_mean
-        avg_row[f"{metric}_delta"] = fil_mean - unf_mean
-    rows.append(avg_row)
-
-final_df = pd.DataFrame(rows)
-
-# Convert all numerical columns to float explicitly (for CSV clarity)
-float_cols = [col for col in final_df.columns if any(m in col for m in base_metrics)]
-final_df[float_cols] = final_df[float_cols].astype(float)
+configure(globals(), "result_table")
+
+
+# === LOAD AND PROCESS ===
+def load_results(path):
+    """Fold rows from an evaluation CSV, or from a checkpoint directory (also while a run is in progress)."""
+    if os.path.isdir(path):
+        df = checkpoint_results(path)
+        print(f"[INFO] {len(df)} finished job(s) in {path}")
+        return df
+    return pd.read_csv(path)
+
+
+def build_summary(df):
+    # Average over folds
+    grouped = df.groupby(["user_type", "rating_type", "model"]).mean(numeric_only=True).reset_index()
+    n_folds = df.groupby(["user_type", "rating_type", "model"]).size()
+    # Sampled runs (evaluator.py --sampled) report how many users were actually evaluated
+    users_col = "n_users_evaluated" if "n_users_evaluated" in df else "n_users"
+    n_users = df.groupby(["user_type", "rating_type", "model"])[users_col].sum()
+
+    # Reorganize columns
+    rows = []
+    for (user_type, rating_type), subdf in grouped.groupby(["user_type", "rating_type"]):
+        for model in MODELS:
+            row = {"user_type": user_type, "rating_type": rating_type, "model": model}
+            model_df = subdf[subdf["model"] == model]
+            if not model_df.empty:
+                row["folds"] = int(n_folds[(user_type, rating_type, model)])
+                row["users"] = int(n_users[(user_type, rating_type, model)])
+                for metric in base_metrics:
+                    unf = float(model_df[f"{metric}_unfiltered"].values[0])
+                    fil = float(model_df[f"{metric}_filtered"].values[0])
+                    row[f"{metric}_unfiltered"] = unf
+                    row[f"{metric}_filtered"] = fil
+                    row[f"{metric}_delta"] = fil - unf
+                    if f"{metric}_delta_ci" in df:
+                        # Half width for the mean over independent folds
+                        fold_ci = df[(df["user_type"] == user_type) & (df["rating_type"] == rating_type)
+                                     & (df["model"] == model)][f"{metric}_delta_ci"]
+                        row[f"{metric}_delta_ci"] = float(np.sqrt((fold_ci ** 2).sum()) / len(fold_ci))
+            rows.append(row)
+        # Add average row
+        avg_row = {"user_type": user_type, "rating_type": rating_type, "model": "avg"}
+        for metric in base_metrics:
+            unf_mean = float(subdf[f"{metric}_unfiltered"].mean())
+            fil_mean = float(subdf[f"{metric}_filtered"].mean())
+            avg_row[f"{metric}_unfiltered"] = unf_mean
+            avg_row[f"{metric}_filtered"] = fil_mean
+            avg_row[f"{metric}_delta"] = fil_mean - unf_mean
+        rows.append(avg_row)
+
+    final_df = pd.DataFrame(rows)
+
+    # Convert all numerical columns to float explicitly (for CSV clarity)
+    float_cols = [col for col in final_df.columns if any(m in col for m in base_metrics)]
+    final_df[float_cols] = final_df[float_cols].astype(float)
+    for col in ["folds", "users"]:
+        if col in final_df:
+            final_df[col] = final_df[col].astype("Int64")
+    return final_df
+
 
 # === SPLIT TABLES AND SAVE ===
-for rating_type in ["enjoyment", "playcount"]:
-    part = final_df[final_df["rating_type"] == rating_type].drop(columns=["rating_type"])
-    
-    # Convert all float columns to string with comma decimal
-    for col in part.select_dtypes(include=[float]).columns:
-        part[col] = part[col].map(lambda x: f"{x:.6f}".replace('.', ','))
+def save_tables(final_df, csv_prefix=OUTPUT_CSV_PREFIX, txt_path=OUTPUT_TXT):
+    for rating_type in RATING_TYPES:
+        part = final_df[final_df["rating_type"] == rating_type].drop(columns=["rating_type"])
+
+        # Convert all float columns to string with comma decimal
+        for col in part.select_dtypes(include=[float]).columns:
+            part[col] = part[col].map(lambda x: f"{x:.6f}".replace('.', ','))
+
+        out_csv = f"{csv_prefix}_{rating_type}.csv"
+        part.to_csv(out_csv, index=False, sep=";", encoding="utf-8")
 
-    out_csv = f"{OUTPUT_CSV_PREFIX}_{rating_type}.csv"
-    part.to_csv(out_csv, index=False, sep=";", encoding="utf-8")
+    # === TXT PRETTY PRINT ===
+    with open(txt_path, "w") as f:
+        f.write(pretty_tables(final_df))
 
 
-# === TXT PRETTY PRINT ===
-with open(OUTPUT_TXT, "w") as f:
-    for rating_type in ["enjoyment", "playcount"]:
-        f.write(f"\n=== Rating Type: {rating_type.upper()} ===\n")
+def pretty_tables(final_df):
+    out = []
+    for rating_type in RATING_TYPES:
+        out.append(f"\n=== Rating Type: {rating_type.upper()} ===\n")
         pretty = final_df[final_df["rating_type"] == rating_type].drop(columns=["rating_type"])
-        f.write(pretty.to_string(index=False, float_format="%.4f"))
-        f.write("\n\n")
+        out.append(pretty.to_string(index=False, float_format="%.4f"))
+        out.append("\n\n")
+    return "".join(out)
+
+
+# === HYPERPARAMETER TRIALS ===
+def summarize_trials(path):
+    """Best surviving config per variant and model from hparam_search.py's trials table."""
+    trials = pd.read_csv(path)
+    rows = []
+    for (user_type, rating_type, model), sub in trials.groupby(["user_type", "rating_type", "model"]):
+        final = sub[sub["status"] == "final"]
+        best = final.loc[final["rmse"].idxmin()]
+        rows.append({
+            "user_type": user_type,
+            "rating_type": rating_type,
+            "model": model,
+            "trials": sub["trial"].nunique(),
+            "pruned": int((sub["status"] == "pruned").sum()),
+            "best_params": best["params"],
+            "best_rmse": best["rmse"],
+            "best_rmse_std": best["rmse_std"],
+            "runner_up_rmse": final["rmse"].nsmallest(2).iloc[-1] if len(final) > 1 else np.nan,
+            "fit_s_total": sub["fit_s"].sum(),
+        })
+    return pd.DataFrame(rows)
+
+
+def summarize(results=RESULT_PATH, print_only=False, trials=None):
+    """Summary tables of an evaluation run (or of a hparam_search.py trials table)."""
+    if trials:
+        print(summarize_trials(trials).to_string(index=False, float_format="%.5f"))
+        return
+
+    results_df = load_results(results)
+    if results_df.empty:
+        print("⚠️ No finished evaluation jobs yet.")
+        raise SystemExit(1)
+    final_df = build_summary(results_df)
+    if print_only:
+        print(pretty_tables(final_df))
+    else:
+        save_tables(final_df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize evaluation results per variant and model.")
+    parser.add_argument("--results", default=RESULT_PATH,
+                        help="evaluation_results.csv or a checkpoint directory written by evaluator.py")
+    parser.add_argument("--checkpoints", action="store_const", const=CHECKPOINT_DIR, dest="results",
+                        help="aggregate the evaluator's default checkpoint directory")
+    parser.add_argument("--print-only", action="store_true", help="print the tables instead of writing files")
+    parser.add_argument("--trials", help="summarize a hparam_search.py trials table instead")
+    args = parser.parse_args()
+    summarize(args.results, args.print_only, args.trials)
@@ -0,0 +1,93 @@
+import numpy as np
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+BATCH_SIZE = 1024    # ratings per vectorized SGD step
+INIT_MEAN = 0.0      # same factor initialization as surprise.SVD
+INIT_STD = 0.1
+
+# ============================================
+
+# Mini-batch SGD for the biased matrix factorization of surprise.SVD
+# (r_ui ~ mu + b_u + b_i + p_u . q_i), on plain numpy arrays of contiguous
+# user/item indices. Within a batch every rating contributes the same update
+# as in Surprise's per-rating loop; updates of a user or item that appears
+# several times in one batch are summed. Used by hparam_search.py (epochs in
+# rungs, warm starts) and streaming_mf.py (shards from disk).
+
+
+class FactorModel:
+    """Parameters of a biased MF model; arrays are updated in place by `sgd_epoch`."""
+
+    def __init__(self, mu, bu, bi, pu, qi):
+        self.mu, self.bu, self.bi, self.pu, self.qi = float(mu), bu, bi, pu, qi
+
+    @classmethod
+    def random(cls, n_users, n_items, n_factors, mu, rng, init_mean=INIT_MEAN, init_std=INIT_STD):
+        return cls(mu, np.zeros(n_users), np.zeros(n_items),
+                   rng.normal(init_mean, init_std, (n_users, n_factors)),
+                   rng.normal(init_mean, init_std, (n_items, n_factors)))
+
+    def copy(self):
+        return FactorModel(self.mu, self.bu.copy(), self.bi.copy(), self.pu.copy(), self.qi.copy())
+
+    def save(self, path):
+        np.savez(path, mu=self.mu, bu=self.bu, bi=self.bi, pu=self.pu, qi=self.qi)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        with np.load(path, mmap_mode=mmap_mode) as data:
+            return cls(data["mu"], data["bu"], data["bi"], data["pu"], data["qi"])
+
+
+def sgd_epoch(model, users, items, ratings, lr, reg, rng=None, batch_size=BATCH_SIZE, weights=None):
+    """
+    One pass over the given ratings. `lr` and `reg` are (bu, bi, pu, qi)
+    tuples like surprise.SVD's lr_bu/lr_bi/lr_pu/lr_qi and reg_*. With
+    `weights`, each rating's error term is scaled by its weight
+    (weighted squared loss). The order is shuffled when `rng` is given.
+    """
+    lr_bu, lr_bi, lr_pu, lr_qi = lr
+    reg_bu, reg_bi, reg_pu, reg_qi = reg
+    bu, bi, pu, qi = model.bu, model.bi, model.pu, model.qi
+    order = rng.permutation(len(ratings)) if rng is not None else np.arange(len(ratings))
+
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        u, i = users[idx], items[idx]
+        pu_b, qi_b = pu[u], qi[i]
+        err = ratings[idx] - (model.mu + bu[u] + bi[i] + np.einsum("ij,ij->i", pu_b, qi_b))
+        if weights is not None:
+            err = err * weights[idx]
+
+        np.add.at(bu, u, lr_bu * (err - reg_bu * bu[u]))
+        np.add.at(bi, i, lr_bi * (err - reg_bi * bi[i]))
+        np.add.at(pu, u, lr_pu * (err[:, None] * qi_b - reg_pu * pu_b))
+        np.add.at(qi, i, lr_qi * (err[:, None] * pu_b - reg_qi * qi_b))
+
+
+def predict(model, users, items, known_users=None, known_items=None, rating_scale=(0.0, 1.0)):
+    """
+    surprise.SVD.estimate + clipping for arrays: user/item terms only count
+    when the user/item was seen in training (boolean masks indexed by id).
+    """
+    ku = known_users[users] if known_users is not None else np.ones(len(users), dtype=bool)
+    ki = known_items[items] if known_items is not None else np.ones(len(items), dtype=bool)
+    est = np.full(len(users), model.mu)
+    est += np.where(ku, model.bu[users], 0.0)
+    est += np.where(ki, model.bi[items], 0.0)
+    both = ku & ki
+    est[both] += np.einsum("ij,ij->i", model.pu[users[both]], model.qi[items[both]])
+    return np.clip(est, *rating_scale)
+
+
+def rmse(model, users, items, ratings, known_users=None, known_items=None, rating_scale=(0.0, 1.0)):
+    est = predict(model, users, items, known_users, known_items, rating_scale)
+    return float(np.sqrt(np.mean((est - ratings) ** 2)))
+
+
+def uniform_rates(lr_all, reg_all):
+    """(lr, reg) tuples for `sgd_epoch` from surprise.SVD's lr_all / reg_all."""
+    return (lr_all,) * 4, (reg_all,) * 4
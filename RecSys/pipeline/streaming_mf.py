@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+import sgd_mf
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from instrumentation import stage
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+DATA_DIR = os.path.join(SCRIPT_DIR, "..", "..", "data", "processed")
+SCORES_PATH = os.path.join(DATA_DIR, "top_10000__scores.csv")
+USERS_PATH = os.path.join(DATA_DIR, "top_10000__users.csv")
+SHARD_DIR = os.path.join(SCRIPT_DIR, "shards", "top_full")
+MODEL_PATH = os.path.join(SCRIPT_DIR, "models", "top_full_streaming_svd.npz")
+
+N_SHARDS = 32              # peak memory ~ factor matrices + one shard (16 bytes per rating)
+CHUNKSIZE = 1_000_000      # CSV rows per read while sharding
+VAL_SHARDS = 1             # last shard(s) held out for validation RMSE
+
+# "decay":  keep every score, weight pre-stabilization scores by 0.5 ** (days before / HALF_LIFE_DAYS)
+# "cutoff": drop pre-stabilization scores (what recommend.py does)
+# "none":   keep every score with weight 1
+WEIGHTING = "decay"
+HALF_LIFE_DAYS = 180
+
+SVD_KWARGS = dict(n_factors=50, n_epochs=20, lr_all=0.005, reg_all=0.05)
+SEED = 42
+
+RECORD = np.dtype([("u", np.int32), ("i", np.int32), ("r", np.float32), ("w", np.float32)])
+
+# ============================================
+
+
+# ========== SHARDING ==========
+
+class _IdMap:
+    """Incremental raw id -> contiguous index map, one chunk at a time."""
+
+    def __init__(self):
+        self.index = {}
+        self.ids = []
+
+    def encode(self, raw):
+        codes = pd.Series(raw).map(self.index)
+        new = pd.unique(raw[codes.isna().to_numpy()])
+        for raw_id in new:
+            self.index[raw_id] = len(self.ids)
+            self.ids.append(raw_id)
+        if len(new):
+            codes = pd.Series(raw).map(self.index)
+        return codes.to_numpy(dtype=np.int32)
+
+
+def time_weights(dates, stabilization, weighting=WEIGHTING, half_life_days=HALF_LIFE_DAYS):
+    """Weight per score from its date relative to the user's skill_stabilization_date (NaN = drop)."""
+    days_before = ((stabilization - dates).dt.total_seconds() / 86400.0).to_numpy()
+    if weighting == "none":
+        return np.ones(len(days_before), dtype=np.float32)
+    if weighting == "cutoff":
+        return np.where(days_before <= 0, 1.0, np.nan).astype(np.float32)
+    if weighting == "decay":
+        return np.power(0.5, np.maximum(days_before, 0.0) / half_life_days).astype(np.float32)
+    raise ValueError(f"Unknown weighting: {weighting}")
+
+
+def build_shards(scores_path=SCORES_PATH, users_path=USERS_PATH, shard_dir=SHARD_DIR, n_shards=N_SHARDS,
+                 weighting=WEIGHTING, chunksize=CHUNKSIZE, seed=SEED):
+    """
+    One streaming pass over the scores CSV: encode ids, weight by date,
+    scatter rows into `n_shards` random shards on disk. Each shard is then
+    shuffled in memory (one at a time) and its enjoyment min-max scaled to
+    [0, 1] with the global range. Writes shard_XXX.bin, user_ids.npy,
+    item_ids.npy and meta.json.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(shard_dir, "shard_*")):
+        os.remove(old)
+    rng = np.random.RandomState(seed)
+    users = (
+        pd.read_csv(users_path, usecols=['user_id', 'skill_stabilization_date'],
+                    parse_dates=['skill_stabilization_date'])
+        .set_index('user_id')
+    )
+    user_map, item_map = _IdMap(), _IdMap()
+    raw_paths = [os.path.join(shard_dir, f"shard_{s:03d}.raw") for s in range(n_shards)]
+    raw_files = [open(p, "wb") for p in raw_paths]
+    r_min, r_max, n_rows = np.inf, -np.inf, 0
+
+    usecols = ['user_id', 'mod_beatmap_id', 'enjoyment', 'date']
+    dtype = {'user_id': np.int32, 'enjoyment': np.float32}
+    conv = {'mod_beatmap_id': lambda x: np.int64(float(x))}
+    try:
+        with stage("shard_scores", weighting=weighting) as st:
+            for chunk in tqdm(pd.read_csv(scores_path, usecols=usecols, dtype=dtype, converters=conv,
+                                          parse_dates=['date'], chunksize=chunksize),
+                              desc="Sharding scores", unit="chunk"):
+                chunk = chunk.join(users, on='user_id', how='inner')
+                w = time_weights(chunk['date'], chunk['skill_stabilization_date'], weighting)
+                keep = np.isfinite(w)
+                chunk, w = chunk[keep], w[keep]
+                if chunk.empty:
+                    continue
+
+                records = np.empty(len(chunk), dtype=RECORD)
+                records["u"] = user_map.encode(chunk['user_id'].to_numpy())
+                records["i"] = item_map.encode(chunk['mod_beatmap_id'].to_numpy())
+                records["r"] = chunk['enjoyment'].to_numpy()
+                records["w"] = w
+                r_min, r_max = min(r_min, records["r"].min()), max(r_max, records["r"].max())
+                n_rows += len(records)
+
+                shard = rng.randint(n_shards, size=len(records))
+                order = np.argsort(shard, kind="stable")
+                bounds = np.searchsorted(shard[order], np.arange(n_shards + 1))
+                for s in range(n_shards):
+                    records[order[bounds[s]:bounds[s + 1]]].tofile(raw_files[s])
+            st.rows_out = n_rows
+    finally:
+        for f in raw_files:
+            f.close()
+
+    sizes = []
+    scale = (r_max - r_min) or 1.0
+    with stage("shuffle_shards", rows_in=n_rows):
+        for s, raw_path in enumerate(tqdm(raw_paths, desc="Shuffling shards", unit="shard")):
+            records = np.fromfile(raw_path, dtype=RECORD)
+            records = records[rng.permutation(len(records))]
+            records["r"] = (records["r"] - r_min) / scale
+            records.tofile(os.path.join(shard_dir, f"shard_{s:03d}.bin"))
+            os.remove(raw_path)
+            sizes.append(len(records))
+
+    np.save(os.path.join(shard_dir, "user_ids.npy"), np.asarray(user_map.ids))
+    np.save(os.path.join(shard_dir, "item_ids.npy"), np.asarray(item_map.ids))
+    meta = {"n_users": len(user_map.ids), "n_items": len(item_map.ids), "n_rows": n_rows,
+            "shard_sizes": sizes, "enjoyment_min": float(r_min), "enjoyment_max": float(r_max),
+            "weighting": weighting, "half_life_days": HALF_LIFE_DAYS, "source": os.path.abspath(scores_path)}
+    with open(os.path.join(shard_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"[INFO] {n_rows} scores of {meta['n_users']} users / {meta['n_items']} items in {n_shards} shards")
+    return meta
+
+
+def load_shard(shard_dir, s):
+    """Memory-map one shard (read-only)."""
+    return np.memmap(os.path.join(shard_dir, f"shard_{s:03d}.bin"), dtype=RECORD, mode="r")
+
+
+# ========== TRAINING ==========
+
+def train_streaming(shard_dir=SHARD_DIR, n_factors=50, n_epochs=20, lr_all=0.005, reg_all=0.05,
+                    val_shards=VAL_SHARDS, seed=SEED):
+    """
+    Biased MF over the shards with sgd_mf's kernel. Only the factor
+    matrices stay resident; each epoch visits the training shards in a new
+    random order and loads one at a time. Returns (model, per-epoch val RMSE).
+    """
+    with open(os.path.join(shard_dir, "meta.json")) as f:
+        meta = json.load(f)
+    n_shards = len(meta["shard_sizes"])
+    train_ids = list(range(n_shards - val_shards))
+    rng = np.random.RandomState(seed)
+    lr, reg = sgd_mf.uniform_rates(lr_all, reg_all)
+
+    # Weighted global mean and seen users/items, one shard at a time
+    sum_wr, sum_w = 0.0, 0.0
+    known_u = np.zeros(meta["n_users"], dtype=bool)
+    known_i = np.zeros(meta["n_items"], dtype=bool)
+    for s in train_ids:
+        shard = load_shard(shard_dir, s)
+        sum_wr += float(np.dot(shard["w"].astype(np.float64), shard["r"]))
+        sum_w += float(shard["w"].sum(dtype=np.float64))
+        known_u[shard["u"]] = True
+        known_i[shard["i"]] = True
+    model = sgd_mf.FactorModel.random(meta["n_users"], meta["n_items"], n_factors, sum_wr / sum_w, rng)
+
+    history = []
+    for epoch in range(n_epochs):
+        with stage("streaming_epoch", rows_in=sum(meta["shard_sizes"][s] for s in train_ids), epoch=epoch):
+            for s in tqdm(rng.permutation(train_ids), desc=f"Epoch {epoch + 1}/{n_epochs}", unit="shard", leave=False):
+                shard = np.array(load_shard(shard_dir, s))
+                r = shard["r"].astype(np.float64)
+                sgd_mf.sgd_epoch(model, shard["u"], shard["i"], r, lr, reg, rng, weights=shard["w"])
+                del shard, r
+
+        if val_shards:
+            se, n = 0.0, 0
+            for s in range(n_shards - val_shards, n_shards):
+                shard = load_shard(shard_dir, s)
+                est = sgd_mf.predict(model, shard["u"], shard["i"], known_u, known_i)
+                se += float(np.sum(shard["w"] * (est - shard["r"]) ** 2))
+                n += float(shard["w"].sum(dtype=np.float64))
+            history.append(np.sqrt(se / n))
+            print(f"Epoch {epoch + 1}/{n_epochs}: weighted val RMSE {history[-1]:.5f}")
+    return model, history
+
+
+def save_model(model, shard_dir, out_path=MODEL_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    np.savez(out_path, mu=model.mu, bu=model.bu, bi=model.bi, pu=model.pu, qi=model.qi,
+             user_ids=np.load(os.path.join(shard_dir, "user_ids.npy")),
+             item_ids=np.load(os.path.join(shard_dir, "item_ids.npy")))
+    print(f"✔ Saved model: {out_path}")
+
+
+def recommend(model, user_ids, item_ids, raw_uid, n_rec=5):
+    u = int(np.flatnonzero(user_ids == raw_uid)[0])
+    scores = model.qi @ model.pu[u] + model.bi
+    top = np.argpartition(-scores, n_rec)[:n_rec]
+    return item_ids[top[np.argsort(-scores[top])]].tolist()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Out-of-core MF over shuffled, memory-mapped rating shards.")
+    parser.add_argument("--scores", default=SCORES_PATH)
+    parser.add_argument("--users", default=USERS_PATH)
+    parser.add_argument("--shard-dir", default=SHARD_DIR)
+    parser.add_argument("--shards", type=int, default=N_SHARDS)
+    parser.add_argument("--weighting", default=WEIGHTING, choices=["decay", "cutoff", "none"])
+    parser.add_argument("--reuse-shards", action="store_true", help="train on existing shards")
+    parser.add_argument("--out", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    if not (args.reuse_shards and os.path.exists(os.path.join(args.shard_dir, "meta.json"))):
+        build_shards(args.scores, args.users, args.shard_dir, args.shards, args.weighting)
+    model, _ = train_streaming(args.shard_dir, **SVD_KWARGS)
+    save_model(model, args.shard_dir, args.out)
+
+    user_ids = np.load(os.path.join(args.shard_dir, "user_ids.npy"))
+    item_ids = np.load(os.path.join(args.shard_dir, "item_ids.npy"))
+    for raw_uid in user_ids[:5]:
+        print(f"User {raw_uid}: {recommend(model, user_ids, item_ids, raw_uid)}")
@@ -2,7 +2,10 @@ import numpy as np
 import pandas as pd
 from tqdm import tqdm
 from surprise import Dataset, Reader, SVD
-from surprise.model_selection import train_test_split, cross_validate
+from surprise.model_selection import train_test_split
+from parallel_cv import parallel_cross_validate
+from instrumentation import stage, instrumented
+from config import configure
 
 # Paths for random-user data
 # RANDOM_SCORES = '../data/processed/random_10000__scores.csv'
@@ -12,15 +15,26 @@ from surprise.model_selection import train_test_split, cross_validate
 RANDOM_SCORES = '../data/processed/top_10000__scores.csv'
 RANDOM_USERS = '../data/processed/top_10000__users.csv'
 
-# load user stabilization dates
-users = (
-    pd.read_csv(RANDOM_USERS,
-                usecols=['user_id', 'skill_stabilization_date'],
-                parse_dates=['skill_stabilization_date'])
-    .set_index('user_id')
-)
+SVD_KWARGS = dict(n_factors=50, n_epochs=20, lr_all=0.005, reg_all=0.05)
 
+# CV folds run in separate processes; every worker holds its own trainset,
+# so lower this if 5 concurrent fits do not fit into memory
+N_JOBS = -1
 
+configure(globals(), "recommend")
+
+
+def load_users():
+    """Load user stabilization dates."""
+    return (
+        pd.read_csv(RANDOM_USERS,
+                    usecols=['user_id', 'skill_stabilization_date'],
+                    parse_dates=['skill_stabilization_date'])
+        .set_index('user_id')
+    )
+
+
+@instrumented("load_random_scores")
 def load_random_scores(chunksize=1_000_000):
     """
     Stream random-user scores, filter by skill_stabilization_date,
@@ -29,6 +43,7 @@ def load_random_scores(chunksize=1_000_000):
     usecols = ['user_id', 'mod_beatmap_id', 'enjoyment', 'date']
     dtype = {'user_id': np.int32, 'enjoyment': np.float32}
     conv = {'mod_beatmap_id': lambda x: np.int64(float(x))}
+    users = load_users()
     df_list = []
     for chunk in tqdm(
             pd.read_csv(RANDOM_SCORES,
@@ -60,36 +75,50 @@ def prepare_dataset(df):
     return Dataset.load_from_df(df[['user_id', 'mod_beatmap_id', 'enjoyment']], reader)
 
 
-def evaluate(dataset, n_splits=5):
-    algo = SVD(n_factors=50, n_epochs=20, lr_all=0.005, reg_all=0.05)
+@instrumented("cross_validate")
+def evaluate(df, n_splits=5, n_jobs=N_JOBS):
+    """
+    Cross-validate SVD with folds running concurrently. Takes the (already
+    scaled) ratings frame instead of the Surprise Dataset so the rating
+    arrays can be placed in shared memory once for all workers.
+    """
     print(f'Running {n_splits}-fold CV...')
-    res = cross_validate(algo, dataset, measures=['RMSE', 'MAE'], cv=n_splits, verbose=True)
+    res = parallel_cross_validate(df, SVD, SVD_KWARGS,
+                                  columns=('user_id', 'mod_beatmap_id', 'enjoyment'),
+                                  measures=['RMSE', 'MAE'], n_splits=n_splits, n_jobs=n_jobs)
     print(f"RMSE={np.mean(res['test_rmse']):.4f}, MAE={np.mean(res['test_mae']):.4f}")
 
 
 def train_and_recommend(dataset, n_users=5, n_rec=5):
     trainset, _ = train_test_split(dataset, test_size=0.2, random_state=42)
-    algo = SVD(n_factors=50, n_epochs=20, lr_all=0.005, reg_all=0.05)
-    algo.fit(trainset)
+    algo = SVD(**SVD_KWARGS)
+    with stage("fit", rows_in=trainset.n_ratings, model="SVD"):
+        algo.fit(trainset)
     users = np.unique(trainset.all_users())[:n_users]
-    for uid in users:
-        raw_id = trainset.to_raw_uid(uid) if hasattr(trainset, 'to_raw_uid') else uid
-        preds = [(iid, algo.predict(raw_id, trainset.to_raw_iid(iid)).est)
-                 for iid in trainset.all_items()]
-        top = sorted(preds, key=lambda x: -x[1])[:n_rec]
-        print(f"User {raw_id}: {[iid for iid, _ in top]}")
+    with stage("recommend", rows_in=len(users) * trainset.n_items) as st:
+        st.rows_out = len(users)
+        for uid in users:
+            raw_id = trainset.to_raw_uid(uid) if hasattr(trainset, 'to_raw_uid') else uid
+            preds = [(iid, algo.predict(raw_id, trainset.to_raw_iid(iid)).est)
+                     for iid in trainset.all_items()]
+            top = sorted(preds, key=lambda x: -x[1])[:n_rec]
+            print(f"User {raw_id}: {[iid for iid, _ in top]}")
 
 
-if __name__ == '__main__':
+def main():
     # 1) filter
     scores = load_random_scores()
     print(f"Loaded {len(scores)} post-stabilization scores")
-    # 2) prepare & evaluate
+    # 2) prepare & evaluate (prepare_dataset scales scores['enjoyment'] in place)
     data = prepare_dataset(scores)
-    evaluate(data)
+    evaluate(scores)
     # 3) final train + recommendations
     train_and_recommend(data)
 
+
+if __name__ == '__main__':
+    main()
+
 """
 Loaded 6296570 post-stabilization scores
 Raw enjoyment range: -4.8750 to 10.3110
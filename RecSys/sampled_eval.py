@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+ACTIVITY_BINS = 4          # quantile bins of ratings per user
+BATCH_SIZE = 200           # users evaluated between convergence checks
+CI_WIDTH = 0.01            # stop once every metric's interval is at most this wide
+CONFIDENCE = 0.95
+MIN_PER_STRATUM = 5        # users evaluated per stratum before stopping is allowed
+
+# ============================================
+
+
+# ========== STRATA ==========
+
+def make_strata(user_counts, n_bins=ACTIVITY_BINS, user_type=None):
+    """
+    Stratum label per user: activity quantile bin of `user_counts`
+    (Series user_id -> number of ratings), prefixed with `user_type`
+    (a scalar or a Series aligned on user_id) when given.
+    """
+    pct = user_counts.rank(method="first", pct=True)
+    bins = np.minimum(np.ceil(pct * n_bins).astype(int) - 1, n_bins - 1)
+    labels = "a" + bins.astype(str)
+    if user_type is not None:
+        labels = (user_type if np.isscalar(user_type) else user_type.reindex(user_counts.index).astype(str)) + ":" + labels
+    return labels
+
+
+def stratified_order(strata, rng):
+    """
+    All users in a random order in which every prefix is (nearly)
+    proportionally allocated across strata: user i of a shuffled stratum of
+    size N_h gets the key (i + u) / N_h with u ~ U(0, 1).
+    """
+    keys = np.empty(len(strata))
+    codes, uniques = pd.factorize(strata)
+    for h in range(len(uniques)):
+        idx = np.flatnonzero(codes == h)
+        keys[rng.permutation(idx)] = (np.arange(len(idx)) + rng.random(len(idx))) / len(idx)
+    return strata.index.to_numpy()[np.argsort(keys, kind="stable")]
+
+
+# ========== RUNNING ESTIMATES ==========
+
+class StratifiedMeans:
+    """
+    Running per-stratum means/variances (Welford) combined into stratified
+    estimates with CLT confidence intervals and finite population correction.
+    Non-finite metric values are ignored; users whose evaluation returned
+    nothing only count as attempted, which sets each stratum's share of
+    valid users.
+    """
+
+    def __init__(self, strata_sizes):
+        self.sizes = dict(strata_sizes)
+        self.attempted = dict.fromkeys(self.sizes, 0)
+        self.valid = dict.fromkeys(self.sizes, 0)
+        self.stats = {}   # metric -> stratum -> [n, mean, m2]
+
+    def add(self, stratum, result):
+        self.attempted[stratum] += 1
+        if not result:
+            return
+        self.valid[stratum] += 1
+        for metric, value in result.items():
+            if not isinstance(value, (int, float, np.number)) or not np.isfinite(value):
+                continue
+            s = self.stats.setdefault(metric, {}).setdefault(stratum, [0, 0.0, 0.0])
+            s[0] += 1
+            delta = value - s[1]
+            s[1] += delta / s[0]
+            s[2] += delta * (value - s[1])
+
+    def _weights(self):
+        # Estimated number of valid users per stratum
+        est = {h: self.sizes[h] * self.valid[h] / self.attempted[h] for h in self.sizes if self.attempted[h]}
+        total = sum(est.values())
+        return {h: n / total for h, n in est.items()} if total else {}
+
+    def estimate(self, metric, confidence=CONFIDENCE):
+        """(mean, half width of the interval); the half width is inf while a stratum lacks data."""
+        per_stratum = self.stats.get(metric, {})
+        parts = []
+        for h, w in self._weights().items():
+            n, m, m2 = per_stratum.get(h, (0, 0.0, 0.0))
+            exhausted = self.attempted[h] == self.sizes[h]
+            if w == 0 or (n == 0 and exhausted):
+                continue
+            if n < 2 and not exhausted:
+                return np.nan, np.inf
+            fpc = 0.0 if exhausted else max(0.0, 1.0 - n / (self.sizes[h] * self.valid[h] / self.attempted[h]))
+            parts.append((w, m, m2 / (n - 1) / n * fpc if n > 1 else 0.0))
+        if not parts:
+            return np.nan, np.inf
+
+        total = sum(w for w, _, _ in parts)
+        mean = sum(w * m for w, m, _ in parts) / total
+        var = sum((w / total) ** 2 * v for w, _, v in parts)
+        return mean, norm.ppf(0.5 + confidence / 2) * np.sqrt(var)
+
+    def summary(self, confidence=CONFIDENCE):
+        return {metric: self.estimate(metric, confidence) for metric in self.stats}
+
+    def converged(self, ci_width, confidence=CONFIDENCE, min_per_stratum=MIN_PER_STRATUM):
+        if any(self.attempted[h] < min(min_per_stratum, self.sizes[h]) for h in self.sizes):
+            return False
+        estimates = self.summary(confidence)
+        return bool(estimates) and all(2 * half <= ci_width for _, half in estimates.values())
+
+
+# ========== SAMPLED EVALUATION ==========
+
+def sampled_evaluate(strata, evaluate_user, batch_size=BATCH_SIZE, ci_width=CI_WIDTH, confidence=CONFIDENCE,
+                     min_per_stratum=MIN_PER_STRATUM, max_users=None, seed=0):
+    """
+    Evaluate users (index of `strata`) in stratified random batches with
+    `evaluate_user(user_id) -> dict of metrics | None` until every metric's
+    confidence interval is at most `ci_width` wide, `max_users` users were
+    evaluated, or all users are done.
+
+    Returns a result row: the stratified mean of every metric, `<metric>_ci`
+    (half width), n_users (users with a result), n_users_evaluated,
+    n_users_total and stopped_early.
+    """
+    rng = np.random.RandomState(seed)
+    order = stratified_order(strata, rng)
+    if max_users is not None:
+        order = order[:max_users]
+    labels = strata.to_dict()
+    stats = StratifiedMeans(strata.value_counts().to_dict())
+
+    stopped_early = False
+    n_evaluated = 0
+    for start in range(0, len(order), batch_size):
+        for uid in order[start:start + batch_size]:
+            stats.add(labels[uid], evaluate_user(uid))
+            n_evaluated += 1
+        if n_evaluated < len(order) and stats.converged(ci_width, confidence, min_per_stratum):
+            stopped_early = True
+            break
+
+    row = {}
+    for metric, (mean, half) in stats.summary(confidence).items():
+        row[metric] = float(mean)
+        row[f"{metric}_ci"] = float(half)
+    row.update({
+        "n_users": sum(stats.valid.values()),
+        "n_users_evaluated": n_evaluated,
+        "n_users_total": len(strata),
+        "stopped_early": stopped_early,
+    })
+    return row
+
+
+def add_deltas(result, base_metrics, suffixes=("filtered", "unfiltered")):
+    """Per-user paired differences `<metric>_delta` (filtered - unfiltered); much tighter than the two separate means."""
+    if not result:
+        return result
+    after, before = suffixes
+    for metric in base_metrics:
+        result[f"{metric}_delta"] = result[f"{metric}_{after}"] - result[f"{metric}_{before}"]
+    return result
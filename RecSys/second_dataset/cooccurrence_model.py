@@ -0,0 +1,122 @@
+import os
+import sys
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from tqdm import tqdm
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from cooccurrence import CooccurrenceModel, top_neighbours
+from instrumentation import stage
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+DATA_DIR   = SCRIPT_DIR
+MODEL_DIR  = os.path.join(SCRIPT_DIR, "models_instacart")
+MODEL_PATH = os.path.join(MODEL_DIR, "instacart_cooccurrence.pkl")   # picked up by evaluator.py
+
+# "order": items bought in the same order co-occur; "user": items bought by the same user
+BASKET = "order"
+TOP_N = 50
+MEASURE = "jaccard"        # "count", "lift" or "jaccard"
+MIN_SUPPORT = 5
+BLOCK_SIZE = 512           # products per XᵀX block
+CHUNKSIZE = 2_000_000      # order_products__prior rows per read
+
+# ============================================
+
+
+def load_prior_orders():
+    """order_id -> (basket row, user row) lookup arrays for the prior orders."""
+    orders = pd.read_csv(os.path.join(DATA_DIR, "orders.csv"), usecols=["order_id", "user_id", "eval_set"])
+    orders = orders[orders["eval_set"] == "prior"]
+    user_codes, user_ids = pd.factorize(orders["user_id"])
+    order_user = np.full(orders["order_id"].max() + 1, -1, dtype=np.int32)
+    order_user[orders["order_id"].to_numpy()] = user_codes
+    order_row = np.full(orders["order_id"].max() + 1, -1, dtype=np.int32)
+    order_row[orders["order_id"].to_numpy()] = np.arange(len(orders), dtype=np.int32)
+    return order_row, order_user, np.asarray(user_ids)
+
+
+def sum_parts(parts, shape):
+    """Sum of sparse matrices in one step: their COO triplets are concatenated and duplicates summed once."""
+    if not parts:
+        return sp.csr_matrix(shape, dtype=np.float32)
+    return sp.csr_matrix((np.concatenate([p.data for p in parts]),
+                          (np.concatenate([p.row for p in parts]), np.concatenate([p.col for p in parts]))),
+                         shape=shape, dtype=np.float32)
+
+
+def stream_matrices(order_row, order_user, n_users, basket=BASKET, chunksize=CHUNKSIZE):
+    """
+    One chunked pass over order_products__prior.csv. Returns the binary
+    basket x product matrix X and the user x product purchase counts, both
+    with one column per product id (empty columns are dropped later).
+    """
+    prior_path = os.path.join(DATA_DIR, "order_products__prior.csv")
+    n_baskets = int((order_row >= 0).sum()) if basket == "order" else n_users
+    n_items = int(pd.read_csv(os.path.join(DATA_DIR, "products.csv"), usecols=["product_id"])["product_id"].max()) + 1
+    x_parts, p_parts = [], []   # per-chunk COO matrices (duplicates within a chunk already summed)
+    n_rows = 0
+    for chunk in tqdm(pd.read_csv(prior_path, usecols=["order_id", "product_id"],
+                                  dtype={"order_id": np.int32, "product_id": np.int32}, chunksize=chunksize),
+                      desc="Streaming prior orders", unit="chunk"):
+        order_ids, items = chunk["order_id"].to_numpy(), chunk["product_id"].to_numpy()
+        users = order_user[order_ids]
+        ones = np.ones(len(items), dtype=np.float32)
+
+        rows = order_row[order_ids] if basket == "order" else users
+        x_parts.append(sp.csr_matrix((ones, (rows, items)), shape=(n_baskets, n_items)).tocoo())
+        p_parts.append(sp.csr_matrix((ones, (users, items)), shape=(n_users, n_items)).tocoo())
+        n_rows += len(chunk)
+
+    # Summed once at the end: adding every chunk to a running total would rebuild it per chunk
+    X = sum_parts(x_parts, (n_baskets, n_items))
+    X.data[:] = 1.0
+    del x_parts
+    profiles = sum_parts(p_parts, (n_users, n_items))
+    del p_parts
+    print(f"[INFO] {n_rows} order lines -> {X.shape[0]} baskets x {X.shape[1]} product ids ({X.nnz} nonzeros)")
+    return X, profiles
+
+
+def build_model(basket=BASKET, top_n=TOP_N, measure=MEASURE, min_support=MIN_SUPPORT, block_size=BLOCK_SIZE):
+    with stage("cooc_load_orders"):
+        order_row, order_user, user_ids = load_prior_orders()
+    with stage("cooc_stream_prior", basket=basket) as st:
+        X, profiles = stream_matrices(order_row, order_user, len(user_ids), basket)
+        st.rows_out = X.nnz
+    del order_row, order_user
+
+    product_ids = np.flatnonzero(X.getnnz(axis=0))
+    X, profiles = X[:, product_ids], profiles[:, product_ids]
+    with stage("cooc_top_neighbours", rows_in=X.nnz, measure=measure, top_n=top_n):
+        neighbours = top_neighbours(X, top_n, measure, min_support, block_size)
+    del X
+    print(f"[INFO] {neighbours.nnz} neighbour pairs over {len(product_ids)} products ({measure}, top {top_n})")
+    return CooccurrenceModel(neighbours, product_ids, profiles, user_ids, measure)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Item-item co-occurrence model from Instacart prior orders.")
+    parser.add_argument("--basket", default=BASKET, choices=["order", "user"])
+    parser.add_argument("--measure", default=MEASURE, choices=["count", "lift", "jaccard"])
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--out", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    model = build_model(args.basket, args.top_n, args.measure)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    joblib.dump(model, args.out)
+    print(f"✔ Saved model: {args.out}")
+
+    names = pd.read_csv(os.path.join(DATA_DIR, "products.csv"), index_col="product_id")["product_name"]
+    popular = np.asarray(model.profiles.getnnz(axis=0)).argsort()[::-1][:3]
+    for pid in model.item_index[popular]:
+        similar = [names.get(int(j), j) for j, _ in model.similar_items(pid, 5)]
+        print(f"{names.get(int(pid), pid)}: {similar}")
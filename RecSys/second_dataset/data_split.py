@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -6,19 +7,30 @@ from tqdm import tqdm
 from joblib import Parallel, delayed
 import multiprocessing
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import configure
+
+ORDERS_PATH   = os.path.join("DataAnalysis", "second_dataset", "orders.csv")
+OP_TRAIN_PATH = os.path.join("DataAnalysis", "second_dataset", "order_products__train.csv")
+OUTPUT_DIR = "./generated_splits_instacart"
+
+configure(globals(), "instacart_data_split")
+
 # 1) Load Instacart data directly from local CSVs in data/archive/
-orders   = pd.read_csv(r"DataAnalysis\second_dataset\orders.csv", usecols=['order_id','user_id'])
-op_train = pd.read_csv(r"DataAnalysis\second_dataset\order_products__train.csv", usecols=['order_id','product_id'])
-
-# 2) Build implicit-feedback DataFrame
-scores = (
-    op_train
-    .merge(orders, on='order_id', how='inner')
-    .loc[:, ['user_id','product_id']]
-    .assign(rating=1.0)
-    .astype({'user_id': str, 'product_id': str, 'rating': float})
-)
-print(f"[INFO] Loaded {len(scores)} interactions")
+def load_scores():
+    orders   = pd.read_csv(ORDERS_PATH, usecols=['order_id','user_id'])
+    op_train = pd.read_csv(OP_TRAIN_PATH, usecols=['order_id','product_id'])
+
+    # 2) Build implicit-feedback DataFrame
+    scores = (
+        op_train
+        .merge(orders, on='order_id', how='inner')
+        .loc[:, ['user_id','product_id']]
+        .assign(rating=1.0)
+        .astype({'user_id': str, 'product_id': str, 'rating': float})
+    )
+    print(f"[INFO] Loaded {len(scores)} interactions")
+    return scores
 
 # 3) Train/Val/Test split logic per user
 def split_user_df(user_df):
@@ -28,10 +40,8 @@ def split_user_df(user_df):
     train, val = train_test_split(tv, test_size=0.25, random_state=42)
     return {'train': train, 'val': val, 'test': test}
 
-OUTPUT_DIR = "./generated_splits_instacart"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
 def split_and_save(scores_df):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
     print("[INFO] Splitting by user")
     groups = list(scores_df.groupby('user_id'))
     print(f"  - Users: {len(groups)}")
@@ -57,4 +67,4 @@ def split_and_save(scores_df):
         print(f"  -> Wrote {out_file}")
 
 if __name__ == "__main__":
-    split_and_save(scores)
+    split_and_save(load_scores())
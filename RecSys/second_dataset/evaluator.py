@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 import joblib
 from surprise import Reader, Dataset
@@ -8,6 +9,12 @@ import numpy as np
 import warnings
 warnings.filterwarnings("error", category=RuntimeWarning)
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sampled_eval import sampled_evaluate, make_strata, add_deltas
+from batch_predict import BatchPredictor
+from sharded_eval import plan_shards, run_sharded, worker_cached, partial_sums, merge_partials
+from config import configure
+
 # ========== CONFIG ==========
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR   = SCRIPT_DIR
@@ -15,6 +22,7 @@ DATA_DIR   = SCRIPT_DIR
 MODELS_DIR = os.path.join(SCRIPT_DIR, "models_instacart")
 SPLIT_DIR  = os.path.join(SCRIPT_DIR, "generated_splits_instacart")
 RESULT_CSV = os.path.join(SCRIPT_DIR, "evaluation_results_instacart.csv")
+SHARED_PATH = os.path.join(SCRIPT_DIR, "eval_shared_instacart.pkl")   # product metadata + recent sets, built once per run
 
 TOP_K = 10
 N_JOBS = -1
@@ -27,12 +35,21 @@ USE_CONSTRAINT_RECENT = True
 USE_CONSTRAINT_DEPT   = True
 USE_CONSTRAINT_AISLE  = True
 
+# === Sampled Evaluation ===
+# Stratified (by user activity) random user batches until every metric's CI is at most SAMPLE_CI_WIDTH wide
+USE_SAMPLED_EVAL = False
+SAMPLE_CI_WIDTH = 0.01
+SAMPLE_MAX_USERS = None
+BASE_METRICS = ["true_avg", "true_top", "true_min", "mse"]
+
 # === Model Selection ===
-ENABLED_MODELS = ["svd", "knn", "baseline"]
+ENABLED_MODELS = ["svd", "knn", "baseline", "cooccurrence"]   # cooccurrence: see cooccurrence_model.py
 
 PRODUCT_META_PATH = os.path.join(SCRIPT_DIR, "products_enriched.csv")
 
 VARIANTS = [("instacart",)]
+
+configure(globals(), "instacart_evaluator")
 MODEL_KEYS = ENABLED_MODELS
 
 # ========== DATA PREP ==========
@@ -80,14 +97,15 @@ def build_recent_product_dict():
     return recent.groupby("user_id")["product_id"].apply(set).to_dict()
 
 # ========== EVALUATION ==========
-def evaluate_single(user_df, model, product_df, recent_dict, k=TOP_K):
+def evaluate_single(user_df, predictor, product_df, recent_dict, k=TOP_K):
     uid = user_df["user_id"].iloc[0]
     candidate_pids = user_df["product_id"].unique()
+    # All of the user's candidates in one call (same estimates as model.predict)
+    estimates, _ = predictor.predict(np.repeat(uid, len(candidate_pids)), candidate_pids)
 
     predictions = []
-    for pid in candidate_pids:
+    for pid, est in zip(candidate_pids, estimates):
         try:
-            est = model.predict(uid, pid).est
             p_row = product_df[product_df["product_id"] == int(pid)]
             if p_row.empty:
                 continue
@@ -168,10 +186,70 @@ def evaluate_single(user_df, model, product_df, recent_dict, k=TOP_K):
         "filtered_out": len(top_unfiltered) - len(filtered)
     }
 
+def variant_paths(prefix, dataset_name):
+    return os.path.join(MODELS_DIR, f"{prefix}.pkl"), os.path.join(SPLIT_DIR, f"{dataset_name}_val.csv")
+
+def build_shared(path=SHARED_PATH):
+    """
+    Product metadata and recent-purchase sets, shared by every variant.
+    Built once in the main process and saved, so pool workers load the
+    small result instead of each re-reading orders.csv and
+    order_products__prior.csv.
+    """
+    product_df = load_product_metadata()
+    product_df["product_id"] = product_df["product_id"].astype(str)
+    recent_dict = build_recent_product_dict() if USE_CONSTRAINT_RECENT else {}
+    joblib.dump((product_df, recent_dict), path)
+    return path
+
+def load_shared(path=SHARED_PATH):
+    """The saved build_shared() result (kept per worker process until the file is rewritten)."""
+    return worker_cached("shared", path, lambda: joblib.load(path), paths=[path])
+
+def load_variant(dataset_name, model_key):
+    """Predictor, validation frame and per-user frames of one variant (kept per worker process)."""
+    prefix = f"{dataset_name}_{model_key}"
+    model_path, val_path = variant_paths(prefix, dataset_name)
+
+    def load():
+        predictor = BatchPredictor(joblib.load(model_path))
+        val_df = pd.read_csv(val_path)
+        val_df["user_id"] = val_df["user_id"].astype(str)
+        val_df["product_id"] = val_df["product_id"].astype(str)
+        sanity_check_df("val split", val_df)
+        return predictor, val_df, dict(tuple(val_df.groupby("user_id")))
+    return worker_cached("variant", prefix, load, paths=[model_path, val_path])
+
+def evaluate_shard(job, user_ids):
+    """partial_sums over one shard of a variant's validation users (runs in the pool)."""
+    predictor, _, users = load_variant(*job)
+    product_df, recent_dict = load_shared()
+    results = []
+    for uid in user_ids:
+        res = evaluate_single(users[uid], predictor, product_df, recent_dict)
+        if res is None or (res["top_k_filtered"] == 0 and res["top_k_total"] == 0):
+            continue
+        results.append(res)
+    return partial_sums(results)
+
+def variant_row(job, partials):
+    """Summary row of a variant from its shards' partial sums."""
+    dataset_name, model_key = job
+    n_users, means, sums = merge_partials(partials)
+    if not n_users:
+        print(f"[INFO] No valid users in {dataset_name}_{model_key}")
+        return None
+    return {
+        "dataset": dataset_name,
+        "model": model_key,
+        "n_users": n_users,
+        **means,
+        "total_filtered_out": sums["filtered_out"]
+    }
+
 def evaluate_variant(dataset_name, model_key):
     prefix = f"{dataset_name}_{model_key}"
-    model_path = os.path.join(MODELS_DIR, f"{prefix}.pkl")
-    val_path = os.path.join(SPLIT_DIR, f"{dataset_name}_val.csv")
+    model_path, val_path = variant_paths(prefix, dataset_name)
 
     if not (os.path.exists(model_path) and os.path.exists(val_path)):
         print(f"[WARN] Missing files for {prefix}. Skipping.")
@@ -179,43 +257,73 @@ def evaluate_variant(dataset_name, model_key):
 
     print(f"\n▶️  Evaluating: {prefix}")
     try:
-        model = joblib.load(model_path)
-        val_df = pd.read_csv(val_path)
-        val_df["user_id"] = val_df["user_id"].astype(str)
-        val_df["product_id"] = val_df["product_id"].astype(str)
-        sanity_check_df("val split", val_df)
+        predictor, val_df, users = load_variant(dataset_name, model_key)
+        product_df, recent_dict = load_shared()
 
-        product_df = load_product_metadata()
-        product_df["product_id"] = product_df["product_id"].astype(str)
-        recent_dict = build_recent_product_dict() if USE_CONSTRAINT_RECENT else {}
+        if USE_SAMPLED_EVAL:
+            return evaluate_variant_sampled(dataset_name, model_key, val_df, predictor, product_df, recent_dict)
+        return variant_row((dataset_name, model_key), [evaluate_shard((dataset_name, model_key), list(users))])
 
-        user_results = []
-        for _, user_df in tqdm(val_df.groupby("user_id"), desc=f"Users in {prefix}", leave=False):
-            res = evaluate_single(user_df, model, product_df, recent_dict)
-            if res is None or (res["top_k_filtered"] == 0 and res["top_k_total"] == 0):
-                continue
-            user_results.append(res)
+    except Exception as e:
+        print(f"[ERROR] Failed on {prefix}: {e}")
+        return None
 
-        if not user_results:
-            print(f"[INFO] No valid users in {prefix}")
-            return None
+def evaluate_variants_sharded(jobs):
+    """
+    Evaluate variants as user shards over one pool (sharded_eval), so a few
+    big (dataset, model) jobs still use every core. A variant whose shard
+    fails is reported and left out, like a failed evaluate_variant. The
+    shards read the inputs saved by build_shared().
+    """
+    sizes = {}
+    for dataset_name, model_key in jobs:
+        prefix = f"{dataset_name}_{model_key}"
+        model_path, val_path = variant_paths(prefix, dataset_name)
+        if not (os.path.exists(model_path) and os.path.exists(val_path)):
+            print(f"[WARN] Missing files for {prefix}. Skipping.")
+            continue
+        user_ids = pd.read_csv(val_path, usecols=["user_id"])["user_id"].astype(str)
+        sizes[(dataset_name, model_key)] = user_ids.value_counts()
+
+    tasks = plan_shards(sizes, N_JOBS)
+    print(f"[INFO] {len(sizes)} variants -> {len(tasks)} user shards")
+    partials = {job: [] for job in sizes}
+    errors = {}
+    for job, part in run_sharded(tasks, evaluate_shard, N_JOBS, desc="Variant shards"):
+        if "error" in part:
+            errors.setdefault(job, part["error"])
+        else:
+            partials[job].append(part)
+
+    results = []
+    for job in sizes:
+        if job in errors:
+            print(f"[ERROR] Failed on {job[0]}_{job[1]}: {errors[job].strip().splitlines()[-1]}")
+            continue
+        results.append(variant_row(job, partials[job]))
+    return results
 
-        df = pd.DataFrame(user_results)
-        summary = df.drop(columns="user_id").mean(numeric_only=True, skipna=True).to_dict()
-        summary["total_filtered_out"] = df["filtered_out"].sum()
-        return {
-            "dataset": dataset_name,
-            "model": model_key,
-            "n_users": len(user_results),
-            **summary
-        }
+def evaluate_variant_sampled(dataset_name, model_key, val_df, predictor, product_df, recent_dict):
+    users = dict(tuple(val_df.groupby("user_id")))
 
-    except Exception as e:
-        print(f"[ERROR] Failed on {prefix}: {e}")
+    def evaluate_user(uid):
+        res = evaluate_single(users[uid], predictor, product_df, recent_dict)
+        if res is None or (res["top_k_filtered"] == 0 and res["top_k_total"] == 0):
+            return None
+        return add_deltas(res, BASE_METRICS)
+
+    strata = make_strata(val_df["user_id"].value_counts())
+    row = sampled_evaluate(strata, evaluate_user, ci_width=SAMPLE_CI_WIDTH, max_users=SAMPLE_MAX_USERS)
+    print(f"[INFO] {dataset_name}_{model_key}: {row['n_users_evaluated']}/{row['n_users_total']} users evaluated"
+          f"{' (stopped early)' if row['stopped_early'] else ''}")
+    if not row["n_users"]:
         return None
+    # Estimated total over all validation users
+    row["total_filtered_out"] = row["filtered_out"] * row["n_users_total"] * row["n_users"] / row["n_users_evaluated"]
+    return {"dataset": dataset_name, "model": model_key, **row}
 
 # ========== MAIN ==========
-if __name__ == "__main__":
+def evaluate_all():
     print("=== \U0001F680 Starting Instacart Constraint Evaluation ===")
     jobs = [
         (variant[0], model_key)
@@ -223,10 +331,15 @@ if __name__ == "__main__":
         for model_key in MODEL_KEYS
     ]
 
-    results = Parallel(n_jobs=N_JOBS, verbose=10)(
-        delayed(evaluate_variant)(dataset_name, model_key)
-        for dataset_name, model_key in jobs
-    )
+    build_shared()
+    if USE_SAMPLED_EVAL:
+        # Sampled variants stop early on their own batches, so they stay one task each
+        results = Parallel(n_jobs=N_JOBS, verbose=10)(
+            delayed(evaluate_variant)(dataset_name, model_key)
+            for dataset_name, model_key in jobs
+        )
+    else:
+        results = evaluate_variants_sharded(jobs)
 
     results = [r for r in results if r is not None]
     if results:
@@ -235,3 +348,7 @@ if __name__ == "__main__":
         print(f"\n✅ Evaluation complete. Results saved to {RESULT_CSV}")
     else:
         print("\n⚠️ No results to save.")
+
+
+if __name__ == "__main__":
+    evaluate_all()
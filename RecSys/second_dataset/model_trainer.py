@@ -1,9 +1,13 @@
 import os
+import sys
 import pandas as pd
 import joblib
 from surprise import Dataset, Reader, SVD, KNNWithMeans, BaselineOnly
 from joblib import Parallel, delayed
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import configure
+
 # ============================================
 # CONFIGURATION SECTION
 # ============================================
@@ -12,7 +16,6 @@ from joblib import Parallel, delayed
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 SPLIT_DIR  = os.path.join(SCRIPT_DIR, "generated_splits_instacart")
 MODEL_DIR  = os.path.join(SCRIPT_DIR, "models_instacart")
-os.makedirs(MODEL_DIR, exist_ok=True)
 
 # We have just one dataset variant (no separate rating_type in filenames)
 VARIANTS = [
@@ -56,6 +59,9 @@ MODEL_CONFIGS = {
 # Use all cores
 N_JOBS = -1
 
+configure(globals(), "instacart_model_trainer")
+os.makedirs(MODEL_DIR, exist_ok=True)
+
 # ============================================
 
 def train_model_for_variant(dataset_name, model_key, model_class, model_kwargs):
@@ -101,7 +107,7 @@ def train_model_for_variant(dataset_name, model_key, model_class, model_kwargs):
     print(f"[{prefix}/{model_key}] Saved to {model_path}")
     del model
 
-if __name__ == "__main__":
+def train_all():
     # Sanity check: list your split files
     print("[INFO] Using splits from:", SPLIT_DIR)
     print(os.listdir(SPLIT_DIR))
@@ -123,3 +129,7 @@ if __name__ == "__main__":
     print("\n=== Starting parallel training ===")
     Parallel(n_jobs=N_JOBS, verbose=10)(jobs)
     print("\nAll models trained and saved in", MODEL_DIR)
+
+
+if __name__ == "__main__":
+    train_all()
@@ -0,0 +1,94 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+import joblib
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(SCRIPT_DIR, "..", "pipeline", "models")
+EXPORT_DIR = os.path.join(SCRIPT_DIR, "exported")
+BEATMAPS_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "processed", "beatmaps.csv")
+
+# Same ceiling rule as pipeline/evaluator.py
+PERCENTILE = 99
+SENSITIVE_ATTRS = ["diff_approach", "diff_star_rating", "aim", "speed"]
+
+# ============================================
+
+
+def export_model(model, beatmaps_path, out_dir):
+    """
+    Write a trained Surprise SVD as flat .npy files that the server can
+    memory-map: factors and biases, raw ids, per-item beatmap attributes,
+    per-user played sets (CSR offsets + items) and per-user attribute
+    ceilings.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    trainset = model.trainset
+    n_users, n_items = trainset.n_users, trainset.n_items
+
+    user_ids = np.array([trainset.to_raw_uid(u) for u in range(n_users)], dtype=np.int64)
+    item_ids = np.array([trainset.to_raw_iid(i) for i in range(n_items)], dtype=np.int64)
+
+    beatmaps = pd.read_csv(beatmaps_path, usecols=["mod_beatmap_id"] + SENSITIVE_ATTRS)
+    beatmaps = beatmaps.drop_duplicates("mod_beatmap_id").set_index("mod_beatmap_id")
+    item_attrs = beatmaps.reindex(item_ids)[SENSITIVE_ATTRS].to_numpy(dtype=np.float32)
+
+    # Played sets straight from the trainset, in inner item ids
+    counts = np.array([len(trainset.ur[u]) for u in range(n_users)], dtype=np.int64)
+    played_offsets = np.concatenate([[0], np.cumsum(counts)])
+    played_items = np.fromiter((i for u in range(n_users) for i, _ in trainset.ur[u]),
+                               dtype=np.int32, count=int(counts.sum()))
+
+    ceilings = np.full((n_users, len(SENSITIVE_ATTRS)), np.inf, dtype=np.float32)
+    for u in range(n_users):
+        attrs = item_attrs[played_items[played_offsets[u]:played_offsets[u + 1]]]
+        if len(attrs) and not np.isnan(attrs).all():
+            ceilings[u] = np.nanpercentile(attrs, PERCENTILE, axis=0)
+
+    arrays = {
+        "pu": model.pu.astype(np.float32),
+        "qi": model.qi.astype(np.float32),
+        "bu": model.bu.astype(np.float32),
+        "bi": model.bi.astype(np.float32),
+        "user_ids": user_ids,
+        "item_ids": item_ids,
+        "item_attrs": item_attrs,
+        "played_offsets": played_offsets,
+        "played_items": played_items,
+        "user_ceilings": ceilings,
+    }
+    for name, arr in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), arr)
+
+    meta = {
+        "global_mean": float(trainset.global_mean),
+        "rating_scale": list(trainset.rating_scale),
+        "biased": bool(model.biased),
+        "percentile": PERCENTILE,
+        "sensitive_attrs": SENSITIVE_ATTRS,
+        "n_users": n_users,
+        "n_items": n_items,
+        "n_factors": int(model.pu.shape[1]),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a trained SVD model for the recommendation server.")
+    parser.add_argument("model", help="model file name in pipeline/models, e.g. top_enjoyment_svd_fold0.pkl")
+    parser.add_argument("--beatmaps", default=BEATMAPS_PATH)
+    args = parser.parse_args()
+
+    model_path = args.model if os.path.isabs(args.model) else os.path.join(MODELS_DIR, args.model)
+    out_dir = os.path.join(EXPORT_DIR, os.path.splitext(os.path.basename(model_path))[0])
+
+    meta = export_model(joblib.load(model_path), args.beatmaps, out_dir)
+    print(f"✔ Exported {meta['n_users']} users x {meta['n_items']} items to {out_dir}")
@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+
+from server import EXPORT_DIR, HOST, PORT
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+CONCURRENCY = 64        # open keep-alive connections
+REQUESTS_PER_CONN = 200
+TOP_N = 10
+FILTERED_SHARE = 0.5    # share of requests asking for ceiling-filtered results
+ZIPF_A = 1.2            # skew of user popularity, so the LRU cache sees hot users
+
+# ============================================
+
+
+async def http_get(reader, writer, target):
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    return status, json.loads(body)
+
+
+async def client(host, port, user_ids, n_requests, rng, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n_requests):
+            uid = user_ids[min(rng.zipf(ZIPF_A) - 1, len(user_ids) - 1)]
+            filtered = int(rng.random() < FILTERED_SHARE)
+            start = time.perf_counter()
+            status, _ = await http_get(reader, writer, f"/recommend?user={uid}&n={TOP_N}&filtered={filtered}")
+            latencies.append(1000 * (time.perf_counter() - start))
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load_test(host, port, user_ids, concurrency, requests_per_conn):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(host, port, user_ids, requests_per_conn, np.random.default_rng(seed), latencies, errors)
+        for seed in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, server_metrics = await http_get(reader, writer, "/metrics")
+    writer.close()
+
+    lat = np.array(latencies)
+    print(f"\n=== Load test: {concurrency} connections x {requests_per_conn} requests ===")
+    print(f"Throughput:       {len(lat) / elapsed:.1f} req/s ({len(lat)} requests in {elapsed:.2f}s)")
+    print(f"Client p50 / p99: {np.percentile(lat, 50):.2f} ms / {np.percentile(lat, 99):.2f} ms")
+    print(f"Errors:           {len(errors)}")
+    print("Server metrics:   " + json.dumps(server_metrics, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test a running recommendation server on localhost.")
+    parser.add_argument("model", help="export directory name in ./exported (used to pick valid user ids)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_CONN, help="requests per connection")
+    args = parser.parse_args()
+
+    model_dir = args.model if os.path.isabs(args.model) else os.path.join(EXPORT_DIR, args.model)
+    user_ids = np.load(os.path.join(model_dir, "user_ids.npy"))
+    np.random.default_rng(0).shuffle(user_ids)
+
+    asyncio.run(run_load_test(args.host, args.port, user_ids.tolist(), args.concurrency, args.requests))
@@ -0,0 +1,125 @@
+import os
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+import joblib
+
+from export_model import EXPORT_DIR, MODELS_DIR
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+PRECISIONS = ["float16", "int8"]
+RESCORE_FACTOR = 4       # first stage keeps RESCORE_FACTOR * k candidates for exact rescoring
+BLOCK_ROWS = 65536       # item rows dequantized to float32 at a time
+REPORT_K = [10, 100]
+REPORT_USERS = 1000
+
+# ============================================
+
+
+def quantize_items(qi, precision):
+    """
+    Compact item factors. float16 is a plain cast; int8 stores one float32
+    scale per row (max |q_i| / 127) and the rounded codes.
+    Returns (codes, scales) with scales None for float16.
+    """
+    qi = np.asarray(qi, dtype=np.float32)
+    if precision == "float16":
+        return qi.astype(np.float16), None
+    if precision == "int8":
+        scales = np.abs(qi).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(qi / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown precision: {precision}")
+
+
+def compact_scores(pu, codes, scales=None, block_rows=BLOCK_ROWS):
+    """pu (B, f) against compact item factors, in float32, dequantizing one block of items at a time."""
+    pu = np.asarray(pu, dtype=np.float32)
+    out = np.empty((pu.shape[0], codes.shape[0]), dtype=np.float32)
+    for start in range(0, codes.shape[0], block_rows):
+        block = np.asarray(codes[start:start + block_rows], dtype=np.float32)
+        out[:, start:start + block_rows] = pu @ block.T
+        if scales is not None:
+            out[:, start:start + block_rows] *= scales[start:start + block_rows]
+    return out
+
+
+def rescore_top_k(approx_row, pu_row, qi_exact, bi, k, rescore_factor=RESCORE_FACTOR):
+    """
+    Keep the `rescore_factor * k` best first-stage items (masked items must
+    already be -inf in `approx_row`) and rank them by the exact float32 score.
+    Returns (item indices, exact scores without mu + b_u).
+    """
+    n_cand = min(k * rescore_factor, len(approx_row))
+    cand = np.argpartition(-approx_row, n_cand - 1)[:n_cand]
+    cand = cand[np.isfinite(approx_row[cand])]
+    exact = np.asarray(qi_exact[cand], dtype=np.float32) @ np.asarray(pu_row, dtype=np.float32) + bi[cand]
+    k = min(k, len(cand))
+    top = np.argpartition(-exact, k - 1)[:k] if k < len(cand) else np.arange(len(cand))
+    top = top[np.argsort(-exact[top], kind="stable")]
+    return cand[top], exact[top]
+
+
+def export_quantized(model, out_dir, precisions=PRECISIONS):
+    """Add qi_<precision>.npy (and qi_int8_scale.npy) to an export_model.py directory."""
+    os.makedirs(out_dir, exist_ok=True)
+    for precision in precisions:
+        codes, scales = quantize_items(model.qi, precision)
+        np.save(os.path.join(out_dir, f"qi_{precision}.npy"), codes)
+        if scales is not None:
+            np.save(os.path.join(out_dir, f"qi_{precision}_scale.npy"), scales)
+
+
+# ========== AGREEMENT REPORT ==========
+
+def _top_k(scores, k):
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+
+def ranking_agreement(model, precisions=PRECISIONS, k_list=REPORT_K, n_users=REPORT_USERS):
+    """overlap@K of float64 top-K vs. compact first stage, with and without exact float32 rescoring."""
+    rng = np.random.RandomState(0)
+    users = rng.choice(model.pu.shape[0], min(n_users, model.pu.shape[0]), replace=False)
+    pu, qi, bi = model.pu[users], model.qi, model.bi
+    exact64 = pu @ qi.T + bi
+    qi32, bi32 = qi.astype(np.float32), bi.astype(np.float32)
+
+    rows = []
+    for precision in precisions:
+        codes, scales = quantize_items(qi, precision)
+        approx = compact_scores(pu, codes, scales) + bi32
+        for k in k_list:
+            truth = _top_k(exact64, k)
+            first = _top_k(approx, k)
+            rescored = [rescore_top_k(approx[j], pu[j], qi32, bi32, k)[0] for j in range(len(users))]
+            rows.append({
+                "precision": precision,
+                "k": k,
+                "overlap_first_stage": np.mean([len(np.intersect1d(t, f)) / k for t, f in zip(truth, first)]),
+                "overlap_rescored": np.mean([len(np.intersect1d(t, r)) / k for t, r in zip(truth, rescored)]),
+                "item_bytes": codes.nbytes + (scales.nbytes if scales is not None else 0),
+                "float64_bytes": qi.nbytes,
+            })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export compact item factors and report ranking agreement.")
+    parser.add_argument("--pattern", default="*_svd_fold0.pkl", help="glob of SVD models in pipeline/models")
+    parser.add_argument("--export", action="store_true", help="also write qi_<precision>.npy into ./exported/<model>")
+    args = parser.parse_args()
+
+    for model_path in sorted(glob.glob(os.path.join(MODELS_DIR, args.pattern))):
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        model = joblib.load(model_path)
+        print(f"\n=== {name} | items: {model.qi.shape[0]} | factors: {model.qi.shape[1]} ===")
+        print(ranking_agreement(model).to_string(index=False, float_format="%.4f"))
+        if args.export:
+            export_quantized(model, os.path.join(EXPORT_DIR, name))
+            print(f"✔ Exported compact factors to {os.path.join(EXPORT_DIR, name)}")
@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+
+from quantize import compact_scores, rescore_top_k
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORT_DIR = os.path.join(SCRIPT_DIR, "exported")
+
+HOST = "127.0.0.1"
+PORT = 8080
+
+DEFAULT_N = 10
+MAX_N = 500
+MAX_BATCH = 32        # requests scored by one matrix multiply
+MAX_WAIT_MS = 2.0     # how long the first request of a batch waits for company
+CACHE_SIZE = 4096     # LRU entries, keyed by (user, n, filtered)
+LATENCY_WINDOW = 20000
+
+# ============================================
+
+
+class ModelState:
+    """
+    Memory-mapped export produced by export_model.py. With a compact
+    `precision` (see quantize.py) the first stage scores against
+    qi_<precision>.npy and only the candidates are rescored with float32 qi.
+    """
+
+    def __init__(self, model_dir, precision="float32"):
+        with open(os.path.join(model_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.pu, self.qi = load("pu"), load("qi")
+        self.bu, self.bi = load("bu"), load("bi")
+        self.item_ids = load("item_ids")
+        self.item_attrs = load("item_attrs")
+        self.played_offsets, self.played_items = load("played_offsets"), load("played_items")
+        self.user_ceilings = load("user_ceilings")
+        self.user_index = {uid: u for u, uid in enumerate(load("user_ids").tolist())}
+        self.global_mean = self.meta["global_mean"]
+        self.lower, self.upper = self.meta["rating_scale"]
+
+        self.precision = precision
+        self.qi_compact = self.qi_scales = None
+        if precision != "float32":
+            self.qi_compact = load(f"qi_{precision}")
+            scale_path = os.path.join(model_dir, f"qi_{precision}_scale.npy")
+            if os.path.exists(scale_path):
+                self.qi_scales = np.load(scale_path)
+
+    def recommend_batch(self, inner_uids, requests):
+        """Score all users of a batch with one matmul, then filter and cut per request."""
+        pu = np.asarray(self.pu[inner_uids])
+        bi = np.asarray(self.bi)
+        if self.qi_compact is None:
+            scores = pu @ np.asarray(self.qi).T
+        else:
+            scores = compact_scores(pu, self.qi_compact, self.qi_scales)
+        scores += bi[None, :]
+        offsets = np.asarray(self.bu[inner_uids]) + self.global_mean
+
+        results = []
+        for j, (u, (n, filtered)) in enumerate(zip(inner_uids, requests)):
+            row = scores[j]
+            row[self.played_items[self.played_offsets[u]:self.played_offsets[u + 1]]] = -np.inf
+            if filtered:
+                too_hard = (np.asarray(self.item_attrs) > self.user_ceilings[u]).any(axis=1)
+                row[too_hard] = -np.inf
+
+            if self.qi_compact is None:
+                n = min(n, len(row))
+                top = np.argpartition(-row, n - 1)[:n]
+                top = top[np.argsort(-row[top], kind="stable")]
+                top = top[np.isfinite(row[top])]
+                top_scores = row[top]
+            else:
+                top, top_scores = rescore_top_k(row, pu[j], self.qi, bi, n)
+
+            est = np.clip(top_scores + offsets[j], self.lower, self.upper)
+            results.append([{"mod_beatmap_id": int(i), "est": float(e)}
+                            for i, e in zip(self.item_ids[top], est)])
+        return results
+
+
+class MicroBatcher:
+    """Collects concurrent requests and scores them together in a worker thread."""
+
+    def __init__(self, state, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.state = state
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+
+    async def submit(self, inner_uid, n, filtered):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((inner_uid, n, filtered, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batch_sizes.append(len(batch))
+            inner_uids = np.array([b[0] for b in batch])
+            requests = [(b[1], b[2]) for b in batch]
+            try:
+                results = await loop.run_in_executor(None, self.state.recommend_batch, inner_uids, requests)
+                for b, res in zip(batch, results):
+                    b[3].set_result(res)
+            except Exception as e:
+                for b in batch:
+                    b[3].set_exception(e)
+
+
+class RecommendationServer:
+
+    def __init__(self, state, cache_size=CACHE_SIZE):
+        self.state = state
+        self.batcher = MicroBatcher(state)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self.n_requests = 0
+
+    # ---------- endpoints ----------
+
+    async def recommend(self, params):
+        try:
+            uid = int(params["user"][0])
+            n = min(int(params.get("n", [DEFAULT_N])[0]), MAX_N)
+            filtered = params.get("filtered", ["0"])[0] in ("1", "true")
+        except (KeyError, ValueError):
+            return 400, {"error": "expected ?user=<id>[&n=<int>][&filtered=1]"}
+        if n < 1:
+            return 400, {"error": f"n must be at least 1, got {n}"}
+
+        inner = self.state.user_index.get(uid)
+        if inner is None:
+            return 404, {"error": f"unknown user {uid}"}
+
+        key = (uid, n, filtered)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return 200, {"user_id": uid, "filtered": filtered, "items": self.cache[key], "cached": True}
+
+        self.cache_misses += 1
+        items = await self.batcher.submit(inner, n, filtered)
+        self.cache[key] = items
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return 200, {"user_id": uid, "filtered": filtered, "items": items, "cached": False}
+
+    def metrics(self):
+        lat = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        batches = np.array(self.batcher.batch_sizes) if self.batcher.batch_sizes else np.zeros(1)
+        lookups = self.cache_hits + self.cache_misses
+        return 200, {
+            "requests": self.n_requests,
+            "latency_p50_ms": float(np.percentile(lat, 50)),
+            "latency_p99_ms": float(np.percentile(lat, 99)),
+            "latency_max_ms": float(lat.max()),
+            "mean_batch_size": float(batches.mean()),
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "cache_entries": len(self.cache),
+        }
+
+    # ---------- HTTP ----------
+
+    async def route(self, path, params):
+        if path == "/recommend":
+            return await self.recommend(params)
+        if path == "/metrics":
+            return self.metrics()
+        if path == "/health":
+            return 200, {"status": "ok", "n_users": self.state.meta["n_users"], "n_items": self.state.meta["n_items"]}
+        return 404, {"error": f"no route {path}"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                start = time.perf_counter()
+                path = None
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                    url = urlsplit(target)
+                    path = url.path
+                    if method != "GET":
+                        status, body = 405, {"error": "only GET is supported"}
+                    else:
+                        status, body = await self.route(path, parse_qs(url.query))
+                except ValueError:
+                    status, body = 400, {"error": "malformed request"}
+                except Exception as e:
+                    status, body = 500, {"error": str(e)}
+
+                payload = json.dumps(body).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'ERROR'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+
+                self.n_requests += 1
+                if path == "/recommend":
+                    self.latencies_ms.append(1000 * (time.perf_counter() - start))
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        batcher_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"✅ Serving {self.state.meta['n_users']} users x {self.state.meta['n_items']} items on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve top-N beatmap recommendations from an exported SVD model.")
+    parser.add_argument("model", help="export directory name in ./exported (see export_model.py)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--precision", default="float32", choices=["float32", "float16", "int8"],
+                        help="first-stage item factor precision (float16/int8 need quantize.py --export)")
+    args = parser.parse_args()
+
+    model_dir = args.model if os.path.isabs(args.model) else os.path.join(EXPORT_DIR, args.model)
+    state = ModelState(model_dir, precision=args.precision)
+    try:
+        asyncio.run(RecommendationServer(state).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nStopped.")
@@ -0,0 +1,138 @@
+import os
+import numbers
+import traceback
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from tqdm import tqdm
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+SHARDS_PER_WORKER = 4      # shards per pool worker over all jobs (more = finer balancing, more model reloads)
+MIN_SHARD_USERS = 50       # a job is never cut into shards smaller than this
+
+# ============================================
+
+# User-sharded evaluation: instead of one pool task per (variant, model) job,
+# every job's users are split into shards of about equal total rows and all
+# shards go through one pool, handed to workers one at a time as they free
+# up. Wall time then follows the total work / number of cores instead of the
+# largest job. Workers return partial sums (sharded_eval.partial_sums), which
+# the main process merges into the job's summary row.
+
+
+# ========== PLANNING ==========
+
+def shard_users(user_sizes, n_shards):
+    """
+    Split a Series user_id -> number of rows into `n_shards` arrays of user
+    ids with near-equal total rows: users are dealt largest first in snake
+    order (0..n-1, n-1..0, ...). Shards are returned largest first.
+    """
+    order = user_sizes.sort_values(ascending=False, kind="stable")
+    n_shards = max(1, min(n_shards, len(order)))
+    pos = np.arange(len(order)) % (2 * n_shards)
+    shard = np.where(pos < n_shards, pos, 2 * n_shards - 1 - pos)
+    ids, sizes = order.index.to_numpy(), order.to_numpy()
+    loads = np.bincount(shard, weights=sizes, minlength=n_shards)
+    return [ids[shard == s] for s in np.argsort(-loads, kind="stable")]
+
+
+def plan_shards(job_sizes, n_jobs, shards_per_worker=SHARDS_PER_WORKER, min_shard_users=MIN_SHARD_USERS):
+    """
+    (job, user_ids) tasks for {job: Series user_id -> rows}. Shards hold
+    about total_rows / (workers * shards_per_worker) rows each, so big jobs
+    get more of them. Tasks are ordered by job size, then shard size, both
+    descending: the largest work starts first, and consecutive shards of a
+    job tend to reach a worker that already has its model loaded.
+    """
+    total = sum(int(sizes.sum()) for sizes in job_sizes.values())
+    target = max(1.0, total / (effective_n_jobs(n_jobs) * shards_per_worker))
+    tasks = []
+    for job, sizes in sorted(job_sizes.items(), key=lambda kv: -int(kv[1].sum())):
+        n_shards = min(int(np.ceil(sizes.sum() / target)), max(1, len(sizes) // min_shard_users))
+        tasks += [(job, users) for users in shard_users(sizes, n_shards)]
+    return tasks
+
+
+# ========== WORKERS ==========
+
+_WORKER_CACHE = {}   # slot -> (key, value), one entry per slot per worker process
+
+
+def file_signature(paths):
+    """(path, size, mtime) of each file (None if missing): changes whenever a file is rewritten."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            signature.append((path, None))
+    return tuple(signature)
+
+
+def worker_cached(slot, key, load, paths=()):
+    """
+    `load()` once per worker process while `key` and the files in `paths`
+    stay the same for `slot` (e.g. slot "model", key = job, paths = the
+    model file). loky reuses workers across Parallel calls, so a model
+    retrained under the same name must not be served from memory.
+    """
+    key = (key, file_signature(paths))
+    cached = _WORKER_CACHE.get(slot)
+    if cached is None or cached[0] != key:
+        _WORKER_CACHE.pop(slot, None)
+        cached = _WORKER_CACHE[slot] = (key, load())
+    return cached[1]
+
+
+def _run_shard(evaluate_shard, job, user_ids):
+    try:
+        return job, evaluate_shard(job, user_ids)
+    except Exception:
+        return job, {"error": traceback.format_exc()}
+
+
+def run_sharded(tasks, evaluate_shard, n_jobs, desc="Shards"):
+    """
+    Yield (job, partial) for each (job, user_ids) task in completion order.
+    `evaluate_shard(job, user_ids)` runs in the pool and returns
+    partial_sums(...); a shard that raises yields {"error": traceback}.
+    """
+    results = Parallel(n_jobs=n_jobs, batch_size=1, pre_dispatch="n_jobs", return_as="generator_unordered")(
+        delayed(_run_shard)(evaluate_shard, job, user_ids) for job, user_ids in tasks
+    )
+    yield from tqdm(results, total=len(tasks), desc=desc, unit="shard")
+
+
+# ========== PARTIAL SUMS ==========
+
+def partial_sums(results):
+    """
+    Sums and counts of every numeric field over a shard's per-user result
+    dicts. NaN is left out, like pandas' skipna mean; ±inf is kept and
+    propagates into the mean as it does there.
+    """
+    sums, counts = {}, {}
+    for res in results:
+        for key, value in res.items():
+            if not isinstance(value, numbers.Number):
+                continue
+            present = not np.isnan(value)
+            sums[key] = sums.get(key, 0.0) + (float(value) if present else 0.0)
+            counts[key] = counts.get(key, 0) + present
+    return {"n": len(results), "sums": sums, "counts": counts}
+
+
+def merge_partials(partials):
+    """(n_users, per-field means, per-field sums) over the partial sums of all shards of a job."""
+    n, sums, counts = 0, {}, {}
+    for part in partials:
+        n += part["n"]
+        for key, value in part["sums"].items():
+            sums[key] = sums.get(key, 0.0) + value
+            counts[key] = counts.get(key, 0) + part["counts"][key]
+    means = {key: sums[key] / counts[key] if counts[key] else np.nan for key in sums}
+    return n, means, sums
@@ -0,0 +1,216 @@
+import os
+import json
+import mmap
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+# ============================================
+# CONFIGURATION SECTION
+# ============================================
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(DATA_DIR, "manifest.json")
+
+CHUNK_BYTES = 64 * 1024 * 1024   # bytes per newline-count block
+CHUNKSIZE = 1_000_000            # CSV rows per read for column statistics
+HLL_PRECISION = 14               # 2^14 registers, ~0.8% relative error on distinct counts
+
+# ============================================
+
+# Row counts and column statistics of the large CSVs, cached in one JSON file
+# keyed by each file's path, size and mtime. Row counts come from counting
+# newlines over a memory-mapped file (physical lines, so a quoted field with
+# an embedded newline counts twice). Column statistics take one chunked pass
+# and use a HyperLogLog sketch for distinct counts. Both are reused until
+# the file changes. cached() stores other derived numbers the same way (see
+# RecSys/pipeline/line_printer.py).
+
+
+# ========== ROW COUNTS ==========
+
+def count_rows(path, chunk_bytes=CHUNK_BYTES, header=True):
+    """Data rows of a CSV: newlines over the memory-mapped file (+1 without a trailing newline), minus the header."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    lines = 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start in range(0, size, chunk_bytes):
+            lines += mm[start:start + chunk_bytes].count(b"\n")
+        if mm[size - 1:size] != b"\n":
+            lines += 1
+    return max(lines - int(header), 0)
+
+
+# ========== DISTINCT COUNTS ==========
+
+def _leading_zeros(x):
+    """Leading zero bits of each uint64 (64 for 0)."""
+    n = np.where(x == 0, 1, 0)
+    x = x.copy()
+    for shift in (32, 16, 8, 4, 2, 1):   # binary search on the highest set bit
+        top_clear = x < (np.uint64(1) << np.uint64(64 - shift))
+        n[top_clear] += shift
+        x[top_clear] <<= np.uint64(shift)
+    return n
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit pandas hashes; registers merge by element-wise max."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.p = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values):
+        hashes = pd.util.hash_array(np.asarray(values))
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << np.uint64(self.p)), 64 - self.p) + 1
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))   # linear counting for small cardinalities
+        return int(round(raw))
+
+
+# ========== COLUMN STATISTICS ==========
+
+def _merge_dtype(a, b):
+    if a is None or a == b:
+        return b
+    if {a, b} <= {"int64", "float64", "bool"}:
+        return "float64"
+    return "object"
+
+
+def _canonical(values):
+    """
+    Non-null values split into numbers (float64) and strings, decided per
+    value rather than per chunk dtype: "5" in an object chunk and 5 in an
+    int chunk are the same number, so they hash and compare the same.
+    """
+    values = values.dropna()
+    if pd.api.types.is_numeric_dtype(values):
+        return [values.astype(np.float64)]
+    numbers = pd.to_numeric(values, errors="coerce")
+    is_number = numbers.notna()
+    return [numbers[is_number].astype(np.float64), values[~is_number].astype(str)]
+
+
+def _bound(current, value, pick):
+    """min/max merge; a column seen as numbers and as strings is compared as strings."""
+    if current is None:
+        return value
+    if isinstance(current, str) != isinstance(value, str):
+        current, value = str(current), str(value)
+    return pick(current, value)
+
+
+def column_stats(path, chunksize=CHUNKSIZE):
+    """dtype, null count, min/max (numbers; lexicographic for strings) and approximate distinct count per column."""
+    stats, sketches = {}, {}
+    for chunk in tqdm(pd.read_csv(path, chunksize=chunksize, low_memory=False),
+                      desc=f"Scanning {os.path.basename(path)}", unit="chunk", leave=False):
+        for col in chunk.columns:
+            values = chunk[col]
+            s = stats.setdefault(col, {"dtype": None, "nulls": 0, "min": None, "max": None})
+            s["dtype"] = _merge_dtype(s["dtype"], str(values.dtype))
+            s["nulls"] += int(values.isna().sum())
+            # Chunks infer dtypes independently (int64, float64 or object for the same column),
+            # so every value is hashed and compared in a form that does not depend on the chunk
+            for part in _canonical(values):
+                if part.empty:
+                    continue
+                lo, hi = part.min(), part.max()
+                lo, hi = (lo.item(), hi.item()) if hasattr(lo, "item") else (lo, hi)
+                s["min"] = _bound(s["min"], lo, min)
+                s["max"] = _bound(s["max"], hi, max)
+                sketches.setdefault(col, HyperLogLog()).add(part.to_numpy())
+    for col, s in stats.items():
+        s["distinct"] = sketches[col].estimate() if col in sketches else 0
+        if s["dtype"] == "int64" and s["min"] is not None:
+            s["min"], s["max"] = int(s["min"]), int(s["max"])
+    return stats
+
+
+# ========== MANIFEST ==========
+
+class Manifest:
+    """JSON cache of per-file facts; an entry is dropped as soon as the file's size or mtime changes."""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def _entry(self, csv_path):
+        key = os.path.abspath(csv_path)
+        stat = os.stat(key)
+        entry = self.entries.get(key)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            entry = self.entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return entry
+
+    def cached(self, csv_path, name, compute):
+        """`compute(csv_path)` for this version of the file, computed once and saved in the manifest."""
+        entry = self._entry(csv_path)
+        if name not in entry:
+            entry[name] = compute(csv_path)
+            self.save()
+        return entry[name]
+
+    def rows(self, csv_path):
+        return self.cached(csv_path, "rows", count_rows)
+
+    def columns(self, csv_path):
+        return self.cached(csv_path, "columns", column_stats)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, indent=2, default=str)
+        os.replace(tmp, self.path)
+
+
+def csv_files(paths):
+    """CSV files among `paths`; directories contribute their *.csv files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".csv"))
+        else:
+            files.append(path)
+    return files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cached row counts and column statistics of CSV files.")
+    parser.add_argument("paths", nargs="*", default=[os.path.join(DATA_DIR, "processed"), os.path.join(DATA_DIR, "export")])
+    parser.add_argument("--stats", action="store_true", help="also column dtypes, nulls, min/max and distinct counts")
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    args = parser.parse_args()
+
+    manifest = Manifest(args.manifest)
+    files = csv_files(args.paths)
+    if not files:
+        print("⚠️ No CSV files found.")
+    for path in files:
+        start = time.perf_counter()
+        rows = manifest.rows(path)
+        columns = manifest.columns(path) if args.stats else None
+        print(f"{path}: {rows} lines ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        if columns:
+            print(pd.DataFrame(columns).T.to_string())
@@ -1,14 +1,17 @@
 import os
-import csv
+import sys
 
 # Absolute path of the current directory
 folder_path = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.dirname(folder_path))
+from manifest import Manifest
+
+# Row counts are cached in data/manifest.json until a file's size or mtime changes
+manifest = Manifest()
 
 # Iterate over all CSV files in the folder
 for filename in os.listdir(folder_path):
     if filename.endswith('.csv'):
         file_path = os.path.join(folder_path, filename)
-        with open(file_path, newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            line_count = sum(1 for _ in reader) - 1  # Subtract 1 for header
+        line_count = manifest.rows(file_path)  # data rows (header excluded)
         print(f"{file_path}: {line_count} lines")
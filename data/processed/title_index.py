@@ -0,0 +1,181 @@
+import os
+import time
+import argparse
+import unicodedata
+from functools import reduce
+import joblib
+import numpy as np
+import pandas as pd
+
+# === CONFIG ===
+PROCESSED_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(PROCESSED_DIR, "beatmaps.csv")
+INDEX_PATH = os.path.join(PROCESSED_DIR, "beatmaps_title_index.pkl")
+
+FIELDS = ["title", "artist"]
+FARM_FACTORS = ["random_farm_factor", "top_farm_factor"]
+DISPLAY_COLS = ["mod_beatmap_id", "artist", "title", "mods_string", "diff_star_rating"] + FARM_FACTORS
+NGRAM = 3
+TOP_N = 5
+
+# Case-insensitive literal substring search over beatmap titles/artists.
+# Every normalized string is split into trigrams; a trigram's posting list
+# holds the rows containing it, stored once per farm factor in that factor's
+# descending order (as ranks). A query intersects the posting lists of its
+# trigrams, which keeps the farm-factor order, and checks the candidates in
+# that order until it has N real matches, so top-N queries never sort.
+# Queries shorter than NGRAM check all rows in farm-factor order. The index
+# also keeps DISPLAY_COLS, so lookups do not need to read the CSV. It is
+# saved as a dict of plain arrays/frames (not a pickled TitleIndex), so an
+# index built by running this file loads from any other script.
+
+
+def normalize(text):
+    """NFKC, casefolded, whitespace runs collapsed to one space."""
+    return " ".join(unicodedata.normalize("NFKC", str(text)).casefold().split())
+
+
+def ngrams(text, n=NGRAM):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class TitleIndex:
+
+    def __init__(self, table, texts, orders, grams, indptr, postings, source=None):
+        self.table = table          # DISPLAY_COLS, one row per beatmap row
+        self.texts = texts          # field -> normalized strings
+        self.orders = orders        # factor -> rows in descending factor order (NaN last)
+        self.grams = grams          # field -> sorted trigram vocabulary
+        self.indptr = indptr        # field -> CSR offsets into the posting lists
+        self.postings = postings    # (field, factor) -> ranks (positions in orders[factor]), ascending per trigram
+        self.source = source        # (path, size, mtime) of the CSV the index was built from
+
+    @classmethod
+    def build(cls, df, source=None):
+        missing = set(DISPLAY_COLS) - set(df.columns)
+        if missing:
+            raise ValueError(f"Missing columns in CSV: {missing}")
+        table = df[DISPLAY_COLS].reset_index(drop=True)
+
+        orders, ranks = {}, {}
+        for factor in FARM_FACTORS:
+            values = table[factor].to_numpy(dtype=np.float64)
+            orders[factor] = np.argsort(np.where(np.isnan(values), np.inf, -values), kind="stable")
+            ranks[factor] = np.empty(len(values), dtype=np.int64)
+            ranks[factor][orders[factor]] = np.arange(len(values))
+
+        texts, grams, indptr, postings = {}, {}, {}, {}
+        for field in FIELDS:
+            texts[field] = [normalize(t) if isinstance(t, str) else "" for t in table[field]]
+            keys, rows = [], []
+            for row, text in enumerate(texts[field]):
+                row_grams = ngrams(text)
+                keys.extend(row_grams)
+                rows.extend([row] * len(row_grams))
+            grams[field], codes = np.unique(np.array(keys, dtype=f"<U{NGRAM}"), return_inverse=True)
+            indptr[field] = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(grams[field])))])
+            rows = np.asarray(rows, dtype=np.int64)
+            for factor in FARM_FACTORS:
+                rank = ranks[factor][rows]
+                postings[(field, factor)] = rank[np.lexsort((rank, codes))].astype(np.int32)
+        return cls(table, texts, orders, grams, indptr, postings, source)
+
+    def save(self, path=INDEX_PATH):
+        joblib.dump(dict(vars(self)), path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        return cls(**joblib.load(path))
+
+    # ---------- queries ----------
+
+    def candidates(self, query, field="title", by=FARM_FACTORS[0]):
+        """Ranks (ascending, i.e. by descending `by`) of the rows containing every trigram of the query."""
+        query_grams = ngrams(query)
+        if not query_grams:
+            return np.arange(len(self.table))
+        vocab = self.grams[field]
+        codes = np.searchsorted(vocab, sorted(query_grams))
+        if np.any(codes >= len(vocab)) or np.any(vocab[np.minimum(codes, len(vocab) - 1)] != sorted(query_grams)):
+            return np.zeros(0, dtype=np.int64)
+        postings, indptr = self.postings[(field, by)], self.indptr[field]
+        lists = sorted((postings[indptr[c]:indptr[c + 1]] for c in codes), key=len)
+        return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), lists)
+
+    def search_rows(self, query, field="title", by=FARM_FACTORS[0], n=TOP_N):
+        """Row positions of the top `n` matches by `by` (all matches if n is None)."""
+        query = normalize(query)
+        texts, order = self.texts[field], self.orders[by]
+        rows = []
+        for rank in self.candidates(query, field, by):
+            row = order[rank]
+            if query in texts[row]:
+                rows.append(row)
+                if n is not None and len(rows) >= n:
+                    break
+        return rows
+
+    def search(self, query, field="title", by=FARM_FACTORS[0], n=TOP_N):
+        """DISPLAY_COLS of the top `n` beatmaps whose `field` contains `query`, by descending `by`."""
+        return self.table.iloc[self.search_rows(query, field, by, n)]
+
+    def search_many(self, queries, field="title", by=FARM_FACTORS[0], n=TOP_N):
+        """Batch mode: one long frame with a `query` and `rank` column per result row."""
+        frames = []
+        for query in queries:
+            rows = self.search_rows(query, field, by, n)
+            frames.append(self.table.iloc[rows].assign(query=query, rank=np.arange(1, len(rows) + 1)))
+        result = pd.concat(frames, ignore_index=True) if frames else self.table.iloc[:0].assign(query="", rank=0)
+        return result[["query", "rank"] + DISPLAY_COLS]
+
+
+def source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns
+
+
+def load_index(csv_path=CSV_PATH, index_path=INDEX_PATH, rebuild=False):
+    """The saved index, rebuilt first if it is missing or beatmaps.csv changed since it was built."""
+    signature = source_signature(csv_path)
+    if not rebuild and os.path.exists(index_path):
+        try:
+            index = TitleIndex.load(index_path)
+        except Exception as e:   # older or unreadable index file: rebuild it
+            print(f"⚠️ Could not load {index_path} ({type(e).__name__}: {e}), rebuilding")
+        else:
+            if index.source == signature:
+                return index
+    start = time.time()
+    index = TitleIndex.build(pd.read_csv(csv_path), source=signature)
+    index.save(index_path)
+    print(f"✔ Built title index over {len(index.table)} beatmaps in {time.time() - start:.1f}s: {index_path}")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trigram title/artist search over beatmaps.csv, ranked by farm factor.")
+    parser.add_argument("queries", nargs="*", help="title (or artist) substrings")
+    parser.add_argument("--queries-file", help="batch mode: one query per line")
+    parser.add_argument("--field", default="title", choices=FIELDS)
+    parser.add_argument("--by", default=FARM_FACTORS[0], choices=FARM_FACTORS)
+    parser.add_argument("--n", type=int, default=TOP_N, help="results per query (0 = all matches)")
+    parser.add_argument("--out", help="write the batch results to this CSV instead of printing")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    index = load_index(args.csv, rebuild=args.rebuild)
+    queries = list(args.queries)
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries += [line.strip() for line in f if line.strip()]
+
+    start = time.perf_counter()
+    results = index.search_many(queries, args.field, args.by, args.n or None)
+    elapsed = (time.perf_counter() - start) * 1000
+    if args.out:
+        results.to_csv(args.out, index=False)
+        print(f"✔ Saved {len(results)} rows for {len(queries)} queries: {args.out}")
+    else:
+        print(results.to_string(index=False))
+    print(f"[INFO] {len(queries)} queries in {elapsed:.1f} ms")